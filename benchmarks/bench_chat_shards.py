@@ -0,0 +1,125 @@
+"""
+Benchmark of sharded chat ingestion: N shard processes (chatshards._ShardBot on a null websocket)
+process synthetic lines and send ChatRecord batches to the aggregator, which dispatches them to
+twitchchat.Bot.event_message (filters, flood and duplicate detection) in this process.
+
+Shards are fed as fast as they can process, the rate is measured from the first to the last record
+received, so process start up isn't counted. The CPU time of this process per message is the work
+left to the aggregator, it caps the rate on a machine with enough cores for the shards. Compare
+with replay_irc.py --bot twitchchat, which does all of the work in one process.
+
+Usage: python benchmarks/bench_chat_shards.py [--shards 1 2 4] [--lines 100000] [--channels 8] [--frame-lines 8]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from replay_irc import NICK, _NullSocket, synthetic_lines  # noqa: E402
+
+
+def feed_shard(index: int, channels, lines: int, frame_lines: int, records, batch_size: int, flush_interval: float):
+    import chatshards
+
+    bot = chatshards._ShardBot(index, "replay", "0", NICK, channels, records, multiprocessing.Queue(), batch_size, flush_interval)
+    connection = bot._ws
+    connection._websocket = _NullSocket()
+    loop = bot.loop
+    for channel in channels:
+        loop.run_until_complete(connection.process_data(f":{NICK}!{NICK}@{NICK}.tmi.twitch.tv JOIN #{channel}"))
+    generated = list(synthetic_lines(lines, channels, seed=index + 1))
+    frames = ["\r\n".join(generated[idx:idx + frame_lines]) + "\r\n" for idx in range(0, len(generated), frame_lines)]
+
+    async def feed():
+        for frame in frames:
+            await connection.ingest.put(frame)
+            await asyncio.sleep(0)
+        await connection.ingest.join()
+
+    loop.run_until_complete(feed())
+    bot._flush()
+    pending = asyncio.all_tasks(loop)
+    for task in pending:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+    loop.run_until_complete(connection._http._session.close())
+    loop.close()
+
+
+def run(shard_count: int, lines: int, channel_count: int, frame_lines: int) -> float:
+    import chatshards
+    import twitchchat
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    channels = [f"channel{idx}" for idx in range(channel_count)]
+    bot = twitchchat.Bot(token="replay", client_id="0", nickname=NICK, command_prefix="!", channels_to_join=channels)
+    bot.progress_callback = type("Signal", (), {"emit": staticmethod(lambda *args: None)})()
+    shards = chatshards.ChatShards(bot, shard_count, "replay", "0", NICK, channels)
+    bot.shards = shards
+    context = multiprocessing.get_context("spawn")
+    per_shard = lines // len(shards)
+    expected = 0
+    processes = []
+    for idx in range(len(shards)):
+        shard_channels = [channel for channel, shard in shards.assignment.items() if shard == idx]
+        expected += sum(1 for line in synthetic_lines(per_shard, shard_channels, seed=idx + 1) if " PRIVMSG #" in line)
+        processes.append(context.Process(target=feed_shard, args=(idx, shard_channels, per_shard, frame_lines, shards._records, 200, 0.05)))
+
+    first = None
+    received = []
+    event_message = bot.event_message
+
+    async def timed_event_message(message):
+        nonlocal first
+        if first is None:
+            first = time.perf_counter()
+        await event_message(message)
+        received.append(time.perf_counter())
+
+    bot.event_message = timed_event_message
+    bot._ws.refresh_dispatch()
+    for process in processes:
+        process.start()
+    cpu = time.process_time()
+    shards.attach(loop)
+
+    async def wait():
+        while len(received) < expected:
+            await asyncio.sleep(0.01)
+        await bot._ws._handler_pool.join()
+
+    loop.run_until_complete(asyncio.wait_for(wait(), 600))
+    cpu = time.process_time() - cpu
+    for process in processes:
+        process.join()
+    shards.stop(5)
+    pending = asyncio.all_tasks(loop)  # consumer and worker tasks
+    for task in pending:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+    loop.run_until_complete(bot._ws._http._session.close())
+    loop.close()
+    rate = len(received) / (received[-1] - first)
+    print(f"{len(shards)} shards  {rate:10.0f} msgs/s  aggregator {cpu / len(received) * 1e6:6.2f} us CPU/msg  "
+          f"{len(received)} messages, dropped {sum(shards.dropped)}")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--lines", type=int, default=100000)
+    parser.add_argument("--channels", type=int, default=8)
+    parser.add_argument("--frame-lines", type=int, default=8)
+    args = parser.parse_args()
+    for shard_count in args.shards:
+        run(shard_count, args.lines, args.channels, args.frame_lines)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark of the compiled chat filter set against the per-filter loop.
+
+Before timing, regular expressions that are easy to misread for the required literal prefilter
+(escapes, quantifiers, alternations) are checked to match the same messages as Filter.filter.
+
+Usage: python benchmarks/bench_chatfilter.py [--filters 10000] [--messages 20000] [--rate 5000]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatfilter import Filter, CompiledFilterSet  # noqa: E402
+
+WORDS = ["hello", "pog", "kappa", "lul", "gg", "wp", "nice", "stream", "when", "is", "the", "next", "raid", "lol", "omegalul",
+         "monkaS", "sadge", "copium", "what", "game", "this", "hype", "clip", "it", "chat", "emote", "follow", "prime"]
+
+
+def random_word(rng: random.Random, length: int) -> str:
+    return "".join(rng.choice(string.ascii_lowercase + string.digits) for _ in range(length))
+
+
+# (pattern, message) pairs the pattern matches
+REGEX_CASES = [
+    (r"\x41bcd", "xAbcd"), (r"\101bcd", "Abcd"), (r"\u0041bc", "Abc"), (r"\U00000041bc", "Abc"),
+    (r"\N{LATIN CAPITAL LETTER A}bc", "Abc"), (r"(ab)\1cd", "ababcd"), (r"\0bc", "\0bc"),
+    (r"d.c{d|x", "x"), (r"foo{bar|baz", "baz"), (r"ab{2}cd", "abbcd"), (r"abc{1,3}de", "abcccde"),
+    (r"a\.b", "a.b"), (r"\d+foo", "12foo"), (r"colou?r", "color"),
+]
+
+
+def check_regex_literals() -> int:
+    """:return: The number of REGEX_CASES where the compiled set and Filter.filter disagree"""
+    mismatches = 0
+    for pattern, content in REGEX_CASES:
+        fltr = Filter(pattern, "Regular Expression", "Message", "Ban")
+        message = SimpleNamespace(content=content, author=SimpleNamespace(name="user"))
+        expected = bool(fltr.filter(message))
+        got = bool(CompiledFilterSet([fltr]).match(content, "user"))
+        if expected != got:
+            mismatches += 1
+            print(f"Mismatch for {pattern!r} on {content!r}: Filter.filter {expected}, compiled set {got}")
+    return mismatches
+
+
+def make_filters(rng: random.Random, count: int):
+    filters = []
+    for idx in range(count):
+        kind = idx % 10
+        if kind < 4:
+            filters.append(Filter(f"{random_word(rng, 8)} {random_word(rng, 6)}", "Full match", "Message", "Ban"))
+        elif kind < 8:
+            filters.append(Filter(random_word(rng, rng.randint(5, 12)), "Match partially", "Message", "Timeout 1m"))
+        elif kind < 9:
+            filters.append(Filter(f"{random_word(rng, 4)}[0-9]+{random_word(rng, 3)}", "Regular Expression", "Message", "Delete Message"))
+        else:
+            filters.append(Filter(f"bot{random_word(rng, 5)}", "Match partially", "Author", "Ban"))
+    return filters
+
+
+def make_messages(rng: random.Random, filters, count: int):
+    partials = [fltr.filter_str for fltr in filters if fltr.filter_type == "Match partially" and fltr.target == "Message"]
+    messages = []
+    for idx in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(1, 15))]
+        if idx % 100 == 0:  # 1% of the messages trigger a filter
+            words.insert(rng.randrange(len(words) + 1), rng.choice(partials))
+        messages.append(SimpleNamespace(content=" ".join(words), author=SimpleNamespace(name=f"user{rng.randint(0, 50000)}")))
+    return messages
+
+
+def bench_loop(filters, messages):
+    hits = 0
+    start = time.perf_counter()
+    for message in messages:
+        for fltr in filters:
+            if fltr.filter(message):
+                hits += 1
+                break
+    return time.perf_counter() - start, hits
+
+
+def bench_compiled(filter_set, messages):
+    hits = 0
+    start = time.perf_counter()
+    for message in messages:
+        if filter_set.match(message.content, message.author.name):
+            hits += 1
+    return time.perf_counter() - start, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filters", type=int, default=10000)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--rate", type=int, default=5000, help="Target messages per second")
+    parser.add_argument("--loop-messages", type=int, default=500, help="Messages to run through the per-filter loop")
+    args = parser.parse_args()
+
+    mismatches = check_regex_literals()
+    print(f"{len(REGEX_CASES)} regular expression cases, {mismatches} mismatches")
+
+    rng = random.Random(1)
+    filters = make_filters(rng, args.filters)
+    messages = make_messages(rng, filters, args.messages)
+
+    start = time.perf_counter()
+    filter_set = CompiledFilterSet(filters)
+    compile_time = time.perf_counter() - start
+
+    duration, hits = bench_compiled(filter_set, messages)
+    rate = len(messages) / duration
+    print(f"{args.filters} filters, compiled in {compile_time * 1000:.0f} ms")
+    print(f"compiled set:    {rate:>10.0f} msgs/s  {duration / len(messages) * 1e6:8.1f} us/msg  {hits} hits")
+
+    loop_messages = messages[:args.loop_messages]
+    duration, hits = bench_loop(filters, loop_messages)
+    loop_rate = len(loop_messages) / duration
+    print(f"per-filter loop: {loop_rate:>10.0f} msgs/s  {duration / len(loop_messages) * 1e6:8.1f} us/msg  {hits} hits")
+
+    print(f"speedup: {rate / loop_rate:.0f}x, target {args.rate} msgs/s {'met' if rate >= args.rate else 'NOT met'}")
+    return 0 if rate >= args.rate and not mismatches else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
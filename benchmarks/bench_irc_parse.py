@@ -0,0 +1,122 @@
+"""
+Benchmark of the single pass IRC tokenizer against the regex passes it replaced in
+WebsocketConnection.process_data / process_actions (code, data, badges, author, batches and
+nameslist), on the synthetic message mix of replay_irc.py. Both must agree on action, author,
+channel, content and (unescaped) tags. Tags are parsed lazily, "all tags" reads every tag.
+
+Usage: python benchmarks/bench_irc_parse.py [--lines 100000] [--channels 5]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from replay_irc import synthetic_lines  # noqa: E402
+from twitchio.irc import parse_line, unescape_tag  # noqa: E402
+
+REGEX = {
+    "data": re.compile(
+        r"^(?:@(?P<tags>\S+)\s)?:(?P<data>\S+)(?:\s)"
+        r"(?P<action>[A-Z()-]+)(?:\s#)(?P<channel>\S+)"
+        r"(?:\s(?::)?(?P<content>.+))?"),
+    "ping": re.compile("PING (?P<content>.+)"),
+    "author": re.compile(
+        "(?P<author>[a-zA-Z0-9_]+)!(?P=author)"
+        "@(?P=author).tmi.twitch.tv"),
+    'code': re.compile(r":tmi\.twitch\.tv\s(?P<code>[0-9]{3}).*?"),
+    'badges': re.compile(r"@badges=(?P<moderator>[^;]*);"
+                         r"color=(?P<color>[^;]*);"
+                         r"display-name=(?P<name>[^;]*);"
+                         r"emote-sets=(?P<emotes>[^;]*);"
+                         r"mod=(?P<mod>[^;]*);"
+                         r"subscriber=(?P<subscriber>[^;]*);"
+                         r"user-type=(?P<type>[^\s]+)\s:tmi.twitch.tv\s(?P<action>[A-Z]*)\s"
+                         r"#(?P<channel>[a-z0-9A-Z]+)"),
+    "batches": re.compile(r":(?P<author>[a-zA-Z0-9_]+)!(?P=author)@(?P=author).tmi.twitch.tv"
+                          r"\s(?P<action>[A-Z()-]+)(?:\s#)(?P<channel>\S+)"),
+    "nameslist": re.compile(r"(?P<author>[a-zA-Z0-9_]+).tmi.twitch.tv\s(?P<code>\S+)\s(?P=author)"
+                            r"\s=\s#(?P<channel>\S+)\s:(?P<names>.+)")}
+GROUPS = ('action', 'data', 'content', 'channel')
+
+
+def regex_parse(data: str):
+    """The previous process_data / process_actions parsing, :return: (action, author, channel, content, tags)"""
+    try:
+        int(REGEX['code'].match(data).group('code'))
+    except AttributeError:
+        pass
+    result = (REGEX["ping"] if data.startswith("PING") else REGEX["data"]).match(data)
+    REGEX['badges'].match(data)
+    try:
+        tags = {}
+        for tag in str(result.group("tags")).split(";"):
+            t = tag.split("=")
+            if t[1].isdecimal():
+                t[1] = int(t[1])
+            tags[t[0]] = t[1]
+    except (AttributeError, IndexError, KeyError):
+        tags = None
+    groups = {}
+    for group in GROUPS:
+        try:
+            groups[group] = result.group(group)
+        except (AttributeError, KeyError, IndexError):
+            pass
+    for match in REGEX['batches'].finditer(data):
+        match.groups()
+    for match in REGEX['nameslist'].finditer(data):
+        match.group('code')
+    try:
+        author = REGEX["author"].match(groups.get('data')).group("author")
+    except Exception:
+        author = None
+    return groups.get('action') or 'PING', author, groups.get('channel'), groups.get('content'), tags
+
+
+def token_parse(data: str):
+    """The tokenizer as used by process_data, :return: (action, author, channel, content, tags)"""
+    line = parse_line(data)
+    if line.command == 'PING':
+        return 'PING', None, None, data[5:], None
+    return line.command, line.author, line.channel, line.content, line.tags
+
+
+def token_parse_all(data: str):
+    action, author, channel, content, tags = token_parse(data)
+    return action, author, channel, content, dict(tags) if tags is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=100000)
+    parser.add_argument("--channels", type=int, default=5)
+    args = parser.parse_args()
+
+    lines = list(synthetic_lines(args.lines, [f"channel{idx}" for idx in range(args.channels)]))
+
+    mismatches = 0
+    for line in lines:
+        expected, got = regex_parse(line), token_parse_all(line)
+        if expected[4]:
+            expected = expected[:4] + ({key: unescape_tag(value) if isinstance(value, str) else value for key, value in expected[4].items()},)
+        if expected != got:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"Mismatch for {line!r}:\n  regex     {expected}\n  tokenizer {got}")
+
+    results = {}
+    for name, parse in (("regex", regex_parse), ("tokenizer", token_parse), ("all tags", token_parse_all)):
+        start = time.perf_counter()
+        for line in lines:
+            parse(line)
+        results[name] = time.perf_counter() - start
+        print(f"{name:10s} {len(lines) / results[name]:10.0f} lines/s  {results[name] / len(lines) * 1e6:6.2f} us/line")
+    print(f"speedup    {results['regex'] / results['tokenizer']:.1f}x, {mismatches} mismatches")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,360 @@
+"""
+Replays raw IRC lines through the twitchio ingestion path without a Twitch connection:
+IngestQueue.put -> WebsocketConnection._process_lines -> process_actions -> Bot.event_message.
+
+Lines are read from a file (one raw IRC line each, .gz/.xz accepted, e.g. chat logs in the "irc"
+format) or generated. They are packed into frames of --frame-lines lines and fed like _listen does,
+as fast as possible or paced by their tmi-sent-ts tags with --speed. Event handlers run inline on
+the handler pool or as one task per event.
+
+Usage: python benchmarks/replay_irc.py [FILE] [--synthetic 100000] [--names 0] [--speed 0] [--frame-lines 1] [--burst 1]
+       [--policy block] [--ingest-queue 10000] [--bot twitchchat] [--dispatch inline] [--tracemalloc]
+"""
+import argparse
+import asyncio
+import gc
+import gzip
+import lzma
+import os
+import random
+import re
+import string
+import sys
+import time
+import tracemalloc
+import uuid
+from array import array
+from typing import Iterator, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+NICK = "replaybot"
+WORDS = ["hello", "pog", "kappa", "lul", "gg", "wp", "nice", "stream", "when", "is", "the", "next", "raid", "lol", "omegalul",
+         "monkaS", "sadge", "copium", "what", "game", "this", "hype", "clip", "it", "chat", "emote", "follow", "prime"]
+SENT_TS_REGEX = re.compile(r"tmi-sent-ts=(\d+)")
+
+
+# <editor-fold desc="Input">
+def synthetic_lines(count: int, channels: List[str], seed: int = 1, users: int = 50000) -> Iterator[str]:
+    """
+    Yields raw IRC lines shaped like Twitch sends them: mostly tagged PRIVMSGs, some JOIN/PART,
+    USERNOTICE, CLEARCHAT and PING, one message every millisecond.
+    """
+    rng = random.Random(seed)
+    timestamp = 1640000000000
+    for idx in range(count):
+        timestamp += 1
+        channel = rng.choice(channels)
+        login = f"user{int(rng.paretovariate(1.1)) % users}"
+        kind = rng.random()
+        if kind < 0.9:
+            subscriber = rng.random() < 0.3
+            badges = "subscriber/12,premium/1" if subscriber else ("premium/1" if rng.random() < 0.2 else "")
+            content = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 15)))
+            yield (f"@badge-info={'subscriber/14' if subscriber else ''};badges={badges};client-nonce={rng.getrandbits(128):032x};"
+                   f"color=#{rng.getrandbits(24):06X};display-name={login.capitalize()};emotes=;first-msg=0;flags=;id={uuid.UUID(int=rng.getrandbits(128))};"
+                   f"mod=0;room-id=12345;subscriber={int(subscriber)};tmi-sent-ts={timestamp};turbo=0;user-id={rng.randint(1, 10 ** 9)};user-type= "
+                   f":{login}!{login}@{login}.tmi.twitch.tv PRIVMSG #{channel} :{content}")
+        elif kind < 0.95:
+            action = "JOIN" if kind < 0.93 else "PART"
+            yield f":{login}!{login}@{login}.tmi.twitch.tv {action} #{channel}"
+        elif kind < 0.97:
+            yield (f"@badge-info=subscriber/1;badges=subscriber/0;color=;display-name={login.capitalize()};emotes=;flags=;id={uuid.UUID(int=rng.getrandbits(128))};"
+                   f"login={login};mod=0;msg-id=sub;msg-param-cumulative-months=1;msg-param-months=0;msg-param-should-share-streak=0;msg-param-sub-plan-name=Tier\\s1;msg-param-sub-plan=1000;room-id=12345;subscriber=1;"
+                   f"system-msg={login}\\ssubscribed\\sat\\sTier\\s1.;tmi-sent-ts={timestamp};user-id={rng.randint(1, 10 ** 9)};user-type= "
+                   f":tmi.twitch.tv USERNOTICE #{channel}")
+        elif kind < 0.99:
+            yield f"@ban-duration=600;room-id=12345;target-user-id={rng.randint(1, 10 ** 9)};tmi-sent-ts={timestamp} :tmi.twitch.tv CLEARCHAT #{channel} :{login}"
+        else:
+            yield "PING :tmi.twitch.tv"
+
+
+def names_lines(channels: List[str], viewers: int, per_line: int = 40) -> Iterator[str]:
+    """Yields the NAMES reply Twitch sends after joining channels with viewers chatters each"""
+    for channel in channels:
+        for start in range(0, viewers, per_line):
+            names = " ".join(f"viewer{idx}" for idx in range(start, min(start + per_line, viewers)))
+            yield f":{NICK}.{NICK}.tmi.twitch.tv 353 {NICK} = #{channel} :{names}"
+        yield f":{NICK}.{NICK}.tmi.twitch.tv 366 {NICK} #{channel} :End of /NAMES list"
+
+
+def file_lines(path: str) -> Iterator[str]:
+    if path.endswith(".gz"):
+        file = gzip.open(path, "rt", encoding="utf-8")
+    elif path.endswith(".xz"):
+        file = lzma.open(path, "rt", encoding="utf-8")
+    else:
+        file = open(path, "r", encoding="utf-8")
+    with file:
+        for line in file:
+            line = line.rstrip("\r\n")
+            if line:
+                yield line
+
+
+def channels_of(lines: List[str]) -> List[str]:
+    channels = set()
+    for line in lines:
+        _, _, rest = line.partition(" #")
+        if rest:
+            channels.add(rest.split(" ", 1)[0])
+    return sorted(channels)
+# </editor-fold>
+
+
+class _NullSocket:
+    """Stands in for the websocket, PONGs and other sends are only counted"""
+    open = True
+
+    def __init__(self):
+        self.sent = 0
+
+    async def send(self, data):
+        self.sent += 1
+
+    async def close(self):
+        self.open = False
+
+
+class _CountingBot:
+    """The smallest bot WebsocketConnection accepts: every event is a no-op"""
+    extra_listeners = {}
+    _webhook_server = None
+
+    def __getattr__(self, name):
+        if name.startswith("event_"):
+            async def event(*args, **kwargs):
+                pass
+            setattr(self, name, event)
+            return event
+        raise AttributeError(name)
+
+
+class Stats:
+    def __init__(self):
+        self.enqueue = array("d")  # IngestQueue.put, per frame
+        self.lines = array("d")  # _process_lines without process_actions, per batch
+        self.actions = array("d")  # process_actions, per line
+        self.actions_total = 0.0
+        self.queued = array("d")  # line fed until event_message starts
+        self.handler = array("d")  # event_message
+        self.end_to_end = array("d")  # line fed until event_message returned
+        self.errors = 0
+
+    @staticmethod
+    def percentiles(values: array) -> str:
+        if not values:
+            return "no samples"
+        ordered = sorted(values)
+
+        def pick(fraction):
+            return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] * 1e6
+
+        return f"p50 {pick(0.5):9.1f}  p90 {pick(0.9):9.1f}  p99 {pick(0.99):9.1f}  max {ordered[-1] * 1e6:10.1f} us"
+
+
+def make_bot(kind: str, loop: asyncio.AbstractEventLoop, channels: List[str], dispatch: str = None):
+    """
+    :param dispatch: "tasks" or "inline", None for the default of the bot
+    :return: (bot, websocket connection) wired to a _NullSocket and joined to channels
+    """
+    if kind == "twitchchat":
+        import twitchchat
+
+        bot = twitchchat.Bot(token="replay", client_id="0", nickname=NICK, command_prefix="!", channels_to_join=channels)
+        bot.progress_callback = type("Signal", (), {"emit": staticmethod(lambda *args: None)})()
+        connection = bot._ws
+        if dispatch == "tasks":
+            connection._handler_pool = None
+    else:
+        from twitchio.websocket import WebsocketConnection
+
+        bot = _CountingBot()
+        connection = WebsocketConnection(bot, loop=loop, irc_token="oauth:replay", nick=NICK, initial_channels=channels,
+                                         inline_dispatch=dispatch == "inline")
+    connection._websocket = _NullSocket()
+    for channel in channels:
+        loop.run_until_complete(connection.process_data(f":{NICK}!{NICK}@{NICK}.tmi.twitch.tv JOIN #{channel}"))
+    return bot, connection
+
+
+def instrument(bot, connection, stats: Stats, fed_at: dict):
+    process_actions = connection.process_actions
+    put = connection.ingest.put
+    process_lines = connection.ingest._process
+    event_message = bot.event_message
+    perf_counter = time.perf_counter
+
+    async def timed_process_actions(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return await process_actions(*args, **kwargs)
+        finally:
+            duration = perf_counter() - start
+            stats.actions.append(duration)
+            stats.actions_total += duration
+
+    async def timed_put(frame):
+        start = perf_counter()
+        try:
+            return await put(frame)
+        finally:
+            stats.enqueue.append(perf_counter() - start)
+
+    async def timed_process_lines(batch):
+        start = perf_counter()
+        actions_total = stats.actions_total
+        try:
+            return await process_lines(batch)
+        finally:
+            stats.lines.append(perf_counter() - start - (stats.actions_total - actions_total))
+
+    async def timed_event_message(message):
+        start = perf_counter()
+        try:
+            return await event_message(message)
+        finally:
+            end = perf_counter()
+            fed = fed_at.pop(message.raw_data, None)
+            stats.handler.append(end - start)
+            if fed is not None:
+                stats.queued.append(start - fed)
+                stats.end_to_end.append(end - fed)
+
+    connection.process_actions = timed_process_actions
+    connection.ingest.put = timed_put
+    connection.ingest._process = timed_process_lines
+    bot.event_message = timed_event_message
+
+    async def counted_event_error(error, data=None):
+        stats.errors += 1
+        if stats.errors <= 5:
+            print(f"event failed: {error!r}")
+
+    connection.event_error = counted_event_error
+    if connection._handler_pool is not None:
+        connection._handler_pool._on_error = counted_event_error
+    connection.refresh_dispatch()
+
+
+async def replay(connection, frames: List[List[str]], speed: float, fed_at: dict, burst: int = 1):
+    """Feeds frames the way WebsocketConnection._listen does: raw_data event, then IngestQueue.put"""
+    perf_counter = time.perf_counter
+    background = asyncio.all_tasks()
+    first_sent = None
+    start = perf_counter()
+
+    for idx, lines in enumerate(frames, 1):
+        if speed:
+            sent = SENT_TS_REGEX.search(lines[0])
+            if sent:
+                sent = int(sent.group(1)) / 1000
+                if first_sent is None:
+                    first_sent = sent
+                delay = start + (sent - first_sent) / speed - perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+        fed = perf_counter()
+        for line in lines:
+            fed_at[line] = fed
+        frame = "\r\n".join(lines) + "\r\n"
+        await connection._dispatch("raw_data", frame)
+        await connection.ingest.put(frame)
+        if idx % burst == 0:
+            await asyncio.sleep(0)  # recv() only yields to the loop once the frames read so far are queued
+    await connection.ingest.join()
+    background.add(connection.ingest._consumer)
+    if connection._handler_pool is not None:
+        await connection._handler_pool.join()
+        background |= set(connection._handler_pool._workers)
+    # Let the handler tasks created by the last dispatches finish
+    while asyncio.all_tasks() - background:
+        await asyncio.sleep(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("file", nargs="?", help="Raw IRC lines, .gz/.xz accepted")
+    parser.add_argument("--synthetic", type=int, default=100000, help="Generated lines if no file is given")
+    parser.add_argument("--channels", type=int, default=5, help="Channels for generated lines")
+    parser.add_argument("--names", type=int, default=0, help="Chatters per channel listed by NAMES before the generated lines")
+    parser.add_argument("--speed", type=float, default=0, help="Replay speed multiplier by tmi-sent-ts, 0 for max speed")
+    parser.add_argument("--bot", choices=("counting", "twitchchat"), default="counting", help="Bot receiving the events")
+    parser.add_argument("--frame-lines", type=int, default=1, help="Lines packed into one websocket frame")
+    parser.add_argument("--burst", type=int, default=1, help="Frames read before yielding to the event loop")
+    parser.add_argument("--dispatch", choices=("tasks", "inline"), help="Run event handlers as tasks or inline, defaults to the bot's choice")
+    parser.add_argument("--policy", choices=("block", "drop_oldest", "sample"), default="block", help="Ingest queue overload policy")
+    parser.add_argument("--ingest-queue", type=int, default=10000, help="PRIVMSG lines the ingest queue holds")
+    parser.add_argument("--tracemalloc", action="store_true", help="Trace allocations (slows down the replay)")
+    args = parser.parse_args()
+
+    if args.file:
+        lines = list(file_lines(args.file))
+    else:
+        channels = [f"channel{idx}" for idx in range(args.channels)]
+        lines = list(names_lines(channels, args.names)) if args.names else []
+        lines += synthetic_lines(args.synthetic, channels)
+    channels = channels_of(lines)
+    privmsgs = sum(1 for line in lines if " PRIVMSG #" in line)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    bot, connection = make_bot(args.bot, loop, channels, args.dispatch)
+    connection.ingest.policy = args.policy
+    connection.ingest.maxsize = max(args.ingest_queue, 1)
+    stats = Stats()
+    fed_at = {}
+    instrument(bot, connection, stats, fed_at)
+
+    frame_lines = max(args.frame_lines, 1)
+    frames = [lines[idx:idx + frame_lines] for idx in range(0, len(lines), frame_lines)]
+    gc.collect()
+    if args.tracemalloc:
+        tracemalloc.start()
+    blocks_before = sys.getallocatedblocks()
+    start = time.perf_counter()
+    loop.run_until_complete(replay(connection, frames, args.speed, fed_at, max(args.burst, 1)))
+    duration = time.perf_counter() - start
+    if args.tracemalloc:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    fed_at.clear()
+    gc.collect()
+    blocks_retained = sys.getallocatedblocks() - blocks_before
+
+    dispatch = "inline" if connection._handler_pool is not None else "tasks"
+    print(f"{len(lines)} lines ({privmsgs} PRIVMSG) in {len(channels)} channels, bot: {args.bot}, dispatch: {dispatch}, speed: {args.speed or 'max'}")
+    print(f"{len(lines) / duration:10.0f} lines/s  {len(stats.end_to_end) / duration:10.0f} msgs/s  {duration:.2f} s  {stats.errors} errors")
+    ingest = connection.ingest
+    print(f"frames      {ingest.frames}, lines per frame: {dict(sorted(ingest.lines_per_frame.items()))}")
+    print(f"ingest      policy {ingest.policy}, {ingest.stats()}")
+    members = sum(len(entry['channel']._members) for entry in connection._channel_cache.values())
+    print(f"members     {members} in {len(connection._channel_cache)} channels, {connection.members_dropped} dropped")
+    print(f"enqueue     {Stats.percentiles(stats.enqueue)}")
+    print(f"lines       {Stats.percentiles(stats.lines)}")
+    print(f"actions     {Stats.percentiles(stats.actions)}")
+    print(f"queued      {Stats.percentiles(stats.queued)}")
+    print(f"handler     {Stats.percentiles(stats.handler)}")
+    print(f"end to end  {Stats.percentiles(stats.end_to_end)}")
+    for event, count in connection.dispatched.most_common():
+        print(f"dispatch    {event:12s} {count:8d} x {connection.dispatch_seconds[event] / count * 1e6:6.2f} us")
+    if connection.skipped:
+        print(f"skipped     {dict(connection.skipped.most_common())}")
+    print(f"memory blocks retained: {blocks_retained} ({blocks_retained / max(len(lines), 1):.2f} per line)")
+    if args.tracemalloc:
+        print(f"traced memory: {current / 1024:.0f} KiB retained, {peak / 1024:.0f} KiB peak")
+        for stat in snapshot.statistics("lineno")[:10]:
+            print(f"  {stat.count:8d} blocks {stat.size / 1024:8.0f} KiB  {stat.traceback}")
+    pending = asyncio.all_tasks(loop)  # consumer and worker tasks
+    for task in pending:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+    if connection._http is not None:
+        loop.run_until_complete(connection._http._session.close())
+    loop.close()
+    return 1 if stats.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,500 @@
+import hashlib
+import json
+import marshal
+import os
+import pickle
+import re
+import sys
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+# Bump when the layout of the compiled matcher changes, invalidates all cached matchers
+MATCHER_VERSION = 1
+
+
+class Filter:
+    FILTER_TYPES = ("Full match", "Match partially", "Regular Expression")
+    FILTER_TARGETS = ("Message", "Author")
+    FILTER_PENALITYS = ("Delete Message", "Timeout 1m", "Timeout 10m", "Ban")
+
+    _compiled_regex = None
+
+    def __init__(self, filter_string: str, filter_type: str, target: str, penality: str):
+        self.filter_str = filter_string.strip()
+        self.filter_type = filter_type
+        self.target = target
+        self.penality = penality
+
+    @property
+    def compiled_regex(self) -> Optional[re.Pattern]:
+        if self._compiled_regex is None and self.filter_type == "Regular Expression":
+            self._compiled_regex = re.compile(self.filter_str)
+        return self._compiled_regex
+
+    def to_dict(self) -> dict:
+        return {"filter": self.filter_str, "type": self.filter_type, "target": self.target, "penality": self.penality}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Filter":
+        return cls(data["filter"], data.get("type", cls.FILTER_TYPES[0]), data.get("target", cls.FILTER_TARGETS[0]), data.get("penality", cls.FILTER_PENALITYS[0]))
+
+    def filter(self, message) -> Union[Tuple[str, str], None]:
+        string_to_filter = message.content.strip() if self.target == "Message" else message.author.name
+        if self.filter_type == "Full match":
+            return (string_to_filter, self.penality) if string_to_filter == self.filter_str else None
+
+        elif self.filter_type == "Match partially":
+            return (self.filter_str, self.penality) if self.filter_str in string_to_filter else None
+
+        elif self.filter_type == "Regular Expression":
+            match = self.compiled_regex.search(string_to_filter)
+            return (match.group(0), self.penality) if match else None
+
+        else:
+            print(f"Unknown filter type {self.filter_type}")
+        return None
+
+
+class FilterMatch(NamedTuple):
+    filter: Filter
+    part: str  # the part of the message or name which triggered the filter
+    penality: str
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton, finds all occurrences of a set of substrings in a single pass over the text.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]  # indices of all patterns ending in this state
+
+        for idx, pattern in enumerate(patterns):
+            if not pattern:
+                continue
+            node = 0
+            for char in pattern:
+                nxt = self._goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                    self._goto[node][char] = nxt
+                node = nxt
+            self._out[node] += (idx,)
+
+        # Breadth first, so the fail state of every node is final before its children are visited
+        todo = deque(self._goto[0].values())
+        while todo:
+            node = todo.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while char not in self._goto[fail] and fail:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[child] = fail
+                if self._out[fail]:
+                    self._out[child] += self._out[fail]
+                todo.append(child)
+
+    def __len__(self):
+        return len(self._goto)
+
+    def state(self) -> tuple:
+        """:return: The automaton tables, only built from lists, dicts, tuples, str and int so they can be marshaled"""
+        return self._goto, self._fail, self._out
+
+    @classmethod
+    def from_state(cls, state: tuple) -> "AhoCorasick":
+        automaton = cls.__new__(cls)
+        automaton._goto, automaton._fail, automaton._out = state
+        return automaton
+
+    def findall(self, text: str) -> List[int]:
+        """:return: Indices of all patterns found in text, in the order they end in the text"""
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        found = []
+        node = 0
+        for char in text:
+            while True:
+                nxt = goto[node].get(char)
+                if nxt is not None:
+                    node = nxt
+                    break
+                if not node:
+                    break
+                node = fail[node]
+            if out[node]:
+                found.extend(out[node])
+        return found
+
+    def search(self, text: str) -> int:
+        """:return: Index of the first pattern found in text, -1 if there is none"""
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        node = 0
+        for char in text:
+            while True:
+                nxt = goto[node].get(char)
+                if nxt is not None:
+                    node = nxt
+                    break
+                if not node:
+                    break
+                node = fail[node]
+            if out[node]:
+                return out[node][0]
+        return -1
+
+
+# A { that doesn't start a quantifier is a literal character
+_QUANTIFIER = re.compile(r"\{\d*(?:,\d*)?\}")
+_NUMERIC_ESCAPE = re.compile(r"\\(?:x[0-9a-fA-F]{0,2}|u[0-9a-fA-F]{0,4}|U[0-9a-fA-F]{0,8}|N\{[^}]*\}?|[0-9]{1,3})")
+
+
+def required_literal(pattern: str) -> str:
+    """
+    :param pattern: Regular expression
+    :return: The longest string every match of pattern contains, "" if none could be determined
+
+    Deliberately conservative: groups, character classes, escapes and optional characters
+    end a literal run, top level alternations and inline flags disable the extraction.
+    """
+    runs = []
+    run = []
+    idx = 0
+    length = len(pattern)
+    while idx < length:
+        char = pattern[idx]
+        if char == "\\":
+            escaped = pattern[idx + 1:idx + 2]
+            if escaped and not escaped.isalnum():
+                run.append(escaped)
+                idx += 2
+                continue
+            # Character codes, named characters, octal escapes and backreferences end the run as a whole
+            match = _NUMERIC_ESCAPE.match(pattern, idx)
+            idx = match.end() if match else idx + 2
+        elif char == "[":
+            idx += 1
+            if pattern[idx:idx + 1] == "^":
+                idx += 1
+            if pattern[idx:idx + 1] == "]":
+                idx += 1
+            while idx < length and pattern[idx] != "]":
+                idx += 2 if pattern[idx] == "\\" else 1
+            idx += 1
+        elif char == "(":
+            if pattern[idx + 1:idx + 2] == "?" and pattern[idx + 2:idx + 3] not in (":", "P", "<", "=", "!", ""):
+                return ""  # inline flags like (?i) change what matches
+            depth = 0
+            while idx < length:
+                if pattern[idx] == "\\":
+                    idx += 1
+                elif pattern[idx] == "[":
+                    idx += 1
+                    while idx < length and pattern[idx] != "]":
+                        idx += 2 if pattern[idx] == "\\" else 1
+                elif pattern[idx] == "(":
+                    depth += 1
+                elif pattern[idx] == ")":
+                    depth -= 1
+                    if not depth:
+                        break
+                idx += 1
+            idx += 1
+        elif char == "|":
+            return ""
+        elif char in "*?" or (char == "{" and _QUANTIFIER.match(pattern, idx)):
+            if run:
+                run.pop()  # the previous character is optional
+            idx = _QUANTIFIER.match(pattern, idx).end() if char == "{" else idx + 1
+        elif char == "+":
+            idx += 1
+        elif char in ".^$)":
+            idx += 1
+        else:
+            run.append(char)
+            idx += 1
+            continue
+        if run:
+            runs.append("".join(run))
+            run = []
+    if run:
+        runs.append("".join(run))
+    return max(runs, key=len, default="")
+
+
+class _TargetFilters:
+    """
+    All filters for one target. Full matches go into a hash table, partial matches and the required
+    literals of regular expressions into one Aho-Corasick automaton. A regular expression is only run
+    if its literal was found, the ones without a literal are merged into one alternation.
+
+    The analysis is kept as plain indices into the filter list (see state), regular expressions are
+    only compiled the first time they are needed.
+    """
+    MIN_LITERAL_LENGTH = 3
+
+    def __init__(self, filters: List[Filter], state: dict = None):
+        self.filters = filters
+        if state is None:
+            state = self.analyze(filters)
+        self._state = state
+
+        self.full: Dict[str, Filter] = {}
+        for idx in state["full"]:
+            self.full.setdefault(filters[idx].filter_str, filters[idx])
+        self.partial: List[Filter] = [filters[idx] for idx in state["partial"]]
+        self.anchored: List[List[int]] = state["anchored"]
+        self.combined_filters: List[Filter] = [filters[idx] for idx in state["combined"]]
+        self.separate: List[int] = state["separate"]
+        self.automaton = AhoCorasick.from_state(state["automaton"]) if state["automaton"] else None
+
+        self._regexes: Dict[int, re.Pattern] = {}
+        self._combined_regex = None
+
+    @classmethod
+    def analyze(cls, filters: List[Filter]) -> dict:
+        """:return: The marshalable matcher state for filters"""
+        state = {"full": [], "partial": [], "anchored": [], "combined": [], "separate": []}
+        literals: Dict[str, int] = {}
+        for idx, fltr in enumerate(filters):
+            if fltr.filter_type == "Full match":
+                state["full"].append(idx)
+            elif fltr.filter_type == "Match partially":
+                state["partial"].append(idx)
+            elif fltr.filter_type == "Regular Expression":
+                try:
+                    compiled = re.compile(fltr.filter_str)
+                except re.error as e:
+                    print(f"Invalid regular expression {fltr.filter_str!r}: {e}")
+                    continue
+                literal = required_literal(fltr.filter_str)
+                if len(literal) >= cls.MIN_LITERAL_LENGTH:
+                    if literal not in literals:
+                        literals[literal] = len(state["anchored"])
+                        state["anchored"].append([])
+                    state["anchored"][literals[literal]].append(idx)
+                elif compiled.groups or compiled.flags != re.UNICODE:
+                    # Groups (backreferences) and inline flags can't be merged into one alternation
+                    state["separate"].append(idx)
+                else:
+                    state["combined"].append(idx)
+            else:
+                print(f"Unknown filter type {fltr.filter_type}")
+
+        if state["combined"]:
+            try:
+                re.compile(cls._alternation([filters[idx] for idx in state["combined"]]))
+            except re.error:
+                state["separate"].extend(state["combined"])
+                state["combined"] = []
+
+        patterns = [filters[idx].filter_str for idx in state["partial"]] + list(literals)
+        state["automaton"] = AhoCorasick(patterns).state() if patterns else None
+        return state
+
+    @staticmethod
+    def _alternation(filters: List[Filter]) -> str:
+        return "|".join(f"({fltr.filter_str})" for fltr in filters)
+
+    def state(self) -> dict:
+        return self._state
+
+    def _regex(self, idx: int) -> re.Pattern:
+        compiled = self._regexes.get(idx)
+        if compiled is None:
+            compiled = self._regexes[idx] = re.compile(self.filters[idx].filter_str)
+        return compiled
+
+    def match(self, string: str, full_string: str) -> Optional[FilterMatch]:
+        fltr = self.full.get(full_string)
+        if fltr is not None:
+            return FilterMatch(fltr, full_string, fltr.penality)
+
+        if self.automaton is not None:
+            hits = self.automaton.findall(string)
+            if hits:
+                partial_count = len(self.partial)
+                for idx in hits:
+                    if idx < partial_count:
+                        fltr = self.partial[idx]
+                        return FilterMatch(fltr, fltr.filter_str, fltr.penality)
+                for idx in hits:
+                    for filter_idx in self.anchored[idx - partial_count]:
+                        match = self._regex(filter_idx).search(string)
+                        if match:
+                            fltr = self.filters[filter_idx]
+                            return FilterMatch(fltr, match.group(0), fltr.penality)
+
+        if self.combined_filters:
+            if self._combined_regex is None:
+                self._combined_regex = re.compile(self._alternation(self.combined_filters))
+            match = self._combined_regex.search(string)
+            if match:
+                fltr = self.combined_filters[match.lastindex - 1]
+                return FilterMatch(fltr, match.group(0), fltr.penality)
+
+        for filter_idx in self.separate:
+            match = self._regex(filter_idx).search(string)
+            if match:
+                fltr = self.filters[filter_idx]
+                return FilterMatch(fltr, match.group(0), fltr.penality)
+        return None
+
+
+class CompiledFilterSet:
+    """
+    A list of filters compiled for matching in time (mostly) independent of the number of filters:
+    full matches are a dict lookup, partial matches and regular expression literals one Aho-Corasick
+    pass per target.
+    """
+
+    def __init__(self, filters: Iterable[Filter] = (), state: dict = None):
+        """
+        :param filters: Filters to compile
+        :param state: Result of state() for the same filters, skips the analysis
+        """
+        self.filters = list(filters)
+        state = state or {}
+        self._message = _TargetFilters([fltr for fltr in self.filters if fltr.target == "Message"], state.get("Message"))
+        self._author = _TargetFilters([fltr for fltr in self.filters if fltr.target == "Author"], state.get("Author"))
+
+    def __len__(self):
+        return len(self.filters)
+
+    def state(self) -> dict:
+        return {"Message": self._message.state(), "Author": self._author.state()}
+
+    def match(self, content: str, author: str) -> Optional[FilterMatch]:
+        """
+        :param content: Message content
+        :param author: Login of the message author
+        :return: The first filter triggered by the message or None
+        """
+        if content:
+            content = content.strip()
+            result = self._message.match(content, content)
+            if result:
+                return result
+        if author:
+            return self._author.match(author, author)
+        return None
+
+
+class FilterBundle:
+    """
+    Versioned on-disk filter list.
+
+    The filters are stored as JSON ({"version": 1, "filters": [...]}), the compiled matcher is cached
+    next to it keyed by the sha256 of the filter list, so unchanged filters are never analyzed twice.
+    Both are only read when first accessed.
+    """
+    VERSION = 1
+
+    def __init__(self, path: str = "data/chat_filters.json", legacy_path: str = "data/chat_filters.pickle"):
+        self.path = path
+        self.cache_path = os.path.splitext(path)[0] + ".cache"
+        self.legacy_path = legacy_path
+        self._filters: Optional[List[Filter]] = None
+        self._matcher: Optional[CompiledFilterSet] = None
+
+    @property
+    def filters(self) -> List[Filter]:
+        if self._filters is None:
+            self._filters = self.load()
+        return self._filters
+
+    @property
+    def matcher(self) -> CompiledFilterSet:
+        if self._matcher is None:
+            self._matcher = self.load_matcher()
+        return self._matcher
+
+    @staticmethod
+    def content_hash(filters: Iterable[Filter]) -> str:
+        content = hashlib.sha256()
+        for fltr in filters:
+            content.update("\0".join((fltr.filter_str, fltr.filter_type, fltr.target, fltr.penality)).encode("utf-8"))
+            content.update(b"\n")
+        return content.hexdigest()
+
+    def load(self) -> List[Filter]:
+        if not os.path.isfile(self.path):
+            if os.path.isfile(self.legacy_path):
+                return self.migrate_legacy()
+            print("No filter file")
+            return []
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Filter file corrupt: {e}")
+            return []
+        if data.get("version", 0) > self.VERSION:
+            print(f"Filter file version {data.get('version')} is newer than {self.VERSION}, unknown fields are ignored")
+        filters = []
+        for entry in data.get("filters", []):
+            try:
+                filters.append(Filter.from_dict(entry))
+            except (KeyError, TypeError, AttributeError):
+                print(f"Skipped invalid filter {entry!r}")
+        return filters
+
+    def save(self, filters: Iterable[Filter]):
+        self._filters = list(filters)
+        self._matcher = None
+        _atomic_write(self.path, json.dumps({"version": self.VERSION, "filters": [fltr.to_dict() for fltr in self._filters]}, indent="  ").encode("utf-8"))
+
+    def migrate_legacy(self) -> List[Filter]:
+        """Converts the pickled Filter list of older versions, the pickle is kept as is"""
+        try:
+            with open(self.legacy_path, "rb") as file:
+                legacy_filters = pickle.load(file)
+            filters = [Filter(fltr.filter_str, fltr.filter_type, fltr.target, fltr.penality) for fltr in legacy_filters]
+        except Exception as e:
+            print(f"Failed to migrate {self.legacy_path}: {e}")
+            return []
+        self.save(filters)
+        print(f"Migrated {len(filters)} filters to {self.path}")
+        return filters
+
+    def _cache_key(self, content_hash: str) -> tuple:
+        # marshal data is only guaranteed to be readable by the same python version
+        return MATCHER_VERSION, sys.version_info[:2], content_hash
+
+    def load_matcher(self) -> CompiledFilterSet:
+        """:return: The compiled filters, from the cache if it matches the current filter list"""
+        filters = self.filters
+        key = self._cache_key(self.content_hash(filters))
+        try:
+            with open(self.cache_path, "rb") as file:
+                cached_key, state = marshal.loads(file.read())
+            if tuple(cached_key) == key:
+                return CompiledFilterSet(filters, state)
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+
+        matcher = CompiledFilterSet(filters)
+        try:
+            _atomic_write(self.cache_path, marshal.dumps((key, matcher.state())))
+        except OSError as e:
+            print(f"Failed to write filter cache: {e}")
+        return matcher
+
+
+def _atomic_write(path: str, data: bytes):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(data)
+    os.replace(tmp_path, path)
@@ -0,0 +1,172 @@
+import gzip
+import json
+import lzma
+import os
+import queue
+import threading
+import time
+from typing import Dict, IO, List, Tuple
+
+import twitchio
+
+FORMATS = ("jsonl", "irc")
+COMPRESSIONS = ("gz", "xz", "none")
+
+
+class _Segment:
+    __slots__ = ("path", "file", "period", "last_flush", "dirty")
+
+    def __init__(self, path: str, file: IO[bytes], period: int):
+        self.path = path
+        self.file = file
+        self.period = period
+        self.last_flush = time.monotonic()
+        self.dirty = False
+
+
+class ChatLogWriter(threading.Thread):
+    """
+    Background thread writing chat messages to per channel, time rotated log segments.
+
+    The bot only hands the message over with log(), which never blocks unless policy is "block":
+    with the default "drop" policy messages are counted as dropped once max_queue messages are
+    waiting. Serializing, compression and disk IO happen in this thread, one write per channel
+    and batch. Segments are named <directory>/<channel>/<YYYY-mm-dd_HH-MM>.<format>[.<compression>],
+    reopening a segment appends a new gzip member / xz stream, so files stay valid after a restart.
+    gzip segments are readable up to the last flush, xz segments only once they are rotated or closed.
+    """
+    _STOP = object()
+
+    def __init__(self, directory: str = "data/chatlogs", log_format: str = "jsonl", compression: str = "gz", rotate_seconds: int = 3600,
+                 max_queue: int = 100000, policy: str = "drop", batch_size: int = 1000, flush_interval: float = 5):
+        super(ChatLogWriter, self).__init__(name="ChatLogWriter", daemon=True)
+        if log_format not in FORMATS:
+            raise ValueError(f"Unknown chat log format {log_format}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown chat log compression {compression}")
+        self.directory = directory
+        self.log_format = log_format
+        self.compression = compression
+        self.rotate_seconds = max(int(rotate_seconds), 60)
+        self.policy = policy
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(max_queue)
+        self._segments: Dict[str, _Segment] = {}
+        self.written = 0
+        self.dropped = 0
+
+    def log(self, message: twitchio.Message) -> bool:
+        """
+        :return: False if the message was dropped because the writer can't keep up
+
+        Called from the bot loop, only the fields needed later are copied.
+        """
+        if self.log_format == "irc":
+            record = (message.channel.name, time.time(), message.raw_data)
+        else:
+            author = message.author
+            record = (message.channel.name, time.time(), (author.name if author else "", message.content, message.tags or {}))
+        if self.policy == "block":
+            self._queue.put(record)
+            return True
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def stop(self, timeout: float = 10):
+        """Writes everything queued so far and closes all segments"""
+        try:
+            self._queue.put(self._STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self.join(timeout)
+
+    def run(self):
+        running = True
+        while running:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._flush(force=True)
+                continue
+            batch = []
+            while item is not self._STOP:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            else:
+                running = False
+            if batch:
+                self._write(batch)
+            self._flush()
+        for segment in self._segments.values():
+            segment.file.close()
+        self._segments.clear()
+
+    def _write(self, batch: List[Tuple]):
+        lines_by_channel: Dict[Tuple[str, int], List[str]] = {}
+        for channel, timestamp, data in batch:
+            key = (channel, int(timestamp // self.rotate_seconds))
+            if self.log_format == "irc":
+                line = data
+            else:
+                user, content, tags = data
+                # Lazy twitchio tags are only parsed here, in the writer thread
+                line = json.dumps({"ts": timestamp, "channel": channel, "user": user, "content": content, "tags": dict(tags)}, ensure_ascii=False)
+            lines_by_channel.setdefault(key, []).append(line)
+
+        for (channel, period), lines in lines_by_channel.items():
+            try:
+                segment = self._segment(channel, period)
+                segment.file.write(("\n".join(lines) + "\n").encode("utf-8"))
+                segment.dirty = True
+                self.written += len(lines)
+            except OSError as e:
+                print(f"Failed to write chat log for {channel}: {e}")
+
+    def _segment(self, channel: str, period: int) -> _Segment:
+        segment = self._segments.get(channel)
+        if segment is not None:
+            if segment.period == period:
+                return segment
+            segment.file.close()  # rotate
+            del self._segments[channel]
+
+        channel_directory = os.path.join(self.directory, channel or "_")
+        os.makedirs(channel_directory, exist_ok=True)
+        name = time.strftime("%Y-%m-%d_%H-%M", time.gmtime(period * self.rotate_seconds))
+        path = os.path.join(channel_directory, f"{name}.{self.log_format}")
+        if self.compression == "gz":
+            path += ".gz"
+            file = gzip.open(path, "ab", compresslevel=6)
+        elif self.compression == "xz":
+            path += ".xz"
+            file = lzma.open(path, "ab")
+        else:
+            file = open(path, "ab")
+        segment = self._segments[channel] = _Segment(path, file, period)
+        return segment
+
+    def _flush(self, force: bool = False):
+        """Makes the written lines readable on disk at most every flush_interval seconds per segment, closes expired segments"""
+        now = time.monotonic()
+        period = int(time.time() // self.rotate_seconds)
+        for channel, segment in list(self._segments.items()):
+            try:
+                if segment.period < period:
+                    segment.file.close()
+                    del self._segments[channel]
+                elif segment.dirty and (force or now - segment.last_flush >= self.flush_interval):
+                    segment.file.flush()
+                    segment.dirty = False
+                    segment.last_flush = now
+            except OSError as e:
+                print(f"Failed to flush chat log {segment.path}: {e}")
@@ -0,0 +1,206 @@
+import asyncio
+import concurrent.futures
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from twitchio.dataclasses import Channel
+from twitchio.ext import commands
+from twitchio.irc import Tags
+from twitchio.websocket import SendQueue
+
+
+class ChatRecord(NamedTuple):
+    """A chat message as sent from a shard to the aggregator, the tags stay unparsed"""
+    channel: str
+    author: str
+    content: str
+    tags: str  # raw IRCv3 tags, without the leading @
+
+
+class _ShardBot(commands.Bot):
+    """
+    Runs in a shard process: reads the PRIVMSGs of its channels and sends them to the aggregator as
+    batches of ChatRecords, without building Message or User objects.
+    """
+
+    def __init__(self, index: int, token: str, client_id: str, nickname: str, channels: List[str], records: multiprocessing.Queue,
+                 commands_queue: multiprocessing.Queue, batch_size: int, flush_interval: float):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        super().__init__(irc_token=f"oauth:{token}", client_id=client_id, nick=nickname, prefix="!", initial_channels=channels,
+                         loop=loop, inline_dispatch=True)
+        self.index = index
+        self.run_flag = [True]
+        self._records = records
+        self._commands = commands_queue
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._batch: List[ChatRecord] = []
+        self._flush_handle = None
+        self.dropped = 0
+        self._ws._actions["PRIVMSG"] = self._record
+
+    async def _record(self, raw, channel, author, content, tags, badges):
+        self._batch.append(ChatRecord(channel.name, author, content, tags.raw if tags is not None else ""))
+        if len(self._batch) >= self._batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = self.loop.call_later(self._flush_interval, self._flush)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._batch:
+            return
+        try:
+            self._records.put_nowait((self.index, self._batch, self.dropped))
+        except queue.Full:  # the aggregator can't keep up
+            self.dropped += len(self._batch)
+        self._batch = []
+
+    def read_commands(self):
+        """Runs in a thread of the shard process, executes the commands of the aggregator on the bot loop"""
+        while True:
+            command = self._commands.get()
+            if command is None:
+                self.loop.call_soon_threadsafe(self.run_flag.__setitem__, 0, False)
+                return
+            channel, content, priority = command
+            asyncio.run_coroutine_threadsafe(self._ws.send_privmsg(channel, content, priority), self.loop)
+
+    async def event_ready(self):
+        print(f"Chat shard {self.index} ready, {len(self.initial_channels)} channels")
+
+    async def event_message(self, message):
+        pass  # echoes of sent commands
+
+
+def run_shard(index: int, token: str, client_id: str, nickname: str, channels: List[str], records: multiprocessing.Queue,
+              commands_queue: multiprocessing.Queue, batch_size: int = 200, flush_interval: float = 0.05):
+    """Entry point of a shard process, returns once the aggregator sends None"""
+    bot = _ShardBot(index, token, client_id, nickname, channels, records, commands_queue, batch_size, flush_interval)
+    threading.Thread(target=bot.read_commands, name="ChatShardCommands", daemon=True).start()
+    try:
+        bot.run(None, bot.run_flag)
+    finally:
+        bot._flush()
+
+
+class _ShardSocket:
+    """Stands in for the WebsocketConnection of sharded channels, messages are sent by the shard that joined the channel"""
+
+    def __init__(self, shards: "ChatShards"):
+        self._shards = shards
+        self._channel_cache = {}  # the shards join the channels, and rate limit what they send
+        self._websocket = None
+
+    async def send_privmsg(self, channel: str, content: str, priority: int = None):
+        self._shards.send(channel, content, SendQueue.priority_of(content) if priority is None else priority)
+
+
+class ChatShards:
+    """
+    Reads the bot channels in worker processes, each with its own twitchio connection.
+
+    Channels are spread evenly across the shards. Every shard sends its PRIVMSGs as batches of
+    ChatRecords over one multiprocessing queue (at most batch_size records or flush_interval seconds
+    old) to the aggregator, which runs on the bot's event loop and dispatches them as regular
+    Messages, so the filters, the chat log and the UI see the same events as without shards.
+    Messages sent to a sharded channel, e.g. penalties, are sent by its shard.
+    """
+
+    def __init__(self, bot: commands.Bot, count: int, token: str, client_id: str, nickname: str, channels: List[str],
+                 batch_size: int = 200, flush_interval: float = 0.05, max_batches: int = 10000):
+        self._bot = bot
+        context = multiprocessing.get_context("spawn")  # the bot's process runs Qt and several threads
+        self._records = context.Queue(max_batches)
+        channels = sorted({channel.strip().lower() for channel in channels if channel.strip()})
+        count = max(min(count, len(channels)), 1)
+        self._commands = [context.Queue() for _ in range(count)]
+        self.assignment: Dict[str, int] = {channel: idx % count for idx, channel in enumerate(channels)}
+        self._processes = [context.Process(target=run_shard, name=f"ChatShard-{idx}", daemon=True,
+                                           args=(idx, token, client_id, nickname, channels[idx::count], self._records, self._commands[idx],
+                                                 batch_size, flush_interval))
+                           for idx in range(count)]
+        self._socket = _ShardSocket(self)
+        self._channels: Dict[str, Channel] = {}
+        self._reader: Optional[threading.Thread] = None
+        self.received = 0
+        self.dropped = [0] * count
+
+    def __len__(self):
+        return len(self._processes)
+
+    def start(self):
+        for process in self._processes:
+            process.start()
+
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        """Starts aggregating on loop, the records sent meanwhile are waiting in the queue"""
+        if self._reader is None:
+            self._reader = threading.Thread(target=self._read_records, args=(loop,), name="ChatShardRecords", daemon=True)
+            self._reader.start()
+
+    def stop(self, timeout: float = 10):
+        for commands_queue in self._commands:
+            commands_queue.put(None)
+        try:
+            self._records.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        deadline = time.monotonic() + timeout
+        if self._reader is not None:
+            self._reader.join(timeout)
+        for process in self._processes:
+            if process.is_alive():
+                process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                process.terminate()
+
+    def channel(self, name: str) -> Optional[Channel]:
+        """:return: The Channel of a sharded channel, None if no shard reads it"""
+        channel = self._channels.get(name)
+        if channel is None and name in self.assignment:
+            channel = self._channels[name] = Channel(name=name, ws=self._socket, http=self._bot.http)
+        return channel
+
+    def send(self, channel: str, content: str, priority: int = SendQueue.CHAT):
+        shard = self.assignment.get(channel)
+        if shard is None:
+            print(f"No chat shard reads {channel}, dropped: {content}")
+            return
+        self._commands[shard].put((channel, content, priority))
+
+    def _read_records(self, loop: asyncio.AbstractEventLoop):
+        """Runs in its own thread, a batch is only taken from the queue once the previous one was dispatched"""
+        while True:
+            item = self._records.get()
+            if item is None:
+                return
+            shard, records, dropped = item
+            self.dropped[shard] = dropped
+            try:
+                future = asyncio.run_coroutine_threadsafe(self._dispatch(records), loop)
+            except RuntimeError:  # the loop was closed
+                return
+            try:
+                future.result()
+            except concurrent.futures.CancelledError:  # the loop is shutting down
+                return
+            except Exception as e:
+                print(f"Failed to dispatch {len(records)} messages of chat shard {shard}: {e!r}")
+
+    async def _dispatch(self, records: List[ChatRecord]):
+        ws = self._bot._ws
+        self.received += len(records)
+        for channel, author, content, tags in records:
+            chan = self.channel(channel)
+            raw = f"@{tags} :{author}!{author}@{author}.tmi.twitch.tv PRIVMSG #{channel} :{content}"
+            try:
+                await ws._dispatch("message", ws._make_message(raw, chan, author, content, Tags(tags) if tags else None))
+            except Exception as e:
+                await ws.event_error(e, raw)
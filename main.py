@@ -60,7 +60,11 @@ class Setup_wizzard(QtWidgets.QWidget):
 
 def main():
     # Default settings
-    settings = {"Style Sheet": "Stylesheets/DarkTheme/DarkTheme.qss", "Window Size": (800, 600), "Maximized": False, "Export Directory": "Exports/", "Setup required": True}
+    settings = {"Style Sheet": "Stylesheets/DarkTheme/DarkTheme.qss", "Window Size": (800, 600), "Maximized": False, "Export Directory": "Exports/", "Setup required": True,
+                "Flood Protection": {"Enabled": False, "Messages": 5, "Seconds": 3, "Penalty": "Timeout 1m"},
+                "Duplicate Protection": {"Enabled": False, "Users": 5, "Seconds": 30, "Min Length": 20, "Penalty": "Delete Message"},
+                "Chat Log": {"Enabled": True, "Format": "jsonl", "Compression": "gz", "Rotate Minutes": 60},
+                "Chat Shards": 0}
     _settings = {}
     try:
         with open("settings.json", "r") as settings_file:
@@ -0,0 +1,197 @@
+import datetime
+from array import array
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer, Signal
+
+
+def parse_timestamp(value: Union[str, int, float, None]) -> float:
+    """
+    :param value: ISO 8601 string as sent by PubSub, epoch seconds or None
+    :return: Epoch seconds, 0.0 if the value is empty or can't be parsed
+    """
+    if not value:
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = value.strip().replace("Z", "+00:00")
+    # PubSub sends nanoseconds, fromisoformat only accepts up to microseconds
+    if "." in value:
+        head, _, tail = value.partition(".")
+        digits = len(tail) - len(tail.lstrip("0123456789"))
+        tail = tail[:min(digits, 6)] + tail[digits:]
+        value = f"{head}.{tail}"
+    try:
+        timestamp = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        return 0.0
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=datetime.timezone.utc)
+    return timestamp.timestamp()
+
+
+def format_timestamp(timestamp: float) -> str:
+    if not timestamp:
+        return ""
+    return datetime.datetime.utcfromtimestamp(timestamp).isoformat(timespec="seconds") + "Z"
+
+
+class ModActionStore:
+    """
+    Append-only columnar storage for moderator actions.
+
+    Every column is a flat array, strings (user names, actions, moderators, info) are interned
+    into a shared string table and stored as ids. Appending is O(1) and rows are never moved.
+    """
+    COLUMNS = ("User", "UserID", "Action", "Moderator", "Timestamp", "Info")
+
+    def __init__(self):
+        self._strings: List[str] = [""]
+        self._string_ids: Dict[str, int] = {"": 0}
+
+        self.users = array("L")
+        self.user_ids = array("Q")  # 0 if the action has no target user id
+        self.actions = array("L")
+        self.moderators = array("L")
+        self.timestamps = array("d")  # epoch seconds, 0.0 if unknown
+        self.infos = array("L")
+
+    def __len__(self):
+        return len(self.actions)
+
+    def intern(self, string: str) -> int:
+        string = string or ""
+        try:
+            return self._string_ids[string]
+        except KeyError:
+            string_id = len(self._strings)
+            self._strings.append(string)
+            self._string_ids[string] = string_id
+            return string_id
+
+    def append(self, user: str = "", user_id: Union[int, str] = 0, action: str = "", moderator: str = "", timestamp: Union[str, float] = 0.0, info: str = "") -> int:
+        self.users.append(self.intern(user))
+        self.user_ids.append(int(user_id) if user_id else 0)
+        self.actions.append(self.intern(action))
+        self.moderators.append(self.intern(moderator))
+        self.timestamps.append(parse_timestamp(timestamp))
+        self.infos.append(self.intern(info))
+        return len(self) - 1
+
+    def extend(self, rows: Iterable[Tuple]):
+        for row in rows:
+            self.append(*row)
+
+    def value(self, idx: int, column: int) -> str:
+        if column == 0:
+            return self._strings[self.users[idx]]
+        elif column == 1:
+            user_id = self.user_ids[idx]
+            return str(user_id) if user_id else ""
+        elif column == 2:
+            return self._strings[self.actions[idx]]
+        elif column == 3:
+            return self._strings[self.moderators[idx]]
+        elif column == 4:
+            return format_timestamp(self.timestamps[idx])
+        elif column == 5:
+            return self._strings[self.infos[idx]]
+        raise IndexError(column)
+
+    def row(self, idx: int) -> List[str]:
+        return [self.value(idx, column) for column in range(len(self.COLUMNS))]
+
+    def rows(self) -> Iterator[List[str]]:
+        """Yields all rows as display strings, newest first."""
+        for idx in range(len(self) - 1, -1, -1):
+            yield self.row(idx)
+
+    def unique_user_ids(self) -> List[int]:
+        return [user_id for user_id in set(self.user_ids) if user_id]
+
+    def set_user_names(self, names_by_id: Dict[int, str]) -> int:
+        """
+        :param names_by_id: Dict of user id:name pairs
+        :return: Number of rows changed
+
+        Fills the User column of every row whose user id is in names_by_id
+        """
+        name_ids = {user_id: self.intern(name) for user_id, name in names_by_id.items()}
+        changed = 0
+        for idx, user_id in enumerate(self.user_ids):
+            name_id = name_ids.get(user_id)
+            if name_id is not None and self.users[idx] != name_id:
+                self.users[idx] = name_id
+                changed += 1
+        return changed
+
+
+class ModActionTableModel(QAbstractTableModel):
+    """
+    Table model over a ModActionStore, showing the newest action in the first row.
+
+    Rows are queued and inserted into the store in batches every flush_interval milliseconds,
+    so a burst of PubSub events results in a single model update.
+    """
+    rows_flushed = Signal(int)
+
+    def __init__(self, store: ModActionStore = None, flush_interval: int = 100, parent=None):
+        super(ModActionTableModel, self).__init__(parent)
+        self.store = store if store is not None else ModActionStore()
+        self._pending: List[Tuple] = []
+
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(flush_interval)
+        self._flush_timer.timeout.connect(self.flush)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.store)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.store.COLUMNS)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        return self.store.value(len(self.store) - 1 - index.row(), index.column())
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.store.COLUMNS[section]
+        return str(section + 1)
+
+    def queue_row(self, user: str = "", user_id: Union[int, str] = 0, action: str = "", moderator: str = "", timestamp: Union[str, float] = 0.0, info: str = ""):
+        self._pending.append((user, user_id, action, moderator, timestamp, info))
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def flush(self):
+        self._flush_timer.stop()
+        if not self._pending:
+            return
+        count = len(self._pending)
+        self.beginInsertRows(QModelIndex(), 0, count - 1)
+        self.store.extend(self._pending)
+        self._pending.clear()
+        self.endInsertRows()
+        self.rows_flushed.emit(count)
+
+    def set_store(self, store: ModActionStore):
+        """Replaces the shown actions, rows still queued for the old store are discarded"""
+        self.beginResetModel()
+        self._flush_timer.stop()
+        self._pending.clear()
+        self.store = store
+        self.endResetModel()
+
+    def rows(self) -> Iterator[List[str]]:
+        self.flush()
+        return self.store.rows()
+
+    def set_user_names(self, names_by_id: Dict[int, str]):
+        self.flush()
+        if self.store.set_user_names(names_by_id):
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.store) - 1, 0))
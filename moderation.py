@@ -0,0 +1,137 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Tuple
+
+import twitchio
+from chatfilter import Filter
+from twitchio.websocket import SendQueue
+
+# Ordered by severity
+PENALTIES = Filter.FILTER_PENALITYS
+TIMEOUT_DURATIONS = {"Timeout 1m": 60, "Timeout 10m": 600}
+
+
+class Penalty(NamedTuple):
+    channel: str
+    user: str
+    penality: str
+    message_ids: Tuple[str, ...] = ()  # messages to delete, only used by "Delete Message"
+    reason: str = ""
+
+    @property
+    def severity(self) -> int:
+        return PENALTIES.index(self.penality)
+
+
+class ModerationQueue:
+    """
+    Rate limited queue of penalties, sent from the bot's event loop.
+
+    Penalties are deduplicated per channel and user: while one is pending, a less severe one is dropped
+    and a more severe one replaces it. After a penalty was sent, equal or lesser penalties for the same
+    user are ignored until it expires (or for dedup_window seconds).
+    """
+
+    def __init__(self, bot, interval: float, dedup_window: float = 30):
+        self._bot = bot
+        self.interval = interval
+        self.dedup_window = dedup_window
+        self._pending: "OrderedDict[Tuple[str, str], Penalty]" = OrderedDict()
+        self._recent: Dict[Tuple[str, str], Tuple[int, float]] = {}
+        self._wakeup = None
+        self._task = None
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def put(self, penalty: Penalty) -> bool:
+        """
+        :return: True if the penalty was queued, False if it is covered by a pending or recent penalty
+
+        Must be called from the bot's event loop.
+        """
+        key = (penalty.channel, penalty.user.lower())
+        severity = penalty.severity
+        recent = self._recent.get(key)
+        if recent and recent[0] >= severity and recent[1] > time.monotonic() and penalty.penality != "Delete Message":
+            self.dropped += 1
+            return False
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            if pending.penality == penalty.penality == "Delete Message":
+                penalty = pending._replace(message_ids=pending.message_ids + penalty.message_ids)
+            elif pending.severity >= severity:
+                self.dropped += 1
+                return False
+        self._pending[key] = penalty
+
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_event_loop().create_task(self._run())
+        self._wakeup.set()
+        return True
+
+    async def _run(self):
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            key, penalty = self._pending.popitem(last=False)
+            try:
+                # Queued behind manual moderation, ahead of chat messages
+                with SendQueue.priority(SendQueue.PENALTY):
+                    sent = await self._send(penalty)
+            except twitchio.TwitchIOBException as e:
+                # Not joined, retry later unless a more severe penalty got queued meanwhile
+                print(f"Failed to apply {penalty.penality} to {penalty.user} in {penalty.channel}: {e}")
+                if key not in self._pending:
+                    self._pending[key] = penalty
+                    self._pending.move_to_end(key, last=False)
+                await asyncio.sleep(self.interval * 5)
+                continue
+            except Exception as e:
+                # The queue has to keep running, the penalty is given up
+                print(f"Failed to apply {penalty.penality} to {penalty.user} in {penalty.channel}: {e!r}")
+                self.failed += 1
+                await asyncio.sleep(self.interval)
+                continue
+
+            if not sent:
+                self.dropped += 1
+                continue
+
+            self.sent += 1
+            now = time.monotonic()
+            self._recent[key] = (penalty.severity, now + max(TIMEOUT_DURATIONS.get(penalty.penality, 0), self.dedup_window))
+            if len(self._recent) > 10000:
+                self._recent = {key: value for key, value in self._recent.items() if value[1] > now}
+            await asyncio.sleep(self.interval)
+
+    async def _send(self, penalty: Penalty) -> bool:
+        """:return: False if there was nothing to send"""
+        channel: twitchio.Channel = self._bot.get_channel(penalty.channel)
+        if channel is None:
+            raise twitchio.ClientError(f"Not joined to channel {penalty.channel}")
+
+        if penalty.penality == "Delete Message":
+            if not penalty.message_ids:
+                return False
+            for idx, message_id in enumerate(penalty.message_ids):
+                if idx:
+                    await asyncio.sleep(self.interval)
+                await channel.send(f"/delete {message_id}")
+        elif penalty.penality in TIMEOUT_DURATIONS:
+            await channel.timeout(penalty.user, TIMEOUT_DURATIONS[penalty.penality], penalty.reason)
+        elif penalty.penality == "Ban":
+            await channel.ban(penalty.user, penalty.reason)
+        else:
+            print(f"Unknown penality {penalty.penality}")
+            return False
+        return True
@@ -0,0 +1,217 @@
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+class FloodDetector:
+    """
+    Sliding window message counter per channel and user.
+
+    Every tracked user keeps the timestamps (and message ids) of their last max_messages messages,
+    a user floods if all of them were sent within window seconds. Users are kept in LRU order and the
+    least recently active ones are evicted once max_users are tracked, so memory stays bounded and
+    every message costs O(1) regardless of the number of chatters.
+    """
+
+    def __init__(self, max_messages: int = 5, window: float = 3.0, max_users: int = 100000):
+        self.max_messages = max(max_messages, 1)
+        self.window = window
+        self.max_users = max_users
+        self._users: "OrderedDict[Tuple[str, str], Deque[Tuple[float, str]]]" = OrderedDict()
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._users)
+
+    def configure(self, max_messages: int, window: float):
+        """Called from the UI thread while check() may run on the bot loop, so the users are swapped, not cleared"""
+        resize = max(max_messages, 1) != self.max_messages
+        self.max_messages = max(max_messages, 1)
+        self.window = window
+        if resize:
+            self._users = OrderedDict()  # the windows are sized by max_messages
+
+    def check(self, channel: str, user: str, message_id: str = "", now: float = None) -> Optional[Tuple[str, ...]]:
+        """
+        :param channel: Channel the message was sent in
+        :param user: Login of the author
+        :param message_id: Id of the message, returned to delete the flood
+        :param now: Monotonic timestamp of the message, defaults to time.monotonic()
+        :return: Ids of the messages in the window if the user is flooding, otherwise None
+
+        The window is reset after a flood was detected, so a burst is only reported once.
+        """
+        if now is None:
+            now = time.monotonic()
+        key = (channel, user)
+        users = self._users
+        window = users.get(key)
+        if window is None:
+            window = users[key] = deque(maxlen=self.max_messages)
+            if len(users) > self.max_users:
+                users.popitem(last=False)
+                self.evicted += 1
+        else:
+            users.move_to_end(key)
+        window.append((now, message_id))
+
+        if len(window) == self.max_messages and now - window[0][0] <= self.window:
+            message_ids = tuple(message_id for _, message_id in window if message_id)
+            window.clear()
+            return message_ids
+        return None
+
+
+SIMHASH_BITS = 64
+_LANE_BITS = 16  # counter width per signature bit, messages are far shorter than 2**15 shingles
+_LANE_HIGH = 1 << (_LANE_BITS - 1)
+_BIT_DIGITS = bytes.maketrans(b"\x00\x01", b"01")
+
+
+def _spread(value: int, shift: int) -> int:
+    """:return: Every bit of value moved into its own counter lane, starting at lane shift"""
+    spread = 0
+    for bit in range(8):
+        if value >> bit & 1:
+            spread |= 1 << ((shift + bit) * _LANE_BITS)
+    return spread
+
+
+# _SPREAD_TABLES[j][b]: counters for byte j of a shingle hash having the value b
+_SPREAD_TABLES = [[_spread(value, byte * 8) for value in range(256)] for byte in range(SIMHASH_BITS // 8)]
+_LANE_ONES = sum(1 << (lane * _LANE_BITS) for lane in range(SIMHASH_BITS))
+_LANE_SIGNS = _LANE_ONES * _LANE_HIGH
+_HASH_MASK = (1 << SIMHASH_BITS) - 1
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """
+    :param text: Normalized text
+    :return: 64 bit SimHash over the character shingles of text, texts differing in a few
+             characters have signatures differing in a few bits
+
+    All 64 bit counters are lanes of one integer: every shingle adds its hash bits through byte
+    lookup tables, the sign of every counter is extracted at once at the end.
+    """
+    if len(text) <= shingle_size:
+        shingles = {text}
+    else:
+        shingles = {text[idx:idx + shingle_size] for idx in range(len(text) - shingle_size + 1)}
+    t0, t1, t2, t3, t4, t5, t6, t7 = _SPREAD_TABLES
+    counters = 0
+    for shingle in shingles:
+        value = hash(shingle) & _HASH_MASK
+        counters += (t0[value & 255] + t1[value >> 8 & 255] + t2[value >> 16 & 255] + t3[value >> 24 & 255] +
+                     t4[value >> 32 & 255] + t5[value >> 40 & 255] + t6[value >> 48 & 255] + t7[value >> 56])
+    # Lanes holding more than half of the shingles end up with their high bit set
+    counters += _LANE_ONES * (_LANE_HIGH - len(shingles) // 2 - 1)
+    signs = ((counters & _LANE_SIGNS) >> (_LANE_BITS - 1)).to_bytes(SIMHASH_BITS * _LANE_BITS // 8, "little")[::_LANE_BITS // 8]
+    return int(signs.translate(_BIT_DIGITS)[::-1], 2)
+
+
+class _DuplicateEntry:
+    __slots__ = ("timestamp", "signature", "user", "message_id", "flagged")
+
+    def __init__(self, timestamp: float, signature: int, user: str, message_id: str):
+        self.timestamp = timestamp
+        self.signature = signature
+        self.user = user
+        self.message_id = message_id
+        self.flagged = False
+
+
+class _ChannelIndex:
+    def __init__(self):
+        self.entries: Deque[_DuplicateEntry] = deque()
+        self.buckets: Dict[Tuple[int, int], Deque[_DuplicateEntry]] = {}
+
+
+class DuplicateDetector:
+    """
+    Streaming near-duplicate detection per channel.
+
+    Every message gets a 64 bit SimHash, indexed by LSH in BANDS buckets of 8 bits: signatures within
+    BANDS - 1 bits always share a bucket, within MAX_DISTANCE bits in ~90% of the cases (and a raid
+    cluster only needs one of its messages to be found). Once min_users distinct users sent similar
+    messages within window seconds, all of them are reported. Entries are evicted in time order and
+    capped per channel.
+    """
+    BANDS = 8
+    BAND_BITS = SIMHASH_BITS // BANDS
+    MAX_DISTANCE = 10  # chat length variations (mentions, suffixes, typos) measured up to ~10, unrelated messages 20+
+    MAX_CANDIDATES = 8  # newest entries compared per bucket, raid messages are close in time so a busy channel can't make this O(n)
+
+    def __init__(self, min_users: int = 5, window: float = 30, min_length: int = 20, max_entries: int = 20000):
+        self.min_users = min_users
+        self.window = window
+        self.min_length = min_length
+        self.max_entries = max_entries
+        self._channels: Dict[str, _ChannelIndex] = {}
+
+    def configure(self, min_users: int, window: float, min_length: int):
+        self.min_users = min_users
+        self.window = window
+        self.min_length = min_length
+
+    def _evict(self, index: _ChannelIndex, now: float):
+        entries = index.entries
+        while entries and (now - entries[0].timestamp > self.window or len(entries) > self.max_entries):
+            entry = entries.popleft()
+            for band in self._bands(entry.signature):
+                bucket = index.buckets[band]
+                bucket.popleft()  # buckets are in time order too, so the entry is the first one
+                if not bucket:
+                    del index.buckets[band]
+
+    def _bands(self, signature: int) -> List[Tuple[int, int]]:
+        mask = (1 << self.BAND_BITS) - 1
+        return [(band, signature >> (band * self.BAND_BITS) & mask) for band in range(self.BANDS)]
+
+    def check(self, channel: str, user: str, content: str, message_id: str = "", now: float = None) -> List[Tuple[str, str]]:
+        """
+        :param channel: Channel the message was sent in
+        :param user: Login of the author
+        :param content: Message content
+        :param message_id: Id of the message
+        :param now: Monotonic timestamp of the message, defaults to time.monotonic()
+        :return: (user, message id) of every message of a cluster that wasn't reported yet, empty if there is none
+        """
+        text = normalize(content)
+        if len(text) < self.min_length:
+            return []
+        if now is None:
+            now = time.monotonic()
+        index = self._channels.get(channel)
+        if index is None:
+            index = self._channels[channel] = _ChannelIndex()
+        self._evict(index, now)
+
+        signature = simhash(text)
+        entry = _DuplicateEntry(now, signature, user, message_id)
+        similar: Dict[int, _DuplicateEntry] = {}
+        bands = self._bands(signature)
+        for band in bands:
+            bucket = index.buckets.get(band)
+            if bucket is None:
+                index.buckets[band] = deque((entry,))
+                continue
+            for idx in range(len(bucket) - 1, max(len(bucket) - 1 - self.MAX_CANDIDATES, -1), -1):
+                other = bucket[idx]
+                if bin(signature ^ other.signature).count("1") <= self.MAX_DISTANCE:
+                    similar[id(other)] = other
+            bucket.append(entry)
+        index.entries.append(entry)
+
+        users = {other.user for other in similar.values()}
+        users.add(user)
+        if len(users) < self.min_users:
+            return []
+        cluster = [other for other in similar.values() if not other.flagged]
+        cluster.append(entry)
+        for other in cluster:
+            other.flagged = True
+        return [(other.user, other.message_id) for other in cluster]
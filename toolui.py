@@ -1,24 +1,28 @@
 import asyncio
 import csv
 import datetime
+import hashlib
 import json
 import os.path
-import pickle
 import sys
 import time
 import traceback
 import re
 from functools import partial
 from json import JSONEncoder
-from typing import Dict, List, Union, Tuple
+from typing import Dict, List
 
 from PySide6 import QtWidgets, QtGui, QtCore
-from PySide6.QtCore import Slot, QRunnable, Signal, QObject, QThreadPool
+from PySide6.QtCore import Slot, QRunnable, Signal, QObject, QThreadPool, QDate, QDateTime, QTime
 from PySide6.QtGui import Qt, QIcon
 from PySide6.QtWidgets import *
 
+from chatfilter import Filter, FilterBundle
+import chatlog
+import modactions
 import twitchapi
 import twitchio
+import warehouse
 
 modactions_seperate_file_to_individual_actions_regex = re.compile(r".*\n\n.*\n\n.*\n.*|.*\n\n.*\n.*")
 modactions_get_mod_in_timeout_string_regex = re.compile(r"Timed out by (.*)for (.*) (second|seconds)")
@@ -26,36 +30,6 @@ modactions_get_mod_in_permitted_term_string_regex = re.compile(r"Added as Permit
 modactions_get_mod_in_blocked_term_string_regex = re.compile(r"Added as Blocked Term by (\w+)( via AutoMod)?")
 
 
-# <editor-fold desc="Filter Class">
-class Filter:
-    FILTER_TYPES = ("Full match", "Match partially", "Regular Expression")
-    FILTER_TARGETS = ("Message", "Author")
-    FILTER_PENALITYS = ("Delete Message", "Timeout 1m", "Timeout 10m", "Ban")
-
-    def __init__(self, filter_string: str, filter_type: str, target: str, penality: str):
-        self.filter_str = filter_string.strip()
-        self.filter_type = filter_type
-        self.compiled_regex = re.compile(filter_string)
-        self.target = target
-        self.penality = penality
-
-    def filter(self, message: twitchio.Message) -> Union[Tuple[str, str], None]:
-        string_to_filter = message.content.strip() if self.target == "Message" else message.author.name
-        if self.filter_type == "Full match":
-            return (string_to_filter.strip(), self.penality) if string_to_filter.strip() == self.filter_str else None
-
-        elif self.filter_type == "Match partially":
-            return (self.filter_str, self.penality) if self.filter_str in string_to_filter else None
-
-        elif self.filter_type == "Regular Expression":
-            match = self.compiled_regex.search(string_to_filter)
-            return (match.group(0), self.penality) if match else None
-
-        else:
-            print(f"Unknown filter type {self.filter_type}")
-        return None
-# </editor-fold>
-
 # <editor-fold desc="Multithread worker">
 class WorkerSignals(QObject):
     """
@@ -141,6 +115,9 @@ class TwitchToolUi(QtWidgets.QWidget):
         self.settings = settings
         self.chat_widgets: Dict[str, QTableWidget] = {}
         self.filter_list: List[Filter] = []
+        self.filter_bundle = FilterBundle()
+        self.filter_table_populated = False
+        self.filter_generation = 0
 
         self.status_list = ["Idle"]
 
@@ -180,6 +157,13 @@ class TwitchToolUi(QtWidgets.QWidget):
         self.setLayout(layout)
 
         self.api = twitchapi.Twitch_api(self.run_api)
+        self.warehouse = warehouse.ModerationWarehouse()
+        self.chat_history = warehouse.ChatHistory()
+        self.api.bot.chat_history = self.chat_history
+        self.api.bot.set_flood_protection(self.settings["Flood Protection"])
+        self.api.bot.set_duplicate_protection(self.settings["Duplicate Protection"])
+        self.api.bot.set_chat_log(self.settings["Chat Log"])
+        self.api.bot.start_shards(self.settings["Chat Shards"])
         self.bot_worker = Worker(self.api.bot.run, run_flag=self.run_bot)
         self.bot_worker.signals.progress.connect(self.handle_chat_message)
         self.threadpool.start(self.bot_worker)
@@ -196,6 +180,13 @@ class TwitchToolUi(QtWidgets.QWidget):
         self.init_settings_tab(self.settings_tab)
 
         self.load_filters()
+        self.load_warehouse()
+
+    def load_warehouse(self):
+        self.follow_grabber_load_cached()
+        self.blocklist_load_cached()
+        self.banlist_load_cached()
+        self.modactions_load_cached()
 
     def tab_clicked(self):
         if self.tool_tab_widget.currentWidget() is self.settings_tab:
@@ -216,11 +207,6 @@ class TwitchToolUi(QtWidgets.QWidget):
                 self.chat_widgets[chnl].setItem(0, 0, QTableWidgetItem(user))
                 self.chat_widgets[chnl].setItem(0, 1, QTableWidgetItem(message.content))
                 self.chat_widgets[chnl].removeRow(500)
-
-                for fltr in self.filter_list:
-                    result = fltr.filter(message)
-                    if result:
-                        print(f"filter triggered: {fltr.filter_type}\nMessage Author: {message.author.name}\nMessage Content: {message.content.strip()}\nTriggering Part:{result[0]}\nPenality: {result[1]}")
         except AttributeError:
             pass
 
@@ -235,6 +221,11 @@ class TwitchToolUi(QtWidgets.QWidget):
         self.run_api[0] = False
         self.run_bot[0] = False
         self.api.pubsub.stop()
+        self.api.bot.set_chat_log(None)
+        self.api.bot.stop_shards()
+        self.api.bot.chat_history = None
+        self.warehouse.close()
+        self.chat_history.close()
 
     # <editor-fold desc="Status bar">
     def add_status(self, status: str):
@@ -288,6 +279,19 @@ class TwitchToolUi(QtWidgets.QWidget):
             self.follow_grabber_follow_list_sorting_box_action)
         self.follow_grabber_follow_Table.doubleClicked.connect(self.follow_grabber_follow_table_action)
 
+    def follow_grabber_load_cached(self):
+        last_query = self.warehouse.last_follow_query()
+        if last_query:
+            name, follow_direction = last_query
+            self.follow_grabber_username_LineEdit.setText(name)
+            follows = self.warehouse.follows(name, follow_direction)
+            self.follow_grabber_follow_Table.setRowCount(len(follows))
+            for row, line in enumerate(follows):
+                for col, entry in enumerate(line):
+                    self.follow_grabber_follow_Table.setItem(row, col, QTableWidgetItem(QIcon(), str(entry)))
+            self.follow_grabber_follow_list_sorting_box_action()
+            self.follow_grabber_follow_Table.resizeColumnsToContents()
+
     def follow_grabber_follow_table_action(self, model_index: QtCore.QModelIndex):
         name = self.follow_grabber_follow_Table.item(model_index.row(), 0).text()
         self.user_info_username_LineEdit.setText(name)
@@ -313,6 +317,7 @@ class TwitchToolUi(QtWidgets.QWidget):
         self.follow_grabber_follow_Table.clearContents()
         self.follow_grabber_follow_Table.setRowCount(0)
         name = self.follow_grabber_username_LineEdit.text()
+        self.follow_grabber_query = (name.strip().lower(), follow_direction, time.time())
         if name:
             user_id = self.api.names_to_id(name)
             if user_id:
@@ -335,6 +340,7 @@ class TwitchToolUi(QtWidgets.QWidget):
             self.follow_grabber_get_follows_button_thread_done()
 
     def follow_grabber_get_follows_button_thread_return(self, follows):
+        self.warehouse.record_follows(*self.follow_grabber_query[:2], follows, seen_at=self.follow_grabber_query[2])
         row_count = self.follow_grabber_follow_Table.rowCount()
         self.follow_grabber_follow_Table.setRowCount(row_count + len(follows))
         for row, line in enumerate(follows.items()):
@@ -545,25 +551,36 @@ class TwitchToolUi(QtWidgets.QWidget):
         self.blocklist_import_Table.setHorizontalHeaderItem(0, QTableWidgetItem("User Name"))
         self.blocklist_import_Table.setHorizontalHeaderItem(1, QTableWidgetItem("User ID"))
 
+    def blocklist_load_cached(self):
+        blocklist = self.warehouse.blocks(self.api.own_id)
+        self.blocklist_api_Table.setRowCount(len(blocklist))
+        for row, line in enumerate(blocklist):
+            for col, entry in enumerate(line):
+                self.blocklist_api_Table.setItem(row, col, QTableWidgetItem(QIcon(), str(entry)))
+
     def blocklist_get_blocklist_Button_action(self):
         self.blocklist_get_blocklist_Button.setEnabled(False)
         self.blocklist_clean_blocklist_Button.setEnabled(False)
         self.add_status("Grabbing blocklist, please wait")
         self.blocklist_api_Table.clearContents()
         self.blocklist_api_Table.setRowCount(0)
+        self.blocklist_refresh_started = time.time()
         worker = Worker(self.api.get_all_blocked_users)
         worker.signals.progress.connect(self.blocklist_get_blocklist_Button_progress)
         worker.signals.result.connect(self.blocklist_get_blocklist_Button_done)
         self.threadpool.start(worker)
 
     def blocklist_get_blocklist_Button_progress(self, blocklist):
+        self.warehouse.record_blocks(self.api.own_id, blocklist, seen_at=self.blocklist_refresh_started)
         row_count = self.blocklist_api_Table.rowCount()
         self.blocklist_api_Table.setRowCount(row_count + len(blocklist))
         for row, line in enumerate(blocklist.items()):
             for col, entry in enumerate(line):
                 self.blocklist_api_Table.setItem(row + row_count, col, QTableWidgetItem(QIcon(), str(entry)))
 
-    def blocklist_get_blocklist_Button_done(self):
+    def blocklist_get_blocklist_Button_done(self, completed=False):
+        if completed:
+            self.warehouse.prune_blocks(self.api.own_id, self.blocklist_refresh_started)
         self.remove_status("Grabbing blocklist, please wait")
         self.blocklist_get_blocklist_Button.setEnabled(True)
         self.blocklist_clean_blocklist_Button.setEnabled(True)
@@ -744,6 +761,7 @@ class TwitchToolUi(QtWidgets.QWidget):
             self.banlist_info_Table.setItem(row, 0, QTableWidgetItem(item[1]))
             self.banlist_info_Table.setItem(row, 1, QTableWidgetItem(item[0]))
         users_to_unban = [name for name in banlist if name not in user_names]
+        self.warehouse.remove_bans(self.api.login, users_to_unban)
         worker = Worker(self.api.bot.unban_namelist, self.api.login, users_to_unban)
         worker.signals.progress.connect(self.set_progress_label)
         worker.signals.result.connect(self.banlist_clean_blocklist_button_done)
@@ -796,24 +814,35 @@ class TwitchToolUi(QtWidgets.QWidget):
                 for name in name_list:
                     name_file.write(f"{name}\n")
 
+    def banlist_load_cached(self):
+        banlist = self.warehouse.bans(self.api.login)
+        self.banlist_info_Table.setRowCount(len(banlist))
+        for row, line in enumerate(banlist):
+            for col, entry in enumerate(line):
+                self.banlist_info_Table.setItem(row, col, QTableWidgetItem(QIcon(), str(entry)))
+
     def banlist_get_banlist_Button_action(self):
         self.banlist_get_banlist_Button.setEnabled(False)
         self.add_status("Grabbing banlist, please wait")
         self.banlist_info_Table.clearContents()
         self.banlist_info_Table.setRowCount(0)
+        self.banlist_refresh_started = time.time()
         worker = Worker(self.api.get_banned_users)
         worker.signals.progress.connect(self.banlist_get_banlist_Button_progress)
         worker.signals.result.connect(self.banlist_get_banlist_Button_done)
         self.threadpool.start(worker)
 
     def banlist_get_banlist_Button_progress(self, banlist):
+        self.warehouse.record_bans(self.api.login, banlist, seen_at=self.banlist_refresh_started)
         row_count = self.banlist_info_Table.rowCount()
         self.banlist_info_Table.setRowCount(row_count + len(banlist))
         for row, line in enumerate(banlist):
             for col, entry in enumerate(line):
                 self.banlist_info_Table.setItem(row + row_count, col, QTableWidgetItem(QIcon(), str(entry)))
 
-    def banlist_get_banlist_Button_done(self):
+    def banlist_get_banlist_Button_done(self, completed=False):
+        if completed:
+            self.warehouse.prune_bans(self.api.login, self.banlist_refresh_started)
         self.banlist_info_Table.sortByColumn(0, Qt.AscendingOrder)
         self.remove_status("Grabbing banlist, please wait")
         self.banlist_get_banlist_Button.setEnabled(True)
@@ -829,14 +858,27 @@ class TwitchToolUi(QtWidgets.QWidget):
         self.modactions_auto_export_bans_checkbox = QCheckBox("Auto Export Bans")
         self.modactions_ids_to_names_Button = QPushButton("Convert ID's to names")
         self.modactions_import_button = QPushButton("Import from file")
-        self.mod_actions_Table = QTableWidget()
-        self.mod_actions_Table.setColumnCount(6)
-        self.mod_actions_Table.setHorizontalHeaderItem(0, QTableWidgetItem("User"))
-        self.mod_actions_Table.setHorizontalHeaderItem(1, QTableWidgetItem("UserID"))
-        self.mod_actions_Table.setHorizontalHeaderItem(2, QTableWidgetItem("Action"))
-        self.mod_actions_Table.setHorizontalHeaderItem(3, QTableWidgetItem("Moderator"))
-        self.mod_actions_Table.setHorizontalHeaderItem(4, QTableWidgetItem("Timestamp"))
-        self.mod_actions_Table.setHorizontalHeaderItem(5, QTableWidgetItem("Info"))
+        self.mod_actions_model = modactions.ModActionTableModel(parent=self)
+        self.mod_actions_Table = QTableView()
+        self.mod_actions_Table.setModel(self.mod_actions_model)
+        self.mod_actions_Table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.mod_actions_resize_timer = QtCore.QTimer(self)
+        self.mod_actions_resize_timer.setSingleShot(True)
+        self.mod_actions_resize_timer.setInterval(1000)
+        self.modactions_query = {}
+        self.modactions_search_channel_LineEdit = QLineEdit()
+        self.modactions_search_channel_LineEdit.setPlaceholderText("Channel")
+        self.modactions_search_user_LineEdit = QLineEdit()
+        self.modactions_search_user_LineEdit.setPlaceholderText("User or UserID")
+        self.modactions_search_moderator_LineEdit = QLineEdit()
+        self.modactions_search_moderator_LineEdit.setPlaceholderText("Moderator")
+        self.modactions_search_action_LineEdit = QLineEdit()
+        self.modactions_search_action_LineEdit.setPlaceholderText("Action")
+        self.modactions_search_days_SpinBox = QSpinBox()
+        self.modactions_search_days_SpinBox.setRange(0, 3650)
+        self.modactions_search_days_SpinBox.setSpecialValueText("All time")
+        self.modactions_search_days_SpinBox.setSuffix(" days")
+        self.modactions_search_Button = QPushButton("Search")
 
         # Create layout and add widgets
         button_row_layout = QHBoxLayout()
@@ -847,8 +889,17 @@ class TwitchToolUi(QtWidgets.QWidget):
         button_row_layout.addWidget(self.modactions_ids_to_names_Button)
         button_row_layout.addWidget(self.modactions_import_button)
 
+        search_row_layout = QHBoxLayout()
+        search_row_layout.addWidget(self.modactions_search_channel_LineEdit)
+        search_row_layout.addWidget(self.modactions_search_user_LineEdit)
+        search_row_layout.addWidget(self.modactions_search_moderator_LineEdit)
+        search_row_layout.addWidget(self.modactions_search_action_LineEdit)
+        search_row_layout.addWidget(self.modactions_search_days_SpinBox)
+        search_row_layout.addWidget(self.modactions_search_Button)
+
         layout = QVBoxLayout()
         layout.addLayout(button_row_layout)
+        layout.addLayout(search_row_layout)
         layout.addWidget(self.mod_actions_Table)
 
         # Set dialog layout
@@ -859,162 +910,157 @@ class TwitchToolUi(QtWidgets.QWidget):
         self.modactions_auto_export_bans_checkbox.stateChanged.connect(self.checkbox_event)
         self.modactions_ids_to_names_Button.clicked.connect(self.modactions_ids_to_names_callback)
         self.modactions_import_button.clicked.connect(self.modactions_import_callback)
+        self.modactions_search_Button.clicked.connect(self.modactions_search_callback)
+        self.mod_actions_model.rows_flushed.connect(self.modactions_rows_flushed)
+        self.mod_actions_resize_timer.timeout.connect(self.mod_actions_Table.resizeColumnsToContents)
+
+    def modactions_rows_flushed(self, count):
+        # Column sizing is amortized to at most once per second, no matter how many actions arrive
+        if not self.mod_actions_resize_timer.isActive():
+            self.mod_actions_resize_timer.start()
 
     def modactions_import_callback(self):
         files_to_read = QFileDialog.getOpenFileNames(caption="Select files to import", dir="", filter="Text files (*.txt)")
+        # Imported actions have no time, they are told apart by their text and its occurrence in the file
+        import_keys = self.warehouse.mod_action_import_keys()
         for file_path in files_to_read[0]:
             with open(file_path, "r", encoding="utf-8") as file:
                 file_string = file.read()
             action_list = modactions_seperate_file_to_individual_actions_regex.findall(file_string)
+            occurrences = {}
             for action in action_list:
+                digest = hashlib.sha1(action.encode("utf-8")).hexdigest()
+                occurrences[digest] = occurrences.get(digest, 0) + 1
+                _import_key = f"{digest}:{occurrences[digest]}"
+                if _import_key in import_keys:
+                    continue
+                import_keys.add(_import_key)
                 action_parts = [action_part.strip() for action_part in action.split("\n") if action_part]
                 if "Banned by" in action_parts[1]:
                     _name = action_parts[0]
                     _moderator = action_parts[1].rsplit(" ", 1)[1]
-                    self.mod_actions_Table.insertRow(0)
-                    self.mod_actions_Table.setItem(0, 0, QTableWidgetItem(_name))
-                    self.mod_actions_Table.setItem(0, 2, QTableWidgetItem("ban"))
-                    self.mod_actions_Table.setItem(0, 3, QTableWidgetItem(_moderator))
+                    self.modactions_add(user=_name, action="ban", moderator=_moderator, import_key=_import_key)
                 elif "Timed out by" in action_parts[1]:
                     _name = action_parts[0]
                     _moderator = modactions_get_mod_in_timeout_string_regex.search(action_parts[1]).group(1)
-                    self.mod_actions_Table.insertRow(0)
-                    self.mod_actions_Table.setItem(0, 0, QTableWidgetItem(_name))
-                    self.mod_actions_Table.setItem(0, 2, QTableWidgetItem("timeout"))
-                    self.mod_actions_Table.setItem(0, 3, QTableWidgetItem(_moderator))
+                    self.modactions_add(user=_name, action="timeout", moderator=_moderator, import_key=_import_key)
                 elif "Raid Started by" in action_parts[1]:
                     _name = action_parts[0]
                     _moderator = action_parts[1].rsplit(" ", 1)[1]
-                    self.mod_actions_Table.insertRow(0)
-                    self.mod_actions_Table.setItem(0, 0, QTableWidgetItem(_name))
-                    self.mod_actions_Table.setItem(0, 2, QTableWidgetItem("Started Raid"))
-                    self.mod_actions_Table.setItem(0, 3, QTableWidgetItem(_moderator))
+                    self.modactions_add(user=_name, action="Started Raid", moderator=_moderator, import_key=_import_key)
                 elif action_parts[0] == "Followers-Only Chat":
                     _moderator = action_parts[1].rsplit(" ", 1)[1]
                     _status = action_parts[1].split(" ", 1)[0]
-                    self.mod_actions_Table.insertRow(0)
-                    self.mod_actions_Table.setItem(0, 2, QTableWidgetItem("Follower only Chat"))
-                    self.mod_actions_Table.setItem(0, 3, QTableWidgetItem(_moderator))
-                    self.mod_actions_Table.setItem(0, 5, QTableWidgetItem(_status))
+                    self.modactions_add(action="Follower only Chat", moderator=_moderator, info=_status, import_key=_import_key)
                 elif "Added as a VIP by" in action_parts[1]:
                     _name = action_parts[0]
                     _moderator = action_parts[1].rsplit(" ", 1)[1]
-                    self.mod_actions_Table.insertRow(0)
-                    self.mod_actions_Table.setItem(0, 0, QTableWidgetItem(_name))
-                    self.mod_actions_Table.setItem(0, 2, QTableWidgetItem("Added as VIP"))
-                    self.mod_actions_Table.setItem(0, 3, QTableWidgetItem(_moderator))
+                    self.modactions_add(user=_name, action="Added as VIP", moderator=_moderator, import_key=_import_key)
                 elif "Added as a Moderator by" in action_parts[1]:
                     _name = action_parts[0]
                     _moderator = action_parts[1].rsplit(" ", 1)[1]
-                    self.mod_actions_Table.insertRow(0)
-                    self.mod_actions_Table.setItem(0, 0, QTableWidgetItem(_name))
-                    self.mod_actions_Table.setItem(0, 2, QTableWidgetItem("Added as a Moderator"))
-                    self.mod_actions_Table.setItem(0, 3, QTableWidgetItem(_moderator))
+                    self.modactions_add(user=_name, action="Added as a Moderator", moderator=_moderator, import_key=_import_key)
                 elif "Hosting Started by" in action_parts[1]:
                     _name = action_parts[0]
                     _moderator = action_parts[1].rsplit(" ", 1)[1]
-                    self.mod_actions_Table.insertRow(0)
-                    self.mod_actions_Table.setItem(0, 0, QTableWidgetItem(_name))
-                    self.mod_actions_Table.setItem(0, 2, QTableWidgetItem("Hosting Started"))
-                    self.mod_actions_Table.setItem(0, 3, QTableWidgetItem(_moderator))
+                    self.modactions_add(user=_name, action="Hosting Started", moderator=_moderator, import_key=_import_key)
                 elif "Hosting Ended by" in action_parts[1]:
                     _name = action_parts[0]
                     _moderator = action_parts[1].rsplit(" ", 1)[1]
-                    self.mod_actions_Table.insertRow(0)
-                    self.mod_actions_Table.setItem(0, 0, QTableWidgetItem(_name))
-                    self.mod_actions_Table.setItem(0, 2, QTableWidgetItem("Hosting Ended"))
-                    self.mod_actions_Table.setItem(0, 3, QTableWidgetItem(_moderator))
+                    self.modactions_add(user=_name, action="Hosting Ended", moderator=_moderator, import_key=_import_key)
                 elif "Message Deleted by" in action_parts[1]:
                     _name = action_parts[0]
                     _moderator = action_parts[1].rsplit(" ", 1)[1]
-                    self.mod_actions_Table.insertRow(0)
-                    self.mod_actions_Table.setItem(0, 0, QTableWidgetItem(_name))
-                    self.mod_actions_Table.setItem(0, 2, QTableWidgetItem("Message deleted"))
-                    self.mod_actions_Table.setItem(0, 3, QTableWidgetItem(_moderator))
-                    self.mod_actions_Table.setItem(0, 5, QTableWidgetItem(action_parts[2]))
+                    self.modactions_add(user=_name, action="Message deleted", moderator=_moderator, info=action_parts[2], import_key=_import_key)
                 elif "Removed Timeout by" in action_parts[1]:
                     _name = action_parts[0]
                     _moderator = action_parts[1].rsplit(" ", 1)[1]
-                    self.mod_actions_Table.insertRow(0)
-                    self.mod_actions_Table.setItem(0, 0, QTableWidgetItem(_name))
-                    self.mod_actions_Table.setItem(0, 2, QTableWidgetItem("Removed Timeout"))
-                    self.mod_actions_Table.setItem(0, 3, QTableWidgetItem(_moderator))
+                    self.modactions_add(user=_name, action="Removed Timeout", moderator=_moderator, import_key=_import_key)
                 elif "Added as Permitted Term by" in action_parts[1]:
                     _moderator = modactions_get_mod_in_permitted_term_string_regex.search(action_parts[1]).group(1)
-                    self.mod_actions_Table.insertRow(0)
-                    self.mod_actions_Table.setItem(0, 2, QTableWidgetItem("Added Permitted Term"))
-                    self.mod_actions_Table.setItem(0, 3, QTableWidgetItem(_moderator))
-                    self.mod_actions_Table.setItem(0, 5, QTableWidgetItem(action_parts[0]))
+                    self.modactions_add(action="Added Permitted Term", moderator=_moderator, info=action_parts[0], import_key=_import_key)
                 elif "Unban request denied by" in action_parts[1]:
                     _name = action_parts[0]
                     _moderator = action_parts[1].rsplit(" ", 1)[1]
-                    self.mod_actions_Table.insertRow(0)
-                    self.mod_actions_Table.setItem(0, 0, QTableWidgetItem(_name))
-                    self.mod_actions_Table.setItem(0, 2, QTableWidgetItem("Denied Unban request"))
-                    self.mod_actions_Table.setItem(0, 3, QTableWidgetItem(_moderator))
+                    self.modactions_add(user=_name, action="Denied Unban request", moderator=_moderator, import_key=_import_key)
                 elif "Added as Blocked Term by" in action_parts[1]:
                     _moderator = modactions_get_mod_in_blocked_term_string_regex.search(action_parts[1]).group(1)
-                    self.mod_actions_Table.insertRow(0)
-                    self.mod_actions_Table.setItem(0, 2, QTableWidgetItem("Added Blocked Term"))
-                    self.mod_actions_Table.setItem(0, 3, QTableWidgetItem(_moderator))
-                    self.mod_actions_Table.setItem(0, 5, QTableWidgetItem(action_parts[0]))
+                    self.modactions_add(action="Added Blocked Term", moderator=_moderator, info=action_parts[0], import_key=_import_key)
                 else:
                     print(action_parts)
+        self.mod_actions_model.flush()
         self.mod_actions_Table.resizeColumnsToContents()
 
     def modactions_ids_to_names_callback(self):
-        rowcount = self.mod_actions_Table.rowCount()
-        ids = []
-        for i in range(rowcount):
-            _item = self.mod_actions_Table.item(i, 1)
-            if _item:
-                _text = _item.text()
-                if _text:
-                    ids.append(_text)
+        self.mod_actions_model.flush()
+        ids = [str(user_id) for user_id in self.mod_actions_model.store.unique_user_ids()]
         if ids:
             name_dict = self.api.ids_to_names(ids)
-            for i in range(self.mod_actions_Table.rowCount()):
-                _item = self.mod_actions_Table.item(i, 1)
-                if _item:
-                    _text = _item.text()
-                    if _text and _text in name_dict.keys():
-                        self.mod_actions_Table.setItem(i, 0, QTableWidgetItem(name_dict[_text]))
+            self.mod_actions_model.set_user_names({int(_id): _name for _id, _name in name_dict.items()})
             self.mod_actions_Table.resizeColumnsToContents()
 
     def pubsub_mod_action_handler(self, response):
-        uuid, action = response
+        channel, uuid, action = response
         data = action["data"]
-        self.mod_actions_Table.insertRow(0)
         if data["moderation_action"] in ("ban", "unban"):
-            self.mod_actions_Table.setItem(0, 1, QTableWidgetItem(str(data["target_user_id"])))
+            user_id = data["target_user_id"]
         else:
-            self.mod_actions_Table.setItem(0, 1, QTableWidgetItem(""))
-        self.mod_actions_Table.setItem(0, 2, QTableWidgetItem(data["moderation_action"]))
-        self.mod_actions_Table.setItem(0, 3, QTableWidgetItem(data["created_by"]))
-        self.mod_actions_Table.setItem(0, 4, QTableWidgetItem(str(data["created_at"])))
+            user_id = 0
+        info = ""
         if data["moderation_action"] == "ban":
             if len(data["args"]) > 1:
-                self.mod_actions_Table.setItem(0, 5, QTableWidgetItem(str(data["args"][1])))
+                info = str(data["args"][1])
+        self.modactions_add(channel=channel, user_id=user_id, action=data["moderation_action"], moderator=data["created_by"], timestamp=data["created_at"], info=info)
+
+    def modactions_add(self, channel="", user="", user_id=0, action="", moderator="", timestamp=0.0, info="", import_key=None):
+        timestamp = modactions.parse_timestamp(timestamp)
+        self.warehouse.record_mod_action(channel, user, user_id, action, moderator, timestamp, info, import_key)
+        if self.modactions_filter_matches(channel, user, user_id, action, moderator, timestamp):
+            self.mod_actions_model.queue_row(user, user_id, action, moderator, timestamp, info)
+
+    def modactions_filter_matches(self, channel, user, user_id, action, moderator, timestamp) -> bool:
+        """Same conditions as ModerationWarehouse.mod_actions, actions without a time don't match a time range"""
+        query = self.modactions_query
+        if query.get("channel") and query["channel"].lower() != str(channel).lower():
+            return False
+        if query.get("login") and query["login"].lower() != str(user).lower():
+            return False
+        if query.get("user_id") and query["user_id"] != int(user_id or 0):
+            return False
+        if query.get("action") and query["action"] != action:
+            return False
+        if query.get("moderator") and query["moderator"].lower() != str(moderator).lower():
+            return False
+        if query.get("since") and not (timestamp and timestamp >= query["since"]):
+            return False
+        if query.get("until") and not (timestamp and timestamp < query["until"]):
+            return False
+        return True
+
+    def modactions_load_cached(self):
+        store = modactions.ModActionStore()
+        store.extend(self.warehouse.mod_actions(**self.modactions_query))
+        self.mod_actions_model.set_store(store)
         self.mod_actions_Table.resizeColumnsToContents()
 
+    def modactions_search_callback(self):
+        user = self.modactions_search_user_LineEdit.text().strip()
+        days = self.modactions_search_days_SpinBox.value()
+        self.modactions_query = {"channel": self.modactions_search_channel_LineEdit.text().strip(),
+                                 "login": "" if user.isdecimal() else user,
+                                 "user_id": int(user) if user.isdecimal() else None,
+                                 "moderator": self.modactions_search_moderator_LineEdit.text().strip(),
+                                 "action": self.modactions_search_action_LineEdit.text().strip(),
+                                 "since": time.time() - days * 86400 if days else None}
+        self.modactions_load_cached()
+
     def checkbox_event(self, *args, **kwargs):
         print("checked")
         print(args, kwargs)
 
     def export_all_modactions(self):
         self.modactions_ids_to_names_callback()
-        row_count = self.mod_actions_Table.rowCount()
-        column_count = self.mod_actions_Table.columnCount()
-        lines = []
-        for i in range(row_count):
-            row = []
-            for j in range(column_count):
-                _item = self.mod_actions_Table.item(i, j)
-                if _item:
-                    row.append(_item.text())
-                else:
-                    row.append("")
-            lines.append(row)
+        lines = list(self.mod_actions_model.rows())
         csv_lines = [",".join(line) for line in lines]
         csv_string = "\n".join(csv_lines)
 
@@ -1040,18 +1086,7 @@ class TwitchToolUi(QtWidgets.QWidget):
 
     def export_bans(self):
         self.modactions_ids_to_names_callback()
-        row_count = self.mod_actions_Table.rowCount()
-        column_count = self.mod_actions_Table.columnCount()
-        lines = []
-        for i in range(row_count):
-            row = []
-            for j in range(column_count):
-                _item = self.mod_actions_Table.item(i, j)
-                if _item:
-                    row.append(_item.text())
-                else:
-                    row.append("")
-            lines.append(row)
+        lines = list(self.mod_actions_model.rows())
 
         ban_events = {}
         unban_events = {}
@@ -1110,6 +1145,7 @@ class TwitchToolUi(QtWidgets.QWidget):
             self.chat_widgets[chnl] = table
 
         chat_tabs = QTabWidget()
+        self.chat_tabs = chat_tabs
 
         for chnl in self.chat_widgets:
             chat_tabs.addTab(self.chat_widgets[chnl], chnl)
@@ -1129,7 +1165,8 @@ class TwitchToolUi(QtWidgets.QWidget):
         filter_layout.addLayout(filter_buttonrow_layout)
         filter_layout.addWidget(self.filter_table)
         filter_widget.setLayout(filter_layout)
-        chat_tabs.addTab(filter_widget, "filter")
+        self.filter_tab_index = chat_tabs.addTab(filter_widget, "filter")
+        chat_tabs.addTab(self.init_chat_search(), "search")
 
         layout = QVBoxLayout()
         layout.addWidget(chat_tabs)
@@ -1137,8 +1174,106 @@ class TwitchToolUi(QtWidgets.QWidget):
 
         self.filter_new_filter_button.clicked.connect(self.add_filter)
         self.save_filters_button.clicked.connect(self.save_filters)
+        chat_tabs.currentChanged.connect(self.chat_tab_changed_callback)
 
-    def add_filter(self, filter_text: str = "", filter_type: str = Filter.FILTER_TYPES[0], filter_target: str = Filter.FILTER_TARGETS[0], filter_penality: str = Filter.FILTER_PENALITYS[0]):
+    def init_chat_search(self) -> QWidget:
+        # Create Widgets
+        self.chat_search_channel_LineEdit = QLineEdit()
+        self.chat_search_channel_LineEdit.setPlaceholderText("Channel")
+        self.chat_search_user_LineEdit = QLineEdit()
+        self.chat_search_user_LineEdit.setPlaceholderText("User or UserID")
+        self.chat_search_text_LineEdit = QLineEdit()
+        self.chat_search_text_LineEdit.setPlaceholderText("Words")
+        self.chat_search_from_DateTimeEdit = QDateTimeEdit()
+        self.chat_search_to_DateTimeEdit = QDateTimeEdit()
+        for date_time_edit in (self.chat_search_from_DateTimeEdit, self.chat_search_to_DateTimeEdit):
+            date_time_edit.setCalendarPopup(True)
+            date_time_edit.setMinimumDateTime(QDateTime(QDate(2011, 1, 1), QTime(0, 0)))
+            date_time_edit.setSpecialValueText("Any time")  # shown while at the minimum, which means no bound
+            date_time_edit.setDateTime(date_time_edit.minimumDateTime())
+        self.chat_search_Button = QPushButton("Search")
+        self.chat_search_label = QLabel()
+
+        self.chat_search_table = QTableWidget()
+        self.chat_search_table.setColumnCount(4)
+        self.chat_search_table.setHorizontalHeaderLabels(["Time", "Channel", "User", "Message"])
+        self.chat_search_table.horizontalHeader().setStretchLastSection(True)
+        self.chat_search_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+
+        # Create layout and add widgets
+        search_row_layout = QHBoxLayout()
+        search_row_layout.addWidget(self.chat_search_channel_LineEdit)
+        search_row_layout.addWidget(self.chat_search_user_LineEdit)
+        search_row_layout.addWidget(self.chat_search_text_LineEdit)
+        search_row_layout.addWidget(self.chat_search_from_DateTimeEdit)
+        search_row_layout.addWidget(self.chat_search_to_DateTimeEdit)
+        search_row_layout.addWidget(self.chat_search_Button)
+
+        layout = QVBoxLayout()
+        layout.addLayout(search_row_layout)
+        layout.addWidget(self.chat_search_label)
+        layout.addWidget(self.chat_search_table)
+        search_widget = QWidget()
+        search_widget.setLayout(layout)
+
+        self.chat_search_Button.clicked.connect(self.chat_search_callback)
+        self.chat_search_text_LineEdit.returnPressed.connect(self.chat_search_callback)
+        self.chat_search_user_LineEdit.returnPressed.connect(self.chat_search_callback)
+        return search_widget
+
+    def chat_search_callback(self):
+        user = self.chat_search_user_LineEdit.text().strip()
+        query = {"text": self.chat_search_text_LineEdit.text().strip(),
+                 "channel": self.chat_search_channel_LineEdit.text().strip(),
+                 "login": "" if user.isdecimal() else user,
+                 "user_id": int(user) if user.isdecimal() else None}
+        for key, date_time_edit in (("since", self.chat_search_from_DateTimeEdit), ("until", self.chat_search_to_DateTimeEdit)):
+            if date_time_edit.dateTime() != date_time_edit.minimumDateTime():
+                query[key] = date_time_edit.dateTime().toSecsSinceEpoch()
+        self.chat_search_Button.setEnabled(False)
+        self.chat_search_label.setText("Searching...")
+        worker = Worker(self.chat_search_run, query)
+        worker.signals.result.connect(self.chat_search_done)
+        worker.signals.error.connect(self.chat_search_failed)
+        self.threadpool.start(worker)
+
+    def chat_search_run(self, query, progress_callback):
+        start = time.perf_counter()
+        rows = self.chat_history.search(**query)
+        return rows, time.perf_counter() - start
+
+    def chat_search_done(self, result):
+        rows, duration = result
+        self.chat_search_Button.setEnabled(True)
+        self.chat_search_label.setText(f"{len(rows)} messages in {duration * 1000:.0f} ms")
+        self.chat_search_table.setUpdatesEnabled(False)
+        self.chat_search_table.setRowCount(len(rows))
+        for idx, (channel, login, sent_at, content) in enumerate(rows):
+            self.chat_search_table.setItem(idx, 0, QTableWidgetItem(modactions.format_timestamp(sent_at)))
+            self.chat_search_table.setItem(idx, 1, QTableWidgetItem(channel))
+            self.chat_search_table.setItem(idx, 2, QTableWidgetItem(login))
+            self.chat_search_table.setItem(idx, 3, QTableWidgetItem(content))
+        self.chat_search_table.resizeColumnsToContents()
+        self.chat_search_table.setUpdatesEnabled(True)
+
+    def chat_search_failed(self, error):
+        self.chat_search_Button.setEnabled(True)
+        self.chat_search_label.setText(f"Search failed: {error[1]}")
+
+    def chat_tab_changed_callback(self, index):
+        if index == self.filter_tab_index and not self.filter_table_populated:
+            self.populate_filter_table()
+
+    def populate_filter_table(self):
+        """Creates the editor rows for the loaded filters, deferred until the filter tab is first shown"""
+        self.filter_table_populated = True
+        self.filter_table.setUpdatesEnabled(False)
+        for fltr in self.filter_list:
+            self.add_filter(filter_text=fltr.filter_str, filter_target=fltr.target, filter_type=fltr.filter_type, filter_penality=fltr.penality, resize=False)
+        self.filter_table.resizeColumnsToContents()
+        self.filter_table.setUpdatesEnabled(True)
+
+    def add_filter(self, filter_text: str = "", filter_type: str = Filter.FILTER_TYPES[0], filter_target: str = Filter.FILTER_TARGETS[0], filter_penality: str = Filter.FILTER_PENALITYS[0], resize: bool = True):
         idx = self.filter_table.rowCount()
         filter_text_lineedit = QLineEdit()
         filter_text_lineedit.setText(filter_text)
@@ -1166,7 +1301,8 @@ class TwitchToolUi(QtWidgets.QWidget):
         self.filter_table.setCellWidget(idx, 2, filter_target_combobox)
         self.filter_table.setCellWidget(idx, 3, filter_penalty_combobox)
         self.filter_table.setCellWidget(idx, 4, del_btn)
-        self.filter_table.resizeColumnsToContents()
+        if resize:
+            self.filter_table.resizeColumnsToContents()
 
     def _filter_remove_callback(self, row):
         self.filter_table.removeRow(row)
@@ -1175,7 +1311,9 @@ class TwitchToolUi(QtWidgets.QWidget):
             self.filter_table.cellWidget(i, 4).clicked.connect(partial(self._filter_remove_callback, i))
 
     def reload_filters(self):
-        self.filter_list.clear()
+        if not self.filter_table_populated:
+            return
+        self.filter_list = []
         for i in range(self.filter_table.rowCount()):
             _line_edit: QLineEdit = self.filter_table.cellWidget(i, 0)
             if _line_edit:
@@ -1194,20 +1332,27 @@ class TwitchToolUi(QtWidgets.QWidget):
 
     def save_filters(self):
         self.reload_filters()
-        if not os.path.exists("data"):
-            os.mkdir("data")
-        with open("data/chat_filters.pickle", "wb") as file:
-            pickle.dump(self.filter_list, file, )
+        self.filter_bundle.save(self.filter_list)
+        self.filter_generation += 1
+        self.api.bot.set_filters(self.filter_bundle.matcher)
 
     def load_filters(self):
-        if not os.path.isfile("data/chat_filters.pickle"):
-            print("No filter file")
-        else:
-            with open("data/chat_filters.pickle", "rb") as file:
-                self.filter_list = pickle.load(file)
-            for fltr in self.filter_list:
-                fltr: Filter
-                self.add_filter(filter_text=fltr.filter_str, filter_target=fltr.target, filter_type=fltr.filter_type, filter_penality=fltr.penality)
+        self.filter_list = list(self.filter_bundle.filters)
+        if self.chat_tabs.currentIndex() == self.filter_tab_index:
+            self.populate_filter_table()
+        # The matcher is loaded from the cache or compiled off the UI thread, the bot starts without filters
+        worker = Worker(self._load_filter_matcher, self.filter_generation)
+        worker.signals.result.connect(self._filter_matcher_loaded)
+        self.threadpool.start(worker)
+
+    def _load_filter_matcher(self, generation, progress_callback):
+        return generation, self.filter_bundle.matcher
+
+    def _filter_matcher_loaded(self, result):
+        generation, matcher = result
+        if generation == self.filter_generation:  # filters weren't saved meanwhile
+            self.api.bot.set_filters(matcher)
+            print(f"Loaded {len(matcher)} chat filters")
 
     # </editor-fold>
 
@@ -1222,6 +1367,48 @@ class TwitchToolUi(QtWidgets.QWidget):
         self.settings_window_height_LineEdit.setValidator(int_validator)
         self.settings_export_dir_lineEdit = QLineEdit(str(self.settings["Export Directory"]))
         self.credentials_channels_to_join_LineEdit = QLineEdit(", ".join(self.api.credentials["bot channels"]))
+        flood_settings = self.settings["Flood Protection"]
+        self.settings_flood_enabled_checkbox = QCheckBox("Enabled")
+        self.settings_flood_enabled_checkbox.setChecked(flood_settings["Enabled"])
+        self.settings_flood_messages_spinbox = QSpinBox()
+        self.settings_flood_messages_spinbox.setRange(2, 100)
+        self.settings_flood_messages_spinbox.setValue(flood_settings["Messages"])
+        self.settings_flood_seconds_spinbox = QSpinBox()
+        self.settings_flood_seconds_spinbox.setRange(1, 600)
+        self.settings_flood_seconds_spinbox.setValue(flood_settings["Seconds"])
+        self.settings_flood_penalty_combobox = QComboBox()
+        self.settings_flood_penalty_combobox.addItems(Filter.FILTER_PENALITYS)
+        self.settings_flood_penalty_combobox.setCurrentText(flood_settings["Penalty"])
+        duplicate_settings = self.settings["Duplicate Protection"]
+        self.settings_duplicate_enabled_checkbox = QCheckBox("Enabled")
+        self.settings_duplicate_enabled_checkbox.setChecked(duplicate_settings["Enabled"])
+        self.settings_duplicate_users_spinbox = QSpinBox()
+        self.settings_duplicate_users_spinbox.setRange(2, 1000)
+        self.settings_duplicate_users_spinbox.setValue(duplicate_settings["Users"])
+        self.settings_duplicate_seconds_spinbox = QSpinBox()
+        self.settings_duplicate_seconds_spinbox.setRange(1, 3600)
+        self.settings_duplicate_seconds_spinbox.setValue(duplicate_settings["Seconds"])
+        self.settings_duplicate_length_spinbox = QSpinBox()
+        self.settings_duplicate_length_spinbox.setRange(1, 500)
+        self.settings_duplicate_length_spinbox.setValue(duplicate_settings["Min Length"])
+        self.settings_duplicate_penalty_combobox = QComboBox()
+        self.settings_duplicate_penalty_combobox.addItems(Filter.FILTER_PENALITYS)
+        self.settings_duplicate_penalty_combobox.setCurrentText(duplicate_settings["Penalty"])
+        chat_log_settings = self.settings["Chat Log"]
+        self.settings_chat_log_enabled_checkbox = QCheckBox("Enabled")
+        self.settings_chat_log_enabled_checkbox.setChecked(chat_log_settings["Enabled"])
+        self.settings_chat_log_format_combobox = QComboBox()
+        self.settings_chat_log_format_combobox.addItems(chatlog.FORMATS)
+        self.settings_chat_log_format_combobox.setCurrentText(chat_log_settings["Format"])
+        self.settings_chat_log_compression_combobox = QComboBox()
+        self.settings_chat_log_compression_combobox.addItems(chatlog.COMPRESSIONS)
+        self.settings_chat_log_compression_combobox.setCurrentText(chat_log_settings["Compression"])
+        self.settings_chat_log_rotate_spinbox = QSpinBox()
+        self.settings_chat_log_rotate_spinbox.setRange(1, 10080)
+        self.settings_chat_log_rotate_spinbox.setValue(chat_log_settings["Rotate Minutes"])
+        self.settings_chat_shards_spinbox = QSpinBox()
+        self.settings_chat_shards_spinbox.setRange(0, 64)
+        self.settings_chat_shards_spinbox.setValue(self.settings["Chat Shards"])
 
         # Create layout and add widgets
         layout = QFormLayout()
@@ -1230,6 +1417,20 @@ class TwitchToolUi(QtWidgets.QWidget):
         layout.addRow("Window height", self.settings_window_height_LineEdit)
         layout.addRow("Export Directory", self.settings_export_dir_lineEdit)
         layout.addRow("Mod Action Channels", self.credentials_channels_to_join_LineEdit)
+        layout.addRow("Flood Protection", self.settings_flood_enabled_checkbox)
+        layout.addRow("Flood Messages", self.settings_flood_messages_spinbox)
+        layout.addRow("Flood Seconds", self.settings_flood_seconds_spinbox)
+        layout.addRow("Flood Penalty", self.settings_flood_penalty_combobox)
+        layout.addRow("Duplicate Protection", self.settings_duplicate_enabled_checkbox)
+        layout.addRow("Duplicate Users", self.settings_duplicate_users_spinbox)
+        layout.addRow("Duplicate Seconds", self.settings_duplicate_seconds_spinbox)
+        layout.addRow("Duplicate Min Length", self.settings_duplicate_length_spinbox)
+        layout.addRow("Duplicate Penalty", self.settings_duplicate_penalty_combobox)
+        layout.addRow("Chat Log", self.settings_chat_log_enabled_checkbox)
+        layout.addRow("Chat Log Format", self.settings_chat_log_format_combobox)
+        layout.addRow("Chat Log Compression", self.settings_chat_log_compression_combobox)
+        layout.addRow("Chat Log Rotation (minutes)", self.settings_chat_log_rotate_spinbox)
+        layout.addRow("Chat Shards (processes, 0 = off, after restart)", self.settings_chat_shards_spinbox)
 
         # Set dialog layout
         parent.setLayout(layout)
@@ -1239,6 +1440,25 @@ class TwitchToolUi(QtWidgets.QWidget):
     def settings_apply_callback(self):
         changed = False
         self.settings["Window Size"] = [int(self.settings_window_width_LineEdit.text()), int(self.settings_window_height_LineEdit.text())]
+        self.settings["Flood Protection"] = {"Enabled": self.settings_flood_enabled_checkbox.isChecked(),
+                                             "Messages": self.settings_flood_messages_spinbox.value(),
+                                             "Seconds": self.settings_flood_seconds_spinbox.value(),
+                                             "Penalty": self.settings_flood_penalty_combobox.currentText()}
+        self.settings["Duplicate Protection"] = {"Enabled": self.settings_duplicate_enabled_checkbox.isChecked(),
+                                                 "Users": self.settings_duplicate_users_spinbox.value(),
+                                                 "Seconds": self.settings_duplicate_seconds_spinbox.value(),
+                                                 "Min Length": self.settings_duplicate_length_spinbox.value(),
+                                                 "Penalty": self.settings_duplicate_penalty_combobox.currentText()}
+        self.api.bot.set_flood_protection(self.settings["Flood Protection"])
+        self.api.bot.set_duplicate_protection(self.settings["Duplicate Protection"])
+        chat_log_settings = {"Enabled": self.settings_chat_log_enabled_checkbox.isChecked(),
+                             "Format": self.settings_chat_log_format_combobox.currentText(),
+                             "Compression": self.settings_chat_log_compression_combobox.currentText(),
+                             "Rotate Minutes": self.settings_chat_log_rotate_spinbox.value()}
+        if chat_log_settings != self.settings["Chat Log"]:
+            self.settings["Chat Log"] = chat_log_settings
+            self.api.bot.set_chat_log(chat_log_settings)
+        self.settings["Chat Shards"] = self.settings_chat_shards_spinbox.value()
 
         if not (self.settings == self.old_settings):
             with open("settings.json", "w") as settings_file:
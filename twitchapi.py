@@ -245,8 +245,10 @@ class Twitch_api:
                     response = self.twitch_helix.get_user_block_list(broadcaster_id=self.own_id, first=100, after=page["cursor"])
                 progress_callback.emit({response_element["user_login"]: response_element["user_id"] for response_element in response["data"]})
                 page = response["pagination"]
+            return self.run_flag[0]
         except Exception as e:
             print(e)
+            return False
 
     def get_banned_users(self, progress_callback):
         try:
@@ -260,20 +262,22 @@ class Twitch_api:
                 progress_callback.emit([[response_element["user_login"], response_element["user_id"], response_element["expires_at"]] for response_element in response["data"]])
                 page = response["pagination"]
                 time.sleep(1)
+            return self.run_flag[0]
         except Exception as e:
             print(e)
+            return False
 
     # </editor-fold>
 
     # <editor-fold desc="Pubsub Section">
     def init_pubsub(self, progress_callback):
-        mod_actions_callback = partial(self.pubsub_mod_actions_callback, progress_callback)
-        channel_ids = self.names_to_id(self.credentials["bot channels"])
-        for channel in channel_ids:
-            self.pubsub.listen_chat_moderator_actions(self.own_id, channel, mod_actions_callback)
+        channel_ids = self.names_to_ids(self.credentials["bot channels"])
+        for channel, channel_id in channel_ids.items():
+            mod_actions_callback = partial(self.pubsub_mod_actions_callback, progress_callback, channel)
+            self.pubsub.listen_chat_moderator_actions(self.own_id, channel_id, mod_actions_callback)
 
         self.pubsub.start()
 
-    def pubsub_mod_actions_callback(self, mod_action_signal, *args):
-        mod_action_signal.emit(args)
+    def pubsub_mod_actions_callback(self, mod_action_signal, channel, *args):
+        mod_action_signal.emit((channel, *args))
     # </editor-fold>
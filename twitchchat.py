@@ -5,6 +5,12 @@ from typing import List
 import twitchio
 from twitchio.ext import commands
 
+import chatlog
+import chatshards
+import moderation
+import spamdetect
+from chatfilter import CompiledFilterSet
+
 mod_timeout = 0.4
 non_mod_timeout = 1.7
 
@@ -13,25 +19,138 @@ class Bot(commands.Bot):
     def __init__(self, token, client_id, nickname, command_prefix, channels_to_join, message_timeout=non_mod_timeout):
         self.eventloop = asyncio.get_event_loop()
         self.message_timeout = message_timeout
+        self._login = (token, client_id, nickname)
         super().__init__(irc_token=f"oauth:{token}", client_id=client_id, nick=nickname, prefix=command_prefix,
-                         initial_channels=channels_to_join, loop=self.eventloop)
+                         initial_channels=channels_to_join, loop=self.eventloop, inline_dispatch=True)
+        self.filter_set = CompiledFilterSet()
+        self.moderation_queue = moderation.ModerationQueue(self, interval=message_timeout)
+        self.flood_detector = spamdetect.FloodDetector()
+        self.flood_penality = ""  # flood protection is disabled while empty
+        self.duplicate_detector = spamdetect.DuplicateDetector()
+        self.duplicate_penality = ""
+        self.chat_log: chatlog.ChatLogWriter = None
+        self.chat_history = None  # warehouse.ChatHistory, set by the UI
+        self.shards: chatshards.ChatShards = None
+
+    def set_filters(self, filter_set: CompiledFilterSet):
+        """Swaps in the compiled filters, safe to call from any thread"""
+        self.filter_set = filter_set
+
+    def set_flood_protection(self, settings: dict):
+        """
+        :param settings: The "Flood Protection" settings (Enabled, Messages, Seconds, Penalty)
+        """
+        self.flood_detector.configure(int(settings["Messages"]), float(settings["Seconds"]))
+        self.flood_penality = settings["Penalty"] if settings["Enabled"] else ""
+
+    def set_duplicate_protection(self, settings: dict):
+        """
+        :param settings: The "Duplicate Protection" settings (Enabled, Users, Seconds, Min Length, Penalty)
+        """
+        self.duplicate_detector.configure(int(settings["Users"]), float(settings["Seconds"]), int(settings["Min Length"]))
+        self.duplicate_penality = settings["Penalty"] if settings["Enabled"] else ""
+
+    def set_chat_log(self, settings: dict = None):
+        """
+        :param settings: The "Chat Log" settings (Enabled, Format, Compression, Rotate Minutes), None to stop logging
+
+        Restarts the log writer, messages still queued in the old one are written before it stops.
+        """
+        old_log, self.chat_log = self.chat_log, None
+        if old_log is not None:
+            old_log.stop()
+        if settings and settings["Enabled"]:
+            self.chat_log = chatlog.ChatLogWriter(log_format=settings["Format"], compression=settings["Compression"],
+                                                  rotate_seconds=int(settings["Rotate Minutes"]) * 60)
+            self.chat_log.start()
+
+    def start_shards(self, count: int):
+        """
+        :param count: Worker processes reading the bot channels, 0 reads them on the bot's own connection
+
+        Must be called before the bot runs, the bot's connection then joins no channels and only
+        handles what isn't chat.
+        """
+        if count <= 0 or self.shards is not None:
+            return
+        token, client_id, nickname = self._login
+        self.shards = chatshards.ChatShards(self, count, token, client_id, nickname, self.initial_channels or [])
+        self._ws._initial_channels = []
+        self.shards.start()
+        print(f"Reading {len(self.shards.assignment)} channels with {len(self.shards)} chat shards")
+
+    def stop_shards(self):
+        shards, self.shards = self.shards, None
+        if shards is not None:
+            shards.stop()
+
+    def get_channel(self, name: str):
+        channel = super().get_channel(name)
+        if channel is None and self.shards is not None:
+            channel = self.shards.channel(name.lower())
+        return channel
 
     def stop_loop(self):
         for task in asyncio.Task.all_tasks():
             task.cancel()
 
-    async def event_pubsub(self, data):
-        pass
-
     # Events don't need decorators when subclassed
     async def event_ready(self):
         print(f'Ready | {self.nick}')
+        if self.shards is not None:
+            self.shards.attach(self.loop)
         self.progress_callback.emit("hello")
 
+    async def event_join_progress(self, joined, failed, total):
+        if joined + failed == total or joined % 50 == 0:
+            print(f"Joined {joined} of {total} channels" + (f", {failed} failed" if failed else ""))
+
     async def event_message(self, message):
+        chat_log = self.chat_log
+        if chat_log is not None:
+            chat_log.log(message)
+        if self.chat_history is not None and message.author is not None:
+            self.record_history(message)
+        if not message.echo:
+            self.moderate(message)
         self.progress_callback.emit(message)
         # await self.handle_commands(message)
 
+    def record_history(self, message: twitchio.Message):
+        tags = message.tags or {}
+        sent_at = tags.get("tmi-sent-ts")
+        user_id = tags.get("user-id")
+        self.chat_history.record_message(message.channel.name, message.author.name, int(user_id) if user_id else None,
+                                         int(sent_at) / 1000 if sent_at else time.time(), message.content)
+
+    def moderate(self, message: twitchio.Message):
+        author = message.author
+        if author is None or author.is_mod:
+            return
+        channel = message.channel.name
+        message_id = message.tags.get("id", "") if message.tags else ""
+
+        result = self.filter_set.match(message.content, author.name)
+        if result:
+            print(f"filter triggered: {result.filter.filter_type}\nMessage Author: {author.name}\nMessage Content: {message.content.strip()}\nTriggering Part:{result.part}\nPenality: {result.penality}")
+            self.moderation_queue.put(moderation.Penalty(channel=channel, user=author.name, penality=result.penality,
+                                                         message_ids=(message_id,) if message_id else (), reason=f"Filter: {result.part}"))
+
+        if self.flood_penality:
+            flood_ids = self.flood_detector.check(channel, author.name, message_id)
+            if flood_ids is not None:
+                print(f"flood detected: {author.name} sent {self.flood_detector.max_messages} messages in {channel} within {self.flood_detector.window}s")
+                self.moderation_queue.put(moderation.Penalty(channel=channel, user=author.name, penality=self.flood_penality,
+                                                             message_ids=flood_ids, reason="Flooding"))
+
+        if self.duplicate_penality:
+            cluster = self.duplicate_detector.check(channel, author.name, message.content, message_id)
+            if cluster:
+                print(f"duplicate messages detected in {channel}: {', '.join(user for user, _ in cluster)}")
+            for user, duplicate_id in cluster:
+                self.moderation_queue.put(moderation.Penalty(channel=channel, user=user, penality=self.duplicate_penality,
+                                                             message_ids=(duplicate_id,) if duplicate_id else (), reason="Copypasta"))
+
     async def _ban_namelist(self, channel: str, namelist: List[str], progress_callback=None):
         chnl: twitchio.dataclasses.Channel = self.get_channel(channel)
         num_of_names_to_ban = len(namelist)
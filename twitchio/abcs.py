@@ -25,39 +25,10 @@ DEALINGS IN THE SOFTWARE.
 """
 
 import abc
-import time
 
-from .cooldowns import RateBucket
 from .errors import *
 
 
-class IRCLimiterMapping:
-
-    def __init__(self):
-        self.buckets = {}
-
-    def get_bucket(self, channel: str, method: str) -> RateBucket:
-        try:
-            bucket = self.buckets[channel]
-        except KeyError:
-            bucket = RateBucket(method=method)
-            self.buckets[channel] = bucket
-
-        if bucket.method != method:
-            bucket.method = method
-            if method == 'mod':
-                bucket.limit = bucket.MODLIMIT
-            else:
-                bucket.limit = bucket.IRCLIMIT
-
-            self.buckets[channel] = bucket
-
-        return bucket
-
-
-limiter = IRCLimiterMapping()
-
-
 class Messageable(metaclass=abc.ABCMeta):
 
     __slots__ = ()
@@ -79,26 +50,6 @@ class Messageable(metaclass=abc.ABCMeta):
     def _get_method(self):
         raise NotImplementedError
 
-    def check_bucket(self, channel):
-        ws = self._get_socket
-
-        try:
-            bot = ws._channel_cache[channel]['bot']
-        except KeyError:
-            bucket = limiter.get_bucket(channel=channel, method='irc')
-        else:
-            if bot.is_mod:
-                bucket = limiter.get_bucket(channel=channel, method='mod')
-            else:
-                bucket = limiter.get_bucket(channel=channel, method='irc')
-
-        now = time.time()
-        bucket.update()
-
-        if bucket.limited:
-            raise TwitchIOBException(f'IRC Message rate limit reached for channel <{channel}>.'
-                                     f' Please try again in {bucket._reset - now:.2f}s')
-
     @staticmethod
     def check_content(channel, content: str):
         if not channel:
@@ -115,6 +66,8 @@ class Messageable(metaclass=abc.ABCMeta):
         Destination will either be a channel or user.
         Chat commands are not allowed to be invoked with this method.
 
+        Messages are queued until the IRC rate limits allow them, this returns once it was sent.
+
         Parameters
         ------------
         content: str
@@ -139,7 +92,6 @@ class Messageable(metaclass=abc.ABCMeta):
                 raise InvalidContent('UnAuthorised chat command for send. Use built in method(s).')
 
         ws = self._get_socket
-        self.check_bucket(channel)
 
         if method == 'User':
             content = f'.w {user} {content}'
@@ -155,8 +107,6 @@ class Messageable(metaclass=abc.ABCMeta):
         ws = self._get_socket
         channel, _ = self._get_channel()
 
-        self.check_bucket(channel)
-
         await ws.send_privmsg(channel, content=f'.clear')
 
     async def slow(self):
@@ -168,8 +118,6 @@ class Messageable(metaclass=abc.ABCMeta):
         ws = self._get_socket
         channel, _ = self._get_channel()
 
-        self.check_bucket(channel)
-
         await ws.send_privmsg(channel, content=f'.slow')
 
     async def unslow(self):
@@ -181,8 +129,6 @@ class Messageable(metaclass=abc.ABCMeta):
         ws = self._get_socket
         channel, _ = self._get_channel()
 
-        self.check_bucket(channel)
-
         await ws.send_privmsg(channel, content=f'.slowoff')
 
     async def slow_off(self):
@@ -210,8 +156,6 @@ class Messageable(metaclass=abc.ABCMeta):
         ws = self._get_socket
         channel, _ = self._get_channel()
 
-        self.check_bucket(channel)
-
         await ws.send_privmsg(channel, content=f'.timeout {user} {duration} {reason}')
 
     async def ban(self, user: str, reason: str=''):
@@ -230,8 +174,6 @@ class Messageable(metaclass=abc.ABCMeta):
         ws = self._get_socket
         channel, _ = self._get_channel()
 
-        self.check_bucket(channel)
-
         await ws.send_privmsg(channel, content=f'.ban {user} {reason}')
 
     async def unban(self, user: str):
@@ -248,8 +190,6 @@ class Messageable(metaclass=abc.ABCMeta):
         ws = self._get_socket
         channel, _ = self._get_channel()
 
-        self.check_bucket(channel)
-
         await ws.send_privmsg(channel, content=f'.unban {user}')
 
     async def send_me(self, content: str):
@@ -271,7 +211,6 @@ class Messageable(metaclass=abc.ABCMeta):
         ws = self._get_socket
         channel, _ = self._get_channel()
 
-        self.check_bucket(channel)
         self.check_content(channel, content)
 
         await ws.send_privmsg(channel, content=f'.me {content}')
@@ -303,7 +242,6 @@ class Messageable(metaclass=abc.ABCMeta):
         ws = self._get_socket
         channel, _ = self._get_channel()
 
-        self.check_bucket(channel)
         await ws.send_privmsg(channel, content=f'.color {colour}')
 
     async def color(self, colour: str):
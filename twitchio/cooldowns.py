@@ -25,6 +25,7 @@ DEALINGS IN THE SOFTWARE.
 """
 
 import asyncio
+import collections
 import time
 
 
@@ -80,3 +81,85 @@ class RateBucket:
 
         await asyncio.sleep(self._reset - now)
         self.reset()
+
+
+class TokenBucket:
+    """A bucket of ``rate`` tokens, each taken token comes back ``per`` seconds later, on the monotonic clock.
+
+    Unlike a continuously refilled bucket, which can allow twice its rate within ``per`` seconds
+    after being full, this never allows more than ``rate`` tokens in any ``per`` seconds, which is
+    how Twitch counts.
+    """
+
+    __slots__ = ('rate', 'per', '_taken')
+
+    def __init__(self, rate: int, per: float):
+        self.rate = rate
+        self.per = per
+        self._taken = collections.deque()
+
+    def delay(self, now: float = None) -> float:
+        """Seconds until a token is available, 0 if one is."""
+        now = time.monotonic() if now is None else now
+        taken = self._taken
+        while taken and taken[0] <= now - self.per:
+            taken.popleft()
+        if len(taken) < self.rate:
+            return 0
+        return taken[len(taken) - self.rate] + self.per - now
+
+    def take(self, now: float = None):
+        self._taken.append(time.monotonic() if now is None else now)
+
+
+class IRCLimiter:
+    """The IRC message rate limits as a hierarchy of token buckets.
+
+    A line to a channel takes a token from the bucket of the channel, ``MODLIMIT`` lines per ``IRC``
+    seconds where the bot is a moderator and ``IRCLIMIT`` elsewhere, from the account wide bucket of
+    the channels it doesn't moderate (``IRCLIMIT``) if it doesn't moderate this one, and from the
+    account wide bucket of every channel (``rate`` per ``per`` seconds).
+
+    The moderator status is taken from the USERSTATE and MODE lines of the bot, see :meth:`set_mod`.
+    """
+
+    def __init__(self, rate: int = RateBucket.MODLIMIT, per: float = RateBucket.IRC):
+        self._global = TokenBucket(rate, per)
+        self._users = TokenBucket(RateBucket.IRCLIMIT, RateBucket.IRC)
+        self._channels = {}
+        self._mods = set()
+
+    def set_mod(self, channel: str, is_mod: bool):
+        if is_mod:
+            self._mods.add(channel)
+        else:
+            self._mods.discard(channel)
+
+        bucket = self._channels.get(channel)
+        if bucket is not None:
+            bucket.rate = RateBucket.MODLIMIT if is_mod else RateBucket.IRCLIMIT
+
+    def forget(self, channel: str):
+        """Drops the state of a parted channel."""
+        self._mods.discard(channel)
+        self._channels.pop(channel, None)
+
+    def _buckets(self, channel: str) -> tuple:
+        is_mod = channel in self._mods
+        bucket = self._channels.get(channel)
+        if bucket is None:
+            bucket = self._channels[channel] = TokenBucket(RateBucket.MODLIMIT if is_mod else RateBucket.IRCLIMIT, RateBucket.IRC)
+        if is_mod:
+            return bucket, self._global
+        return bucket, self._users, self._global
+
+    def delay(self, channel: str, now: float = None) -> float:
+        """Seconds until a line may be sent to channel, 0 if it may be sent now."""
+        now = time.monotonic() if now is None else now
+        return max(bucket.delay(now) for bucket in self._buckets(channel))
+
+    def take(self, channel: str, now: float = None):
+        """Takes the tokens of a line sent to channel."""
+        now = time.monotonic() if now is None else now
+        for bucket in self._buckets(channel):
+            bucket.take(now)
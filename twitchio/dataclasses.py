@@ -91,14 +91,14 @@ class Message:
 
 class Channel(Messageable):
 
-    __slots__ = ('_channel', '_ws', '_http', '_echo', '_users')
+    __slots__ = ('_channel', '_ws', '_http', '_echo', '_members')
 
     def __init__(self, name, ws, http):
         self._channel = name
         self._http = http
         self._ws = ws
         self._echo = False
-        self._users = {}
+        self._members = set()
 
     def __str__(self):
         return self._channel
@@ -108,10 +108,22 @@ class Channel(Messageable):
         """The channel name."""
         return self._channel
 
+    @property
+    def members(self) -> frozenset:
+        """The logins of the channel's members, as announced by NAMES, JOIN and PART.
+
+        At most :attr:`.WebsocketConnection.CHANNEL_MEMBERS_MAX` logins are kept per channel.
+        """
+        return frozenset(self._members)
+
     @property
     def chatters(self) -> list:
-        """The channel's chatters."""
-        return list(self._users.values())
+        """The channel's chatters.
+
+        Users are created on access from :attr:`members`, they carry no tags.
+        """
+        socket = getattr(self._ws, '_websocket', None)
+        return [User(author=login, channel=self, tags=None, ws=socket) for login in self._members]
 
     def _get_channel(self) -> Tuple[str, None]:
         return self.name, None
@@ -183,8 +195,7 @@ class Channel(Messageable):
 
 class User:
 
-    __slots__ = ('_name', '_channel', '_tags', 'display_name', '_id', 'type',
-                 '_colour', 'subscriber', 'turbo', '_badges', '_ws', '_mod')
+    __slots__ = ('_name', '_channel', '_tags', '_badges', '_ws', '_mod')
 
     def __init__(self, ws, **attrs):
         self._name = attrs.pop('author', None)
@@ -192,24 +203,13 @@ class User:
         self._tags = attrs.pop('tags', None)
         self._ws = ws
 
+        # Everything else is read from the tags on access, most handlers only need the name
         if not self._tags:
             self._tags = {}
-
-        self.display_name = self._tags.get('display-name', self._name)
-        self._id = int(self._tags.get('user-id', 0))
-        self.type = self._tags.get('user-type', 'Empty')
-        self._colour = self._tags.get('color', None)
-        self.subscriber = self._tags.get('subscriber', None)
-        self.turbo = self._tags.get('turbo', None)
-
-        self._badges = {}
-        badges = self._tags.get('badges', None)
-        if badges:
-            for chunk in badges.split(','):
-                k, _, v = chunk.partition('/')
-                self._badges[k] = v
-
-        self._mod = int(self._tags.get('mod', 0)) if self._tags else attrs.get('mod', 0)
+            self._mod = attrs.get('mod', 0)
+        else:
+            self._mod = None
+        self._badges = None
 
     def __repr__(self):
         return '<User name={0.name} channel={0._channel}>'.format(self)
@@ -225,12 +225,25 @@ class User:
         """The user's name."""
         return self._name
 
+    @property
+    def display_name(self) -> str:
+        """The user's display name, the name if no Tags were received."""
+        return self._tags.get('display-name', self._name)
+
     @property
     def id(self) -> int:
         """The user's ID.
 
          Could be 0 if no Tags were received."""
-        return self._id
+        return int(self._tags.get('user-id', 0))
+
+    @property
+    def type(self) -> str:
+        """The user's type, e.g. mod or an empty string.
+
+        'Empty' if no Tags were received.
+        """
+        return self._tags.get('user-type', 'Empty')
 
     @property
     def channel(self) -> Channel:
@@ -250,7 +263,7 @@ class User:
 
         Could be None if no Tags were received.
         """
-        return self._colour
+        return self._tags.get('color', None)
 
     @property
     def color(self) -> Optional[str]:
@@ -265,6 +278,14 @@ class User:
         """
         return self.turbo
 
+    @property
+    def turbo(self):
+        """The turbo tag, 1 or 0.
+
+        Could be None if no Tags were received.
+        """
+        return self._tags.get('turbo', None)
+
     @property
     def is_subscriber(self) -> bool:
         """A boolean indicating whether the User is a subscriber of the current channel.
@@ -273,12 +294,27 @@ class User:
         """
         return self.subscriber
 
+    @property
+    def subscriber(self):
+        """The subscriber tag, 1 or 0.
+
+        Could be None if no Tags were received.
+        """
+        return self._tags.get('subscriber', None)
+
     @property
     def badges(self) -> dict:
         """The badges associated with the User.
 
         Could be an empty Dict if no Tags were received.
         """
+        if self._badges is None:
+            self._badges = {}
+            badges = self._tags.get('badges', None)
+            if badges:
+                for chunk in badges.split(','):
+                    k, _, v = chunk.partition('/')
+                    self._badges[k] = v
         return self._badges
 
     @property
@@ -298,9 +334,9 @@ class User:
         --------
         Optional[:class:`str`] Either blue, pink, or None
         """
-        if "blue-1" in self._badges:
+        if "blue-1" in self.badges:
             return "blue"
-        elif "pink-2" in self._badges:
+        elif "pink-2" in self.badges:
             return "pink"
 
         return None
@@ -308,6 +344,8 @@ class User:
     @property
     def is_mod(self) -> bool:
         """A boolean indicating whether the User is a moderator of the current channel."""
+        if self._mod is None:
+            self._mod = int(self._tags.get('mod', 0))
         if self._mod == 1:
             return True
         if self.channel.name == self.name.lower():
@@ -41,7 +41,7 @@ from twitchio.client import Client
 from twitchio.dataclasses import Context
 from twitchio.errors import ClientError
 from twitchio.webhook import TwitchWebhookServer
-from twitchio.websocket import WebsocketConnection
+from twitchio.websocket import WebsocketConnection, noop_event
 
 
 class Bot(Client):
@@ -257,6 +257,7 @@ class Bot(Client):
                 del self.extra_listeners[name]
             elif name in self.extra_listeners:
                 del self.extra_listeners[member.__name__]
+        self._ws.refresh_dispatch()
 
         try:
             unload = getattr(cog, f'_{cog.__name__}__unload')
@@ -591,6 +592,7 @@ class Bot(Client):
         """
         pass
 
+    @noop_event
     async def event_webhook(self, data):
         """|coro|
 
@@ -607,6 +609,7 @@ class Bot(Client):
         """
         pass
 
+    @noop_event
     async def event_raw_pubsub(self, data):
         """|coro|
 
@@ -621,25 +624,41 @@ class Bot(Client):
         -------
         .. note::
 
-            No parsing is done on the JSON and thus the data will be raw.
-            A new event which parses the JSON will be released at a later date.
+            Only the frame is decoded, the message of a MESSAGE frame is still a JSON string.
+            See :meth:`event_pubsub` for the decoded messages.
         """
         pass
 
-    async def event_pubsub(self, data):
-        raise NotImplementedError
+    @noop_event
+    async def event_pubsub(self, message):
+        """|coro|
+
+        Event which fires for every message of the subscribed PubSub topics.
+
+        Parameters
+        ------------
+        message: :class:`twitchio.pubsub.PubSubMessage`
+            The decoded message, a :class:`twitchio.pubsub.ModerationAction`, :class:`twitchio.pubsub.Redemption`
+            or :class:`twitchio.pubsub.BitsEvent` for those topics.
+        """
+        pass
 
-    async def pubsub_subscribe(self, token: str, *topics):
+    async def pubsub_subscribe(self, token: str, *topics, callback=None):
         """|coro|
 
         Method which sends a LISTEN event over PubSub. This subscribes you to the topics provided.
 
+        Topics already subscribed are skipped. PubSub connections are opened when needed, topics are
+        placed on the connection with the fewest topics.
+
         Parameters
         ------------
         token: str [Required]
             The oAuth token to use to subscribe.
         \*topics: Union[str] [Required]
             The topics to subscribe to.
+        callback: Optional[coroutine function]
+            Called with the :class:`twitchio.pubsub.PubSubMessage` of every message of these topics.
 
         Raises
         --------
@@ -655,8 +674,32 @@ class Bot(Client):
         """
         nonce = uuid.uuid4().hex
 
-        connection = await self._ws._pubsub_pool.delegate(*topics)
-        await connection.subscribe(token, nonce, *topics)
+        await self._ws._pubsub_pool.subscribe(token, nonce, *topics, callback=callback)
+
+        return nonce
+
+    async def pubsub_unsubscribe(self, token: str, *topics):
+        """|coro|
+
+        Method which sends an UNLISTEN event over PubSub. This unsubscribes you from the topics provided.
+
+        Connections left without topics are closed after a while.
+
+        Parameters
+        ------------
+        token: str [Required]
+            The oAuth token used to subscribe.
+        \*topics: Union[str] [Required]
+            The topics to unsubscribe from.
+
+        Returns
+        ---------
+        nonce: str
+            The nonce associated with this request. Useful for validating responses.
+        """
+        nonce = uuid.uuid4().hex
+
+        await self._ws._pubsub_pool.unsubscribe(token, nonce, *topics)
 
         return nonce
 
@@ -675,6 +718,7 @@ class Bot(Client):
         print('Ignoring exception in command: {0}:'.format(error), file=sys.stderr)
         traceback.print_exception(type(error), error, error.__traceback__, file=sys.stderr)
 
+    @noop_event
     async def event_mode(self, channel, user, status):
         """|coro|
 
@@ -692,6 +736,7 @@ class Bot(Client):
         """
         pass
 
+    @noop_event
     async def event_userstate(self, user):
         """|coro|
 
@@ -704,6 +749,7 @@ class Bot(Client):
         """
         pass
 
+    @noop_event
     async def event_raw_usernotice(self, channel, tags: dict):
         """|coro|
 
@@ -730,6 +776,7 @@ class Bot(Client):
         """
         pass
 
+    @noop_event
     async def event_usernotice_subscription(self, metadata):
         """|coro|
 
@@ -743,6 +790,7 @@ class Bot(Client):
         """
         pass
 
+    @noop_event
     async def event_part(self, user):
         """|coro|
 
@@ -755,6 +803,7 @@ class Bot(Client):
         """
         pass
 
+    @noop_event
     async def event_join(self, user):
         """|coro|
 
@@ -767,6 +816,53 @@ class Bot(Client):
         """
         pass
 
+    @noop_event
+    async def event_join_progress(self, joined, failed, total):
+        """|coro|
+
+        Event called whenever a channel requested with :meth:`join_channels` was joined or failed to join.
+
+        Parameters
+        ------------
+        joined: int
+            The number of channels joined so far.
+        failed: int
+            The number of channels that couldn't be joined, even after retries.
+        total: int
+            The number of channels requested so far.
+        """
+        pass
+
+    @noop_event
+    async def event_members_join(self, channel, logins):
+        """|coro|
+
+        Event called once per channel for the JOINs and NAMES of one batch of received lines.
+
+        Parameters
+        ------------
+        channel: :class:`.Channel`
+            The channel the users joined.
+        logins: list
+            The logins of the users who joined, in received order.
+        """
+        pass
+
+    @noop_event
+    async def event_members_part(self, channel, logins):
+        """|coro|
+
+        Event called once per channel for the PARTs of one batch of received lines.
+
+        Parameters
+        ------------
+        channel: :class:`.Channel`
+            The channel the users left.
+        logins: list
+            The logins of the users who left, in received order.
+        """
+        pass
+
     async def event_message(self, message):
         """|coro|
 
@@ -801,6 +897,7 @@ class Bot(Client):
         """
         traceback.print_exception(type(error), error, error.__traceback__, file=sys.stderr)
 
+    @noop_event
     async def event_ready(self):
         """|coro|
 
@@ -816,6 +913,7 @@ class Bot(Client):
         """
         pass
 
+    @noop_event
     async def event_raw_data(self, data):
         """|coro|
 
@@ -836,6 +934,7 @@ class Bot(Client):
         """
         pass
 
+    @noop_event
     async def event_clearchat(self, notice):
         """|coro|
 
@@ -905,6 +1004,7 @@ class Bot(Client):
             raise TypeError('Events must be coroutines.')
 
         setattr(self, func.__name__, func)
+        self._ws.refresh_dispatch()
         return func
 
     def check(self, func):
@@ -952,6 +1052,7 @@ class Bot(Client):
             self.extra_listeners[name] = [func]
         else:
             self.extra_listeners[name].append(func)
+        self._ws.refresh_dispatch()
 
     def listen(self, event: str=None):
         """Decorator which adds a coroutine as a listener to an event.
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2017-2021 TwitchIO
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+__all__ = ('IRCLine', 'Tags', 'parse_line', 'unescape_tag')
+
+
+import re
+from collections.abc import Mapping
+from typing import Iterator, List, Optional, Union
+
+_TAG_ESCAPES = {':': ';', 's': ' ', '\\': '\\', 'r': '\r', 'n': '\n'}
+_TAG_ESCAPE_REGEX = re.compile(r'\\(.?)')
+_MISSING = object()
+
+
+def unescape_tag(value: str) -> str:
+    """Reverses the IRCv3 tag value escaping, unknown escapes lose their backslash."""
+    if '\\' not in value:
+        return value
+    return _TAG_ESCAPE_REGEX.sub(lambda match: _TAG_ESCAPES.get(match.group(1), match.group(1)), value)
+
+
+def _tag_value(value: str) -> Union[str, int]:
+    value = unescape_tag(value)
+    return int(value) if value.isdecimal() else value
+
+
+class Tags(Mapping):
+    """Read only mapping over the raw IRCv3 tags of a line.
+
+    Only the raw tag string is kept, a value is looked up, unescaped and converted (decimal values
+    to int) on first access and cached. Iterating parses all remaining tags at once.
+    """
+
+    __slots__ = ('_raw', '_values', '_complete')
+
+    def __init__(self, raw: str):
+        self._raw = f';{raw};'
+        self._values = {}
+        self._complete = False
+
+    def __repr__(self):
+        return f'<Tags {dict(self)!r}>'
+
+    def __bool__(self):
+        return len(self._raw) > 2
+
+    def _lookup(self, key: str, default=_MISSING):
+        try:
+            return self._values[key]
+        except KeyError:
+            if self._complete:
+                return default
+
+        raw = self._raw
+        start = raw.find(f';{key}=')
+        if start != -1:
+            start += len(key) + 2
+            value = _tag_value(raw[start:raw.index(';', start)])
+        elif f';{key};' in raw:
+            value = ''
+        else:
+            return default
+
+        self._values[key] = value
+        return value
+
+    def __getitem__(self, key: str) -> Union[str, int]:
+        value = self._lookup(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default=None):
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def __contains__(self, key) -> bool:
+        return self._lookup(key) is not _MISSING
+
+    def _parse_all(self) -> dict:
+        if not self._complete:
+            # Rebuilt in the order received, reusing the values parsed so far
+            values = {}
+            for tag in self._raw[1:-1].split(';'):
+                key, _, value = tag.partition('=')
+                values[key] = self._values[key] if key in self._values else _tag_value(value)
+            self._values = values
+            self._complete = True
+        return self._values
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._parse_all())
+
+    def __len__(self) -> int:
+        return len(self._parse_all())
+
+    @property
+    def raw(self) -> str:
+        """The tag string as received, without the leading @."""
+        return self._raw[1:-1]
+
+
+class IRCLine:
+    """A single tokenized IRC line.
+
+    Attributes
+    ------------
+    tags : Optional[:class:`Tags`]
+        The IRCv3 tags, None if the line had none.
+    prefix : Optional[str]
+        The source of the line without the leading colon, e.g. ``nick!nick@nick.tmi.twitch.tv``.
+    command : str
+        The command or numeric reply, e.g. ``PRIVMSG`` or ``353``.
+    params : List[str]
+        The middle parameters.
+    trailing : Optional[str]
+        The trailing parameter without its leading colon, None if the line had none.
+    """
+
+    __slots__ = ('tags', 'prefix', 'command', 'params', 'trailing')
+
+    def __init__(self, tags: Optional[Tags], prefix: Optional[str], command: str, params: List[str], trailing: Optional[str]):
+        self.tags = tags
+        self.prefix = prefix
+        self.command = command
+        self.params = params
+        self.trailing = trailing
+
+    def __repr__(self):
+        return f'<IRCLine prefix={self.prefix!r} command={self.command!r} params={self.params!r} trailing={self.trailing!r}>'
+
+    @property
+    def author(self) -> Optional[str]:
+        """The nick of a ``nick!user@host`` prefix, None for server lines."""
+        if self.prefix:
+            end = self.prefix.find('!')
+            if end > 0:
+                return self.prefix[:end]
+        return None
+
+    @property
+    def channel(self) -> Optional[str]:
+        """The channel of the line without the leading #, None if the first parameter isn't a channel."""
+        if self.params and self.params[0].startswith('#'):
+            return self.params[0][1:]
+        return None
+
+    @property
+    def content(self) -> Optional[str]:
+        """Everything after the channel, e.g. the message of a PRIVMSG or ``+o nick`` of a MODE."""
+        rest = self.params[1:]
+        if self.trailing is not None:
+            rest.append(self.trailing)
+        return ' '.join(rest) if rest else None
+
+
+def parse_line(line: str) -> Optional[IRCLine]:
+    """Tokenizes one IRC line in a single left to right scan.
+
+    Only the first line of a multi line frame is parsed. Returns None for empty or truncated lines.
+    """
+    end = line.find('\n')
+    if end != -1:
+        line = line[:end]
+    line = line.rstrip('\r')
+
+    tags = prefix = None
+    pos = 0
+    if line.startswith('@'):
+        pos = line.find(' ')
+        if pos == -1:
+            return None
+        tags = Tags(line[1:pos])
+        pos += 1
+    if line.startswith(':', pos):
+        end = line.find(' ', pos)
+        if end == -1:
+            return None
+        prefix = line[pos + 1:end]
+        pos = end + 1
+
+    end = line.find(' :', pos)
+    if end == -1:
+        middle = line[pos:].split()
+        trailing = None
+    else:
+        middle = line[pos:end].split()
+        trailing = line[end + 2:]
+    if not middle:
+        return None
+
+    return IRCLine(tags, prefix, middle[0], middle[1:], trailing)
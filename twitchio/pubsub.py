@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2017-2021 TwitchIO
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+__all__ = ('PubSubMessage', 'ModerationAction', 'Redemption', 'BitsEvent', 'decode_message', 'frame_topic')
+
+
+import json
+import re
+from typing import List, Optional
+
+_TOPIC_REGEX = re.compile(r'"topic"\s*:\s*"([^"]+)"')
+
+
+def frame_topic(frame: str) -> Optional[str]:
+    """The topic of a MESSAGE frame without decoding it, None for the other frame types."""
+    if '"MESSAGE"' not in frame:
+        return None
+    match = _TOPIC_REGEX.search(frame)
+    return match.group(1) if match else None
+
+
+class PubSubMessage:
+    """A decoded PubSub message of a topic without a typed record.
+
+    Attributes
+    ------------
+    topic : str
+        The topic, e.g. ``chat_moderator_actions.123.456``.
+    data : dict
+        The message, decoded from its JSON string.
+    """
+
+    __slots__ = ('topic', 'data')
+
+    def __init__(self, topic: str, data: dict):
+        self.topic = topic
+        self.data = data
+
+    def __repr__(self):
+        return f'<{type(self).__name__} topic={self.topic!r}>'
+
+    @property
+    def kind(self) -> str:
+        """The topic without its ids, e.g. ``chat_moderator_actions``."""
+        return self.topic.split('.', 1)[0]
+
+
+class ModerationAction(PubSubMessage):
+    """A message of a ``chat_moderator_actions`` topic.
+
+    Attributes
+    ------------
+    action : str
+        The moderation action, e.g. ``ban``, ``timeout`` or ``delete``.
+    args : List[str]
+        The arguments of the action, e.g. the user and the reason of a ban.
+    moderator : str
+        The login of the moderator.
+    target_id : Optional[str]
+        The id of the user the action targets, None if it targets no user.
+    created_at : Optional[str]
+        The time of the action, as received.
+    """
+
+    __slots__ = ('action', 'args', 'moderator', 'target_id', 'created_at')
+
+    def __init__(self, topic: str, data: dict):
+        super().__init__(topic, data)
+        action = data.get('data') or {}
+        self.action = action.get('moderation_action', '')
+        self.args: List[str] = action.get('args') or []
+        self.moderator = action.get('created_by', '')
+        self.target_id = action.get('target_user_id') or None
+        self.created_at = action.get('created_at')
+
+
+class Redemption(PubSubMessage):
+    """A message of a ``channel-points-channel-v1`` topic.
+
+    Attributes
+    ------------
+    user : str
+        The login of the redeeming user.
+    reward : str
+        The title of the reward.
+    cost : int
+        The cost of the reward in channel points.
+    user_input : Optional[str]
+        The text the user entered, None if the reward takes none.
+    redeemed_at : Optional[str]
+        The time of the redemption, as received.
+    """
+
+    __slots__ = ('user', 'reward', 'cost', 'user_input', 'redeemed_at')
+
+    def __init__(self, topic: str, data: dict):
+        super().__init__(topic, data)
+        redemption = (data.get('data') or {}).get('redemption') or {}
+        reward = redemption.get('reward') or {}
+        self.user = (redemption.get('user') or {}).get('login', '')
+        self.reward = reward.get('title', '')
+        self.cost = reward.get('cost', 0)
+        self.user_input = redemption.get('user_input')
+        self.redeemed_at = redemption.get('redeemed_at')
+
+
+class BitsEvent(PubSubMessage):
+    """A message of a ``channel-bits-events-v2`` topic.
+
+    Attributes
+    ------------
+    user : Optional[str]
+        The login of the cheering user, None if anonymous.
+    bits : int
+        The bits used.
+    message : str
+        The chat message of the cheer.
+    time : Optional[str]
+        The time of the cheer, as received.
+    """
+
+    __slots__ = ('user', 'bits', 'message', 'time')
+
+    def __init__(self, topic: str, data: dict):
+        super().__init__(topic, data)
+        event = data.get('data') or {}
+        self.user = event.get('user_name')
+        self.bits = event.get('bits_used', 0)
+        self.message = event.get('chat_message', '')
+        self.time = event.get('time')
+
+
+_RECORDS = {
+    'chat_moderator_actions': ModerationAction,
+    'channel-points-channel-v1': Redemption,
+    'channel-bits-events-v2': BitsEvent,
+}
+
+
+def decode_message(payload: dict) -> PubSubMessage:
+    """Decodes the ``data`` of a MESSAGE frame into the record of its topic.
+
+    The nested message JSON string is decoded here, exactly once.
+    """
+    topic = payload['topic']
+    message = payload['message']
+    data = json.loads(message) if isinstance(message, str) else message
+    return _RECORDS.get(topic.split('.', 1)[0], PubSubMessage)(topic, data)
@@ -26,59 +26,736 @@ DEALINGS IN THE SOFTWARE.
 
 import asyncio
 import async_timeout
+import collections
+import contextlib
+import contextvars
 import copy
-import functools
 import itertools
 import json
 import logging
+import random
 import re
 import secrets
 import sys
+import time
 import traceback
 import websockets
-from typing import Union
+from typing import Optional, Union
 
 from .backoff import ExponentialBackoff
+from .cooldowns import IRCLimiter, RateBucket
 from .dataclasses import *
 from .errors import WSConnectionFailure, AuthenticationError, ClientError
+from .irc import IRCLine, parse_line
+from .pubsub import decode_message, frame_topic
 
 
 log = logging.getLogger(__name__)
 
+# Membership changes of the lines being processed, see WebsocketConnection._process_lines
+_member_batch = contextvars.ContextVar('member_batch', default=None)
+# Priority of the lines sent by the current task, see SendQueue.priority
+_send_priority = contextvars.ContextVar('send_priority', default=None)
+
 
 class PubSubPool:
+    """Spreads PubSub topics over up to :attr:`POOL_MAX` connections of :attr:`TOPICS_MAX` topics.
+
+    Connections are opened on demand: topics go to the least loaded connection with room for them,
+    a new one is only opened when none has room. Every topic is indexed to its connection, so
+    unsubscribing doesn't scan the pool. A connection left without topics is closed after
+    :attr:`IDLE_TIMEOUT` seconds.
+
+    Messages are routed by topic, see :meth:`route`.
+    """
 
     POOL_MAX = 10
+    TOPICS_MAX = 50
+    IDLE_TIMEOUT = 60
 
     def __init__(self, loop: asyncio.BaseEventLoop, base):
         self.loop = loop
         self.base = base
         self.connections = {}
+        self.topics = {}  # topic: PubSub
+        self._callbacks = {}  # topic: list of callbacks
+        self._nodes = itertools.count(1)
+
+        self.decoded = 0
+        self.skipped = 0
+
+    def _place(self, count: int) -> 'PubSub':
+        nodes = [node for node in self.connections.values() if len(node._topics) + count <= self.TOPICS_MAX]
+        if nodes:
+            return min(nodes, key=lambda node: len(node._topics))
+
+        if len(self.connections) >= self.POOL_MAX:
+            raise ClientError('Maximum PubSub connections established.')
+        node = PubSub(loop=self.loop, pool=self, node=next(self._nodes))
+        self.connections[node.node] = node
+        return node
+
+    async def delegate(self, *topics) -> 'PubSub':
+        """The connected node topics would be placed on."""
+        node = self._place(len(topics))
+        try:
+            await node.ensure_connected()
+        except WSConnectionFailure:
+            self._idle(node)
+            raise
+        return node
+
+    async def subscribe(self, token: str, nonce: str, *topics: str, callback=None) -> list:
+        """Sends a LISTEN for the topics that aren't subscribed yet.
+
+        callback is a coroutine function called with the :class:`~twitchio.pubsub.PubSubMessage`
+        record of every message of the topics, until they are unsubscribed.
+
+        Returns
+        ---------
+        list
+            The topics subscribed by this call.
+        """
+        new = [topic for topic in dict.fromkeys(topics) if topic not in self.topics]
+        if new:
+            await self._listen(token, nonce, new)
+
+        # Registered once subscribed, a failed subscription leaves no callbacks behind
+        if callback is not None:
+            for topic in topics:
+                if topic not in self.topics:
+                    continue  # unsubscribed meanwhile
+                callbacks = self._callbacks.setdefault(topic, [])
+                if callback not in callbacks:
+                    callbacks.append(callback)
+        return new
+
+    async def _listen(self, token: str, nonce: str, topics: list):
+        # Placed before connecting, so concurrent subscriptions don't overfill a node
+        node = self._place(len(topics))
+        node.keep()
+        for topic in topics:
+            node._topics[topic] = token
+            self.topics[topic] = node
+
+        try:
+            await node.ensure_connected()
+        except WSConnectionFailure:
+            for topic in topics:
+                node._topics.pop(topic, None)
+                self.topics.pop(topic, None)
+            self._idle(node)
+            raise
+
+        await node.subscribe(token, nonce, *topics)
+
+    async def unsubscribe(self, token: str, nonce: str, *topics: str):
+        """Sends an UNLISTEN for the subscribed topics, nodes left without topics are reclaimed."""
+        by_node = {}
+        for topic in topics:
+            self._callbacks.pop(topic, None)
+            node = self.topics.pop(topic, None)
+            if node is not None:
+                node._topics.pop(topic, None)
+                by_node.setdefault(node, []).append(topic)
+
+        for node, node_topics in by_node.items():
+            if node._websocket is not None and node._websocket.open:
+                await node.unsubscribe(token, nonce, *node_topics)
+            self._idle(node)
+
+    async def route(self, topic: str, frame: str):
+        """Decodes a MESSAGE frame of topic once and hands the record to its callbacks and the ``pubsub`` event.
+
+        Frames of topics nobody handles are skipped before they are decoded.
+        """
+        base = self.base
+        callbacks = self._callbacks.get(topic)
+        raw = base.listens('raw_pubsub')
+        if not callbacks and not raw and not base.listens('pubsub'):
+            self.skipped += 1
+            return
+
+        data = json.loads(frame)
+        if raw:
+            await base._dispatch('raw_pubsub', data)
+
+        try:
+            record = decode_message(data['data'])
+        except (KeyError, TypeError, ValueError) as e:
+            log.warning('Undecodable PubSub message on %s | %s', topic, e)
+            return
+        self.decoded += 1
+
+        await base._dispatch('pubsub', record)
+        for callback in callbacks or ():
+            try:
+                await callback(record)
+            except Exception as e:
+                await base.event_error(e, frame)
+
+    def _idle(self, node: 'PubSub'):
+        if not node._topics and node._reclaim is None:
+            node._reclaim = self.loop.call_later(self.IDLE_TIMEOUT, self._reclaim, node)
+
+    def _reclaim(self, node: 'PubSub'):
+        node._reclaim = None
+        if node._topics or self.connections.get(node.node) is not node:
+            return
+
+        log.debug('PubSub %s has no topics left, closing', node.node)
+        del self.connections[node.node]
+        self.loop.create_task(node.close())
+
+    async def close(self):
+        for node in list(self.connections.values()):
+            node.keep()
+            await node.close()
+        self.connections.clear()
+        self.topics.clear()
+
+
+def noop_event(func):
+    """Marks a default event handler that does nothing, the event isn't dispatched unless it's overridden or listened to."""
+    func._noop_event = True
+    return func
+
+
+class HandlerPool:
+    """Runs event handlers on a fixed number of worker tasks.
+
+    Handlers for the same channel always land on the same worker, so they run one after another in
+    the order they were dispatched. Every worker has a bounded queue, submitting to a full queue
+    waits, which stops reading from the websocket until the handlers catch up.
+    """
+
+    def __init__(self, loop: asyncio.BaseEventLoop, on_error, workers: int=4, maxsize: int=1000):
+        self.loop = loop
+        self._on_error = on_error
+        self._queues = [asyncio.Queue(maxsize) for _ in range(max(workers, 1))]
+        self._workers = []
+        self.processed = 0
+        self.waited = 0
+
+    def __len__(self):
+        return sum(queue.qsize() for queue in self._queues)
+
+    async def submit(self, key, coro):
+        """Queues the handler coroutine on the worker of key, usually a channel name."""
+        if not self._workers:
+            self._workers = [self.loop.create_task(self._work(queue)) for queue in self._queues]
+
+        queue = self._queues[hash(key) % len(self._queues)]
+        try:
+            queue.put_nowait(coro)
+        except asyncio.QueueFull:
+            self.waited += 1
+            await queue.put(coro)
+
+    async def join(self):
+        """Waits until every queued handler ran."""
+        for queue in self._queues:
+            await queue.join()
+
+    def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+
+    async def _work(self, queue: asyncio.Queue):
+        while True:
+            coro = await queue.get()
+            try:
+                await coro
+            except Exception as e:
+                await self._on_error(e)
+            finally:
+                self.processed += 1
+                queue.task_done()
+
+
+class IngestQueue:
+    """Bounded queue of received IRC lines between the websocket and their processing.
+
+    PRIVMSG lines wait in a lane of at most maxsize lines. Once it is full the policy decides:
+
+    - ``block`` waits for room, which stops reading from the websocket until processing catches up
+    - ``drop_oldest`` drops the oldest queued PRIVMSG
+    - ``sample`` admits new PRIVMSGs with a probability falling from 1 at half the lane to 0 when full
+
+    Every other line (moderation lines like CLEARCHAT, CLEARMSG, USERNOTICE, NOTICE and MODE, but also
+    membership and connection lines) goes to a priority lane that is processed first and never
+    dropped, a full priority lane always blocks. A single consumer task hands the lines to process
+    in batches, in received order per lane.
+    """
+
+    POLICIES = ('block', 'drop_oldest', 'sample')
+    BATCH_SIZE = 100
+    DEDUP_MAX = 50000  # recent ids remembered while deduplicating
+
+    def __init__(self, loop: asyncio.BaseEventLoop, process, maxsize: int=10000, policy: str='block'):
+        if policy not in self.POLICIES:
+            raise ValueError(f'Unknown ingest policy {policy}')
+        self.loop = loop
+        self._process = process
+        self.maxsize = max(maxsize, 1)
+        self.policy = policy
+        self._priority = collections.deque()
+        self._messages = collections.deque()
+        self._pending = asyncio.Event()
+        self._space = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._consumer = None
+
+        self._seen = None
+
+        self.frames = 0
+        self.lines_per_frame = collections.Counter()
+        self.processed = 0
+        self.dropped = 0
+        self.waited = 0
+        self.duplicates = 0
+        self.max_depth = 0
+
+    def __len__(self):
+        return len(self._priority) + len(self._messages)
+
+    def stats(self) -> dict:
+        """Queue depths and counters, depth only counts the PRIVMSG lane."""
+        return {'depth': len(self._messages), 'priority_depth': len(self._priority), 'max_depth': self.max_depth,
+                'frames': self.frames, 'processed': self.processed, 'dropped': self.dropped, 'waited': self.waited,
+                'duplicates': self.duplicates}
+
+    def dedup(self, enabled: bool):
+        """Drops tagged lines seen before, by their id tag or the whole line if they have none.
+
+        Used while two connections receive the same channels, costs nothing while disabled.
+        """
+        self._seen = collections.OrderedDict() if enabled else None
+
+    async def put(self, frame: str):
+        """Tokenizes the lines of a websocket frame and queues them.
+
+        Twitch packs several CRLF separated lines into one frame under load, e.g. batched JOINs or
+        a NAMES list.
+        """
+        if self._consumer is None or self._consumer.done():
+            self._consumer = self.loop.create_task(self._consume())
+
+        lines = 0
+        for raw in frame.split('\n'):
+            raw = raw.strip()
+            if raw:
+                lines += 1
+                await self._put(raw, parse_line(raw))
+        self.frames += 1
+        self.lines_per_frame[lines] += 1
+
+    async def _put(self, raw: str, line: Optional[IRCLine]):
+        if line is None:
+            return
+
+        seen = self._seen
+        if seen is not None and line.tags:
+            key = line.tags.get('id') or raw
+            if key in seen:
+                self.duplicates += 1
+                return
+            seen[key] = None
+            if len(seen) > self.DEDUP_MAX:
+                seen.popitem(last=False)
+
+        if line.command != 'PRIVMSG':
+            lane = self._priority
+            while len(lane) >= self.maxsize:
+                await self._wait_space()
+        else:
+            lane = self._messages
+            if self.policy == 'sample':
+                threshold = self.maxsize // 2
+                if len(lane) >= threshold and random.random() * (self.maxsize - threshold) >= self.maxsize - len(lane):
+                    self.dropped += 1
+                    return
+            elif len(lane) >= self.maxsize:
+                if self.policy == 'drop_oldest':
+                    lane.popleft()
+                    self.dropped += 1
+                else:
+                    while len(lane) >= self.maxsize:
+                        await self._wait_space()
+
+        lane.append((raw, line))
+        self._pending.set()
+        self._idle.clear()
+        depth = len(self._priority) + len(self._messages)
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    async def _wait_space(self):
+        self.waited += 1
+        self._space.clear()
+        await self._space.wait()
+
+    async def join(self):
+        """Waits until every queued line was processed."""
+        await self._idle.wait()
+
+    def close(self):
+        if self._consumer is not None:
+            self._consumer.cancel()
+            self._consumer = None
+
+    async def _consume(self):
+        priority, messages = self._priority, self._messages
+        while True:
+            if not priority and not messages:
+                self._idle.set()
+                self._pending.clear()
+                await self._pending.wait()
+                continue
 
-        for x in range(1, 11):
-            self.connections[x] = PubSub(loop=self.loop, pool=self, node=x)
+            batch = []
+            while priority and len(batch) < self.BATCH_SIZE:
+                batch.append(priority.popleft())
+            while messages and len(batch) < self.BATCH_SIZE:
+                batch.append(messages.popleft())
+            self._space.set()
 
-    async def delegate(self, *topics):
-        for x in self.connections.values():
-            if len(x._topics) == 50:
+            try:
+                await self._process(batch)
+            except Exception:
+                # The only consumer of the queue has to outlive a failed batch
+                log.exception('Failed to process a batch of %s lines', len(batch))
+            self.processed += len(batch)
+            # Let _listen read the next frames, new priority lines overtake the queued messages
+            await asyncio.sleep(0)
+
+
+class JoinScheduler:
+    """Joins channels within Twitch's join rate limit.
+
+    Queued channels are packed into comma separated JOIN lines of at most 512 bytes, no more than
+    ``rate`` channels are sent per ``per`` seconds. A channel that isn't confirmed by its JOIN within
+    ``timeout`` seconds is queued again, up to ``retries`` times, then its future fails with
+    :class:`asyncio.TimeoutError`. Every confirmed or failed channel dispatches ``join_progress``.
+    """
+
+    MAX_LINE = 512
+
+    def __init__(self, connection: 'WebsocketConnection', rate: int=20, per: float=10, timeout: float=10, retries: int=2):
+        self._connection = connection
+        self.rate = max(rate, 1)
+        self.per = per
+        self.timeout = timeout
+        self.retries = retries
+        self._queue = collections.deque()
+        self._futures = {}
+        self._attempts = {}
+        self._sent = collections.deque()  # send times of the channels in the current window
+        self._task = None
+
+        self.total = 0
+        self.joined = 0
+        self.failed = 0
+        self.sent = 0
+        self.lines = 0
+
+    def __len__(self):
+        return len(self._futures)
+
+    def join(self, channels) -> list:
+        """Queues channels, already pending ones aren't queued twice.
+
+        Returns
+        ---------
+        list
+            A future per channel, completed once the channel is joined.
+        """
+        loop = self._connection.loop
+        futures = []
+        for channel in channels:
+            fut = self._futures.get(channel)
+            if fut is None:
+                fut = self._futures[channel] = loop.create_future()
+                self._attempts[channel] = 0
+                self._queue.append(channel)
+                self.total += 1
+            futures.append(fut)
+
+        if self._queue and (self._task is None or self._task.done()):
+            self._task = loop.create_task(self._run())
+        return futures
+
+    def pending(self, channels) -> list:
+        """The futures of the channels that are still being joined."""
+        return [self._futures[channel] for channel in channels if channel in self._futures]
+
+    def confirm(self, channel: str):
+        """Completes the future of channel, called for our own JOINs."""
+        fut = self._futures.pop(channel, None)
+        self._attempts.pop(channel, None)
+        if fut is None or fut.done():
+            return
+        fut.set_result(None)
+        self.joined += 1
+        self._progress()
+
+    async def _run(self):
+        queue, sent = self._queue, self._sent
+        while queue:
+            now = time.monotonic()
+            while sent and sent[0] <= now - self.per:
+                sent.popleft()
+            if len(sent) >= self.rate:
+                await asyncio.sleep(sent[0] + self.per - now)
                 continue
-            elif len(x._topics) + len(topics) > 50:
+
+            batch = []
+            length = len('JOIN \r\n') - 1
+            while queue and len(sent) + len(batch) < self.rate:
+                channel = queue[0]
+                if channel not in self._futures:  # confirmed while queued for a retry
+                    queue.popleft()
+                    continue
+                if batch and length + len(channel) + 2 > self.MAX_LINE:
+                    break
+                length += len(channel) + 2
+                batch.append(queue.popleft())
+            if not batch:
+                continue
+
+            try:
+                await self._connection._websocket.send(f'JOIN {",".join("#" + channel for channel in batch)}\r\n')
+            except websockets.ConnectionClosed:
+                # Sent again once reconnected, ahead of the channels queued meanwhile
+                queue.extendleft(reversed(batch))
+                await asyncio.sleep(1)
                 continue
 
-            if x._websocket:
-                return x
+            now = time.monotonic()
+            loop = self._connection.loop
+            for channel in batch:
+                sent.append(now)
+                loop.call_later(self.timeout, self._expire, channel, self._attempts[channel])
+            self.sent += len(batch)
+            self.lines += 1
+
+    def _expire(self, channel: str, attempt: int):
+        if self._attempts.get(channel) != attempt:
+            return  # confirmed or sent again meanwhile
+
+        if attempt < self.retries:
+            log.debug('JOIN #%s timed out, retrying', channel)
+            self._attempts[channel] = attempt + 1
+            self._queue.append(channel)
+            if self._task is None or self._task.done():
+                self._task = self._connection.loop.create_task(self._run())
+            return
+
+        fut = self._futures.pop(channel)
+        del self._attempts[channel]
+        if not fut.done():
+            fut.set_exception(asyncio.TimeoutError(
+                f'Request to join the "{channel}" channel has timed out. Make sure the channel exists.'))
+        self.failed += 1
+        self._progress()
+
+    def _progress(self):
+        connection = self._connection
+        if connection.listens('join_progress'):
+            connection.loop.create_task(connection._dispatch('join_progress', self.joined, self.failed, self.total))
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+class SendQueue:
+    """Sends PRIVMSG lines by priority, within a token bucket per channel and one for the account.
+
+    Lines are queued in three priority classes, :attr:`MODERATION` (chat commands like ``.ban``),
+    :attr:`PENALTY` (automatic penalties, see :meth:`priority`) and :attr:`CHAT`. The sender takes
+    the lines of the highest class that the :class:`~twitchio.cooldowns.IRCLimiter` allows, one line
+    per channel in turns and first in first out per channel, so neither a rate limited channel nor
+    a channel with a long queue holds back the others. Lines taken together are sent as one
+    websocket frame of up to :attr:`MAX_FRAME` bytes.
+    """
+
+    MODERATION = 0
+    PENALTY = 1
+    CHAT = 2
+    NAMES = ('moderation', 'penalty', 'chat')
+
+    MAX_FRAME = 4096
+    LATENCY_SAMPLES = 1000
+
+    def __init__(self, connection: 'WebsocketConnection', rate: int=RateBucket.MODLIMIT, per: float=RateBucket.IRC):
+        self._connection = connection
+        self._lanes = [{} for _ in self.NAMES]  # channel: deque of (line, future, queued at, priority, channel)
+        self.limiter = IRCLimiter(rate, per)
+        self._depth = 0
+        self._pending = asyncio.Event()
+        self._task = None
+
+        self.sent = 0
+        self.frames = 0
+        self.max_depth = 0
+        self._latencies = [collections.deque(maxlen=self.LATENCY_SAMPLES) for _ in self.NAMES]
+
+    def __len__(self):
+        return self._depth
 
-            await x.connect()
+    @staticmethod
+    @contextlib.contextmanager
+    def priority(priority: int):
+        """Sends the lines of the current task (and the tasks it creates) with priority.
 
-            if x._websocket.open:
-                return x
+        Example: ``with SendQueue.priority(SendQueue.PENALTY): await channel.timeout(...)``
+        """
+        token = _send_priority.set(priority)
+        try:
+            yield
+        finally:
+            _send_priority.reset(token)
+
+    @classmethod
+    def priority_of(cls, content: str) -> int:
+        priority = _send_priority.get()
+        if priority is not None:
+            return priority
+        return cls.MODERATION if content.startswith(('.', '/')) else cls.CHAT
+
+    def stats(self) -> dict:
+        """Queued lines and send latencies in ms (median, 99th percentile and max of the last lines) per class."""
+        stats = {'depth': len(self), 'max_depth': self.max_depth, 'sent': self.sent, 'frames': self.frames}
+        for name, latencies in zip(self.NAMES, self._latencies):
+            ordered = sorted(latencies)
+            if ordered:
+                stats[f'{name}_latency'] = (ordered[len(ordered) // 2] * 1000, ordered[int(len(ordered) * .99)] * 1000, ordered[-1] * 1000)
+        return stats
+
+    def put(self, channel: str, line: str, priority: int) -> asyncio.Future:
+        """Queues a line (with its \\r\\n) of channel.
+
+        Returns
+        ---------
+        asyncio.Future
+            Completed once the line was written to the websocket.
+        """
+        loop = self._connection.loop
+        fut = loop.create_future()
+        entry = (line, fut, time.monotonic(), priority, channel)
+        self._queue(entry).append(entry)
+        self._depth += 1
+        self.max_depth = max(self.max_depth, self._depth)
+
+        self._pending.set()
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+        return fut
+
+    def _queue(self, entry) -> collections.deque:
+        lane = self._lanes[entry[3]]
+        lines = lane.get(entry[4])
+        if lines is None:
+            lines = lane[entry[4]] = collections.deque()
+        return lines
+
+    def _take(self):
+        """:return: The entries of the next frame and the seconds until more could be sent"""
+        now = time.monotonic()
+        limiter = self.limiter
+        frame, size, wait = [], 0, None
+        for lane in self._lanes:
+            taken = True
+            while lane and taken:
+                taken = False
+                for channel in list(lane):
+                    delay = limiter.delay(channel, now)
+                    if delay:
+                        wait = delay if wait is None else min(wait, delay)
+                        continue
+
+                    lines = lane.pop(channel)
+                    if frame and size + len(lines[0][0]) > self.MAX_FRAME:
+                        lane[channel] = lines
+                        return frame, 0
+                    entry = lines.popleft()
+                    self._depth -= 1
+                    limiter.take(channel, now)
+                    frame.append(entry)
+                    size += len(entry[0])
+                    taken = True
+                    if lines:
+                        lane[channel] = lines  # its turn again after the other channels
+        return frame, wait
+
+    async def _run(self):
+        while True:
+            frame, wait = self._take()
+            if not frame:
+                if not self._depth:
+                    return
+                # Rate limited, a new line of another channel may still go out earlier
+                self._pending.clear()
+                try:
+                    async with async_timeout.timeout(wait):
+                        await self._pending.wait()
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            websocket = self._connection._websocket
+            try:
+                if websocket is None:
+                    raise ConnectionError('Not connected yet')
+                await websocket.send(''.join(entry[0] for entry in frame))
+            except (websockets.ConnectionClosed, ConnectionError):
+                # Sent again once (re)connected, ahead of the lines queued meanwhile
+                for entry in reversed(frame):
+                    self._queue(entry).appendleft(entry)
+                self._depth += len(frame)
+                await asyncio.sleep(1)
+                continue
+            except Exception as e:
+                log.exception('Failed to send a frame of %s lines', len(frame))
+                for entry in frame:
+                    if not entry[1].done():
+                        entry[1].set_exception(e)
+                continue
 
-            raise WSConnectionFailure('Unable to delegate WebSocket. Please try again.')
-        raise ClientError('Maximum PubSub connections established.')
+            now = time.monotonic()
+            self.frames += 1
+            self.sent += len(frame)
+            for line, fut, queued, priority, channel in frame:
+                self._latencies[priority].append(now - queued)
+                if not fut.done():
+                    fut.set_result(None)
+            # Let the connection read and other lines queue up, they go out in the next frame
+            await asyncio.sleep(0)
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for lane in self._lanes:
+            for lines in lane.values():
+                for entry in lines:
+                    entry[1].cancel()
+            lane.clear()
+        self._depth = 0
 
 
 class WebsocketConnection:
 
+    CHANNEL_INTERN_MAX = 1000  # Channels of not joined channels kept around
+    CHANNEL_MEMBERS_MAX = 100000  # Member logins kept per channel
+    HEALTH_IDLE = 60  # Seconds without data before the connection is probed with a PING
+    HEALTH_TIMEOUT = 10  # Seconds to wait for data after the probe before handing over
+    HANDOVER_GRACE = 5  # Seconds the old connection may still deliver lines after it was closed
+
     def __init__(self, bot, *, loop: asyncio.BaseEventLoop=None, **attrs):
         self._bot = bot
         self.loop = loop or asyncio.get_event_loop()
@@ -91,6 +768,7 @@ class WebsocketConnection:
         self._last_exec = None
 
         self._channel_cache = {}
+        self._channels = {}
         self._initial_channels = attrs.get('initial_channels')
 
         self.nick = attrs.get('nick').lower()
@@ -101,26 +779,38 @@ class WebsocketConnection:
         self._channel_token = 0
         self._rate_status = None
 
-        self._pending_joins = {}
+        self._joins = JoinScheduler(self, rate=attrs.get('join_rate', 20), per=attrs.get('join_per', 10))
+        self.outbound = SendQueue(self, rate=attrs.get('send_rate', RateBucket.MODLIMIT), per=attrs.get('send_per', RateBucket.IRC))
         self._pending_parts = {}
         self._authentication_error = False
 
+        self._handover_task = None
+        self._last_data = time.monotonic()
+        self._probe_sent = None
+        self.handovers = 0
+
+        self.members_dropped = 0
+
+        self._actions = {
+            'PING': self._action_ping,
+            'RECONNECT': self._action_reconnect,
+            'PRIVMSG': self._action_privmsg,
+            'PRIVMSG(ECHO-MESSAGE)': self._action_echo_message,
+            'USERNOTICE': self._action_usernotice,
+            'USERSTATE': self._action_userstate,
+            'MODE': self._action_mode,
+            'CLEARCHAT': self._action_clearchat,
+        }
+
+        # event -> (bot handler or None, extra listeners), filled on first dispatch of an event
+        self._dispatch_table = {}
+        self.dispatched = collections.Counter()
+        self.skipped = collections.Counter()
+        self.dispatch_seconds = collections.Counter()
+
         self.is_ready = asyncio.Event()
 
         self.regex = {
-            "data": re.compile(
-                r"^(?:@(?P<tags>\S+)\s)?:(?P<data>\S+)(?:\s)"
-                r"(?P<action>[A-Z()-]+)(?:\s#)(?P<channel>\S+)"
-                r"(?:\s(?::)?(?P<content>.+))?"),
-            "ping": re.compile("PING (?P<content>.+)"),
-            "author": re.compile(
-                "(?P<author>[a-zA-Z0-9_]+)!(?P=author)"
-                "@(?P=author).tmi.twitch.tv"),
-            "mode": re.compile("(?P<mode>[\+\-])o (?P<user>.+)"),
-            "host": re.compile(
-                "(?P<channel>[a-zA-Z0-9_]+) "
-                "(?P<count>[0-9\-]+)"),
-            'code': re.compile(r":tmi\.twitch\.tv\s(?P<code>[0-9]{3}).*?"),
             'badges': re.compile(r"@badges=(?P<moderator>[^;]*);"
                                  r"color=(?P<color>[^;]*);"
                                  r"display-name=(?P<name>[^;]*);"
@@ -128,17 +818,23 @@ class WebsocketConnection:
                                  r"mod=(?P<mod>[^;]*);"
                                  r"subscriber=(?P<subscriber>[^;]*);"
                                  r"user-type=(?P<type>[^\s]+)\s:tmi.twitch.tv\s(?P<action>[A-Z]*)\s"
-                                 r"#(?P<channel>[a-z0-9A-Z]+)"),
-            "batches": re.compile(r":(?P<author>[a-zA-Z0-9_]+)!(?P=author)@(?P=author).tmi.twitch.tv"
-                                  r"\s(?P<action>[A-Z()-]+)(?:\s#)(?P<channel>\S+)"),
-            "nameslist": re.compile(r"(?P<author>[a-zA-Z0-9_]+).tmi.twitch.tv\s(?P<code>\S+)\s(?P=author)"
-                                 r"\s=\s#(?P<channel>\S+)\s:(?P<names>.+)")}
+                                 r"#(?P<channel>[a-z0-9A-Z]+)")}
 
-        self._groups = ('action', 'data', 'content', 'channel', 'author')
         self._http = attrs.get('http')
 
         self._pubsub_pool = PubSubPool(loop=loop, base=self)
 
+        # Received lines wait in a bounded queue for a single consumer, see IngestQueue for the policies
+        self.ingest = IngestQueue(self.loop, self._process_lines, maxsize=attrs.get('ingest_queue', 10000),
+                                  policy=attrs.get('ingest_policy', 'block'))
+
+        # Inline dispatch runs event handlers on a HandlerPool instead of one task per event
+        if attrs.get('inline_dispatch', False):
+            self._handler_pool = HandlerPool(self.loop, self.event_error, workers=attrs.get('handler_workers', 4),
+                                             maxsize=attrs.get('handler_queue', 1000))
+        else:
+            self._handler_pool = None
+
     async def _update_limit(self):
 
         while True:
@@ -177,7 +873,8 @@ class WebsocketConnection:
         if self.is_connected:
             # Make sure we are 100% connected
             log.debug('Sending authentication sequence payload to Twitch.')
-            self.loop.create_task(self.auth_seq())
+            # After a reconnect every joined channel is joined again
+            self.loop.create_task(self.auth_seq(list(self._channel_cache) or None))
 
     async def wait_until_ready(self):
         await self.is_ready.wait()
@@ -215,17 +912,23 @@ class WebsocketConnection:
         if not self.is_connected:
             return
 
-        await self._websocket.send(f'PASS {self._token}\r\n')
-        await self._websocket.send(f'NICK {self.nick}\r\n')
-
-        for cap in self.modes:
-            await self._websocket.send(f'CAP REQ :twitch.tv/{cap}')
+        await self._authenticate(self._websocket)
 
         if not channels and not self._initial_channels:
             return
 
         channels = channels or self._initial_channels
-        await self.join_channels(*channels)
+        try:
+            await self.join_channels(*channels)
+        except asyncio.TimeoutError as e:
+            log.warning('%s', e)
+
+    async def _authenticate(self, websocket):
+        await websocket.send(f'PASS {self._token}\r\n')
+        await websocket.send(f'NICK {self.nick}\r\n')
+
+        for cap in self.modes:
+            await websocket.send(f'CAP REQ :twitch.tv/{cap}')
 
     async def send_nick(self):
         """|coro|
@@ -236,22 +939,32 @@ class WebsocketConnection:
         """
         await self._websocket.send(f"NICK {self.nick}\r\n")
 
-    async def send_privmsg(self, channel: str, content: str):
+    async def send_privmsg(self, channel: str, content: str, priority: int=None):
         """|coro|
 
         Sends a PRIVMSG to the Twitch IRC Endpoint.
 
         This should only be used directly in rare circumstances where a :class:`twitchio.abcs.Messageable` is not available.
 
-        .. warning::
+        The line is queued on the :class:`SendQueue` and sent within its rate limits, this returns once
+        it was written to the websocket.
 
-            This method is not directly handled by built-in rate-limits. You risk getting rate limited by twitch,
-            which has a 30 minute cooldown.
+        Parameters
+        ------------
+        channel: str
+            The channel to send to.
+        content: str
+            The message or chat command.
+        priority: Optional[int]
+            A :class:`SendQueue` priority class, by default chat commands are sent as ``MODERATION``
+            and messages as ``CHAT``, unless set by :meth:`SendQueue.priority`.
         """
 
         content = content.replace("\n", " ")
         channel = re.sub('[#\s]', '', channel).lower()
-        await self._websocket.send(f"PRIVMSG #{channel} :{content}\r\n")
+        if priority is None:
+            priority = SendQueue.priority_of(content)
+        await self.outbound.put(channel, f"PRIVMSG #{channel} :{content}\r\n", priority)
 
         # Create a dummy message, used as a fake echo-message...
         data = f':{self.nick}!{self.nick}@{self.nick}.tmi.twitch.tv PRIVMSG(ECHO-MESSAGE) #{channel} :{content}\r\n'
@@ -262,27 +975,26 @@ class WebsocketConnection:
 
         Attempt to join the provided channels.
 
+        The channels are joined by a :class:`JoinScheduler`, packed into JOIN lines and paced to the
+        join rate limit. Channels that time out are retried before they count as failed.
+
         Parameters
         ------------
         *channels : str
             An argument list of channels to attempt joining.
-        """
-
-        await asyncio.gather(*[self._join_channel(x) for x in channels])
-
-    async def _join_channel(self, entry):
-        channel = re.sub('[#\s]', '', entry).lower()
-        await self._websocket.send(f'JOIN #{channel}\r\n')
 
-        self._pending_joins[channel] = fut = self.loop.create_future()
-
-        try:
-            await asyncio.wait_for(fut, timeout=10)
-        except asyncio.TimeoutError:
-            self._pending_joins.pop(channel)
+        Raises
+        --------
+        asyncio.TimeoutError
+            Some of the channels couldn't be joined, the others are joined.
+        """
+        channels = [re.sub('[#\s]', '', entry).lower() for entry in channels]
+        results = await asyncio.gather(*self._joins.join(channels), return_exceptions=True)
 
+        failed = [channel for channel, result in zip(channels, results) if isinstance(result, Exception)]
+        if failed:
             raise asyncio.TimeoutError(
-                f'Request to join the "{channel}" channel has timed out. Make sure the channel exists.')
+                f'Request to join the channels {", ".join(failed)} has timed out. Make sure the channels exist.')
 
     async def part_channels(self, *channels: str):
         """|coro|
@@ -319,14 +1031,25 @@ class WebsocketConnection:
         if not self.is_connected and self._last_exec:
             raise WSConnectionFailure(f'Websocket connection failure:\n\n{self._last_exec}')
 
+        websocket = None
         while run_flag[0]:
             if self._authentication_error:
                 log.error('AUTHENTICATION ERROR:: Incorrect IRC Token passed.')
                 raise AuthenticationError
 
+            if websocket is not None and websocket is not self._websocket and websocket.open:
+                # Handed over to a new connection, the old one is read until the handover closes it
+                self.loop.create_task(self._drain(websocket))
+            websocket = self._websocket
+
             try:
-                data = await asyncio.wait_for(self._websocket.recv(), 5)
+                # async_timeout doesn't wrap every recv() in a task like wait_for does
+                async with async_timeout.timeout(5):
+                    data = await websocket.recv()
             except websockets.ConnectionClosed:
+                if websocket is not self._websocket:
+                    continue
+
                 retry = backoff.delay()
                 log.info('Websocket closed: Retrying connection in %s seconds...', retry)
 
@@ -334,116 +1057,184 @@ class WebsocketConnection:
                 await self._connect()
                 continue
             except asyncio.exceptions.TimeoutError:
+                await self._check_health()
                 continue
 
-            await self._dispatch('raw_data', data)
+            await self._feed(data)
+        await self.teardown()
 
-            _task = self.loop.create_task(self.process_data(data))
-            _task.add_done_callback(functools.partial(self._task_callback, data))
-        self.teardown()
-        await asyncio.wait_for(self._websocket.close(), 10)
+    async def _feed(self, data: str):
+        self._last_data = time.monotonic()
+        self._probe_sent = None
+        await self._dispatch('raw_data', data)
+        await self.ingest.put(data)
+
+    async def _drain(self, websocket):
+        try:
+            while True:
+                await self._feed(await websocket.recv())
+        except websockets.ConnectionClosed:
+            pass
 
-    def _task_callback(self, data, task):
-        exc = task.exception()
+    async def _check_health(self):
+        """Probes an idle connection with a PING, hands over if nothing arrives in reply."""
+        now = time.monotonic()
+        if now - self._last_data < self.HEALTH_IDLE or self.handing_over:
+            return
+
+        if self._probe_sent is None:
+            self._probe_sent = now
+            await self._websocket.send('PING :tmi.twitch.tv\r\n')
+        elif now - self._probe_sent > self.HEALTH_TIMEOUT:
+            log.warning('No reply to PING for %s seconds, handing over to a new connection', self.HEALTH_TIMEOUT)
+            self._probe_sent = None
+            self.handover()
+
+    @property
+    def handing_over(self) -> bool:
+        return self._handover_task is not None and not self._handover_task.done()
 
-        if isinstance(exc, AuthenticationError):
-            self._authentication_error = True
-        elif exc:
-            self.loop.create_task(self.event_error(exc, data))
+    def handover(self):
+        """Moves to a new connection without a gap, unless a handover is already running.
+
+        The standby connection is authenticated and from then on used to send, every joined channel
+        is joined again on it. The old connection is read until the channels are joined, then closed.
+        Lines received on both meanwhile are deduplicated, see :meth:`IngestQueue.dedup`.
+        """
+        if not self.handing_over:
+            self._handover_task = self.loop.create_task(self._handover())
+
+    async def _handover(self):
+        log.info('Handing over to a new connection | %s', self.nick)
+        try:
+            standby = await websockets.connect(self._host, timeout=30)
+        except Exception as e:
+            log.error('Standby connection failed | %s', e)
+            return
+
+        self.ingest.dedup(True)
+        old, self._websocket = self._websocket, standby
+        self.handovers += 1
+        try:
+            await self._authenticate(standby)
+            channels = list(self._channel_cache)
+            if channels:
+                try:
+                    await self.join_channels(*channels)
+                except asyncio.TimeoutError as e:
+                    log.warning('%s', e)
+        finally:
+            try:
+                await asyncio.wait_for(old.close(), 10)
+            except asyncio.TimeoutError:
+                pass
+            # _listen may still be reading the old connection, until its recv times out
+            await asyncio.sleep(self.HANDOVER_GRACE)
+            self.ingest.dedup(False)
 
     async def process_ping(self, resp: str):
         await self._websocket.send(f"PONG {resp}\r\n")
 
+    async def _process_lines(self, batch: list):
+        """Processes (raw, line) pairs in order.
+
+        An error in one line is reported and doesn't drop the others. Membership changes of the
+        batch are dispatched once per channel after its last line.
+        """
+        members = {}
+        token = _member_batch.set(members)
+        try:
+            for raw, line in batch:
+                try:
+                    await self._process_line(raw, line)
+                except AuthenticationError:
+                    self._authentication_error = True
+                except Exception as e:
+                    await self.event_error(e, raw)
+        finally:
+            _member_batch.reset(token)
+        if members:
+            try:
+                await self._dispatch_members(members)
+            except Exception as e:
+                await self.event_error(e)
+
     async def process_data(self, data):
         data = data.strip()
+        await self._process_line(data, parse_line(data))
 
-        try:
-            code = int(self.regex['code'].match(data).group('code'))
-        except AttributeError:
+    async def _process_line(self, data: str, line: IRCLine):
+        if line is None:
+            return
+
+        if line.prefix == 'tmi.twitch.tv' and line.command.isdecimal():
+            code = int(line.command)
+        else:
             code = None
 
         if code == 376 or code == 1:
             log.info('Successfully logged onto Twitch WS | %s', self.nick)
 
-            futures = [fut for chan, fut in self._pending_joins.items() if chan.lower() in
-                       [re.sub('[#\s]', '', c).lower() for c in self._initial_channels]]
-
-            for fut in futures:
-                try:
-                    fut.exception()
-                except asyncio.InvalidStateError:
-                    pass
-
-                if fut.done():
-                    futures.remove(fut)
-
-            if futures:
-                await asyncio.wait(futures)
-
-            await self._dispatch('ready')
-            self.is_ready.set()
+            # The JOINs are confirmed by lines read after this one, don't hold up inline processing
+            self.loop.create_task(self._ready())
 
         elif data == ':tmi.twitch.tv NOTICE * :Login authentication failed' or\
                 data == ':tmi.twitch.tv NOTICE * :Improperly formatted auth':
             log.warning('Authentication failed | %s', self._token)
             raise AuthenticationError('Websocket Authentication Failure... Check your token and nick.')
 
-        _groupsdict = {}
-
-        if data.startswith("PING"):
-            match = self.regex["ping"]
+        if line.command == 'PING':
+            _groupsdict = {'action': 'PING', 'content': data[5:]}
+        elif line.channel is not None:
+            _groupsdict = {'action': line.command, 'author': line.author, 'channel': line.channel,
+                           'content': line.content}
         else:
-            match = self.regex["data"]
-
-        result = match.match(data)
+            # Numerics, CAP, GLOBALUSERSTATE, RECONNECT...
+            _groupsdict = {'action': line.command}
 
-        badges = self.regex['badges'].match(data)
+        # Only USERSTATE lines without badge-info still have the layout of the badges regex
+        if data.startswith('@badges='):
+            badges = self.regex['badges'].match(data)
+        else:
+            badges = None
 
         if badges:
             badges = {'name': badges.group('name'), 'mod': badges.group('mod'), 'action': badges.group('action'),
                       'channel': badges.group('channel')}
 
-        try:
-            tags = result.group("tags")
-
-            tagdict = {}
-            for tag in str(tags).split(";"):
-                t = tag.split("=")
-                if t[1].isdecimal():
-                    t[1] = int(t[1])
-                tagdict[t[0]] = t[1]
-            tags = tagdict
-        except (AttributeError, IndexError, KeyError):
-            tags = None
-
-        for group in self._groups:
-            try:
-                res = result.group(group)
-                _groupsdict[group] = res
-            except (AttributeError, KeyError, IndexError):
-                pass
+        await self.process_actions(data, _groupsdict, badges, line.tags, line=line)
 
-        await self.process_actions(data, _groupsdict, badges, tags)
+    async def _ready(self):
+        if self.handing_over:
+            return  # logged in on the standby connection
 
-    async def process_actions(self, raw: str, groups: dict, badges: dict, tags: dict=None):
+        futures = self._joins.pending([re.sub('[#\s]', '', c).lower() for c in self._initial_channels or ()])
+        if futures:
+            await asyncio.wait(futures)
+
+        await self._dispatch('ready')
+        self.is_ready.set()
+
+    async def process_actions(self, raw: str, groups: dict, badges: dict, tags: dict=None, line: IRCLine=None):
         # todo add remaining actions, docs
 
-        # Make sure the batched JOIN and PART events get sent...
-        for match in self.regex['batches'].finditer(raw):
-            if match.groups()[1] == 'JOIN':
-                self.loop.create_task(self.join_action(match.groups()[2], match.groups()[0], tags))
-            elif match.groups()[1] == 'PART':
-                self.loop.create_task(self.part_action(match.groups()[2], match.groups()[0], tags))
+        if line is None:
+            line = parse_line(raw)
 
-        # Fill the channel cache with initial viewers...
-        names = self.regex['nameslist'].finditer(raw)
-        for match in names:
-            if match.group('code') == '353':
-                for name in match.group('names').split(' '):
-                    self.loop.create_task(self.join_action(match.groups()[2], name, tags))
+        if line.command in ('JOIN', 'PART') and line.author and line.channel:
+            if line.author == self.nick:
+                if line.command == 'JOIN':
+                    await self.join_action(line.channel, line.author, tags)
+                else:
+                    await self.part_action(line.channel, line.author, tags)
+            else:
+                await self._update_members(line.channel, (line.author,), line.command == 'JOIN')
+
+        # Fill the channel members with initial viewers...
+        elif line.command == '353' and len(line.params) == 3 and line.trailing:
+            await self._update_members(line.params[2][1:], line.trailing.split(' '), True)
 
         action = groups.pop('action', None)
-        data = groups.pop('data', None)
         content = groups.pop('content', None)
         channel = groups.pop('channel', None)
 
@@ -452,177 +1243,291 @@ class WebsocketConnection:
         elif not action:
             action = 'PING'
 
-        try:
-            author = self.regex["author"].match(data).group("author")
-        except Exception:
-            author = None
+        # RECONNECT, JOIN, PART, NOTICE, ROOMSTATE, numerics... have no action (yet)
+        handler = self._actions.get(action)
+        if handler is None:
+            return
+
+        author = groups.pop('author', None)
 
         if channel:
-            try:
-                channel = self._channel_cache[channel]['channel']
-            except KeyError:
-                channel = Channel(name=channel, ws=self, http=self._http)
+            channel = self._get_channel(channel)
 
-        try:
-            user = User(author=author, channel=channel or None, tags=tags, ws=self._websocket)
-        except (TypeError, KeyError):
-            user = None
+        await handler(raw, channel, author, content, tags, badges)
 
+    def _get_channel(self, name: str) -> Channel:
+        """The Channel of a joined channel, otherwise one interned per name."""
         try:
-            message = Message(author=user, content=content, channel=channel, raw_data=raw, tags=tags)
-        except (TypeError, KeyError):
-            message = None
-
-        if action == 'RECONNECT':
-            # TODO Disconnection/Reconnection Logic.
-            return
-
-        elif action == 'JOIN':
-            pass
-
-        elif action == 'PART':
+            return self._channel_cache[name]['channel']
+        except KeyError:
             pass
 
-        elif action == 'PING':
-            log.debug('ACTION:: PING')
-            await self.process_ping(content)
-
-        elif action == 'PRIVMSG':
-            await self._dispatch('message', message)
-        elif action == 'PRIVMSG(ECHO-MESSAGE)':
-            message.echo = True
-            message._channel = copy.copy(message.channel)
-            message.channel._echo = True
-
-            await self._dispatch('raw_data', raw)
-            await self._dispatch('message', message)
-
-        elif action == 'USERNOTICE':
-            await self._dispatch('raw_usernotice', channel, tags)
-
-            if tags['msg-id'] in ('sub', 'resub'):
-                user = User(author=tags['login'], channel=channel, tags=tags, ws=self._websocket)
-                notice = NoticeSubscription(channel=channel, user=user, tags=tags)
-
-                await self._dispatch('usernotice_subscription', notice)
-
-        elif action == 'USERSTATE':
-            log.debug('ACTION:: USERSTATE')
+        try:
+            return self._channels[name]
+        except KeyError:
+            if len(self._channels) >= self.CHANNEL_INTERN_MAX:
+                self._channels.clear()
+            channel = self._channels[name] = Channel(name=name, ws=self, http=self._http)
+            return channel
+
+    def _make_user(self, author: str, channel: Channel, tags) -> User:
+        return User(author=author, channel=channel or None, tags=tags, ws=self._websocket)
+
+    def _make_message(self, raw: str, channel: Channel, author: str, content: str, tags) -> Message:
+        return Message(author=self._make_user(author, channel, tags), content=content, channel=channel, raw_data=raw, tags=tags)
+
+    async def _action_ping(self, raw, channel, author, content, tags, badges):
+        log.debug('ACTION:: PING')
+        await self.process_ping(content)
+
+    async def _action_reconnect(self, raw, channel, author, content, tags, badges):
+        log.info('ACTION:: RECONNECT')
+        self.handover()
+
+    async def _action_privmsg(self, raw, channel, author, content, tags, badges):
+        if self.listens('message'):
+            await self._dispatch('message', self._make_message(raw, channel, author, content, tags))
+
+    async def _action_echo_message(self, raw, channel, author, content, tags, badges):
+        message = self._make_message(raw, channel, author, content, tags)
+        message.echo = True
+        message._channel = copy.copy(message.channel)
+        message.channel._echo = True
+
+        await self._dispatch('raw_data', raw)
+        await self._dispatch('message', message)
+
+    async def _action_usernotice(self, raw, channel, author, content, tags, badges):
+        await self._dispatch('raw_usernotice', channel, tags)
+
+        if tags['msg-id'] in ('sub', 'resub') and self.listens('usernotice_subscription'):
+            user = User(author=tags['login'], channel=channel, tags=tags, ws=self._websocket)
+            notice = NoticeSubscription(channel=channel, user=user, tags=tags)
+
+            await self._dispatch('usernotice_subscription', notice)
+
+    async def _action_userstate(self, raw, channel, author, content, tags, badges):
+        log.debug('ACTION:: USERSTATE')
+
+        # USERSTATE always describes the bot, current lines have no author prefix to tell
+        if channel is not None and tags:
+            self.outbound.limiter.set_mod(channel.name, str(tags.get('mod', '')) == '1'
+                                          or 'broadcaster/' in str(tags.get('badges', ''))
+                                          or channel.name == self.nick.lower())
+
+        user = self._make_user(author, channel, tags)
+        if not user or not user.name:
+            if badges:
+                user = User(author=badges['name'],
+                            channel=Channel(name=badges['channel'], ws=self, http=self._http) or None,
+                            tags=tags,
+                            ws=self._websocket,
+                            mod=badges['mod'])
+            else:
+                return
 
-            if not user or not user.name:
-                if badges:
-                    user = User(author=badges['name'],
-                                channel=Channel(name=badges['channel'], ws=self, http=self._http) or None,
-                                tags=tags,
-                                ws=self._websocket,
-                                mod=badges['mod'])
-                else:
-                    return
+        if user._name.lower() == self.nick.lower():
+            try:
+                self._channel_cache[channel.name]['bot'] = user
+            except KeyError:
+                self._channel_cache[channel.name] = {'channel': channel, 'bot': user}
 
-            if user._name.lower() == self.nick.lower():
-                try:
-                    self._channel_cache[channel.name]['bot'] = user
-                except KeyError:
-                    self._channel_cache[channel.name] = {'channel': channel, 'bot': user}
+        await self._dispatch('userstate', user)
 
-            await self._dispatch('userstate', user)
+    async def _action_mode(self, raw, channel, author, content, tags, badges):
+        log.debug('ACTION:: MODE')
 
-        elif action == 'MODE':
-            log.debug('ACTION:: MODE')
+        mdata = re.match(r':jtv MODE #(?P<channel>.+?[a-z0-9])\s(?P<status>[\+\-]o)\s(?P<user>.*[a-z0-9])', raw)
+        mstatus = mdata.group('status')
 
-            mdata = re.match(r':jtv MODE #(?P<channel>.+?[a-z0-9])\s(?P<status>[\+\-]o)\s(?P<user>.*[a-z0-9])', raw)
-            mstatus = mdata.group('status')
+        user = User(author=mdata.group('user'), channel=channel, tags=tags, ws=self._websocket)
 
-            user = User(author=mdata.group('user'), channel=channel, tags=tags, ws=self._websocket)
+        if user._name.lower() == self.nick.lower():
+            await self._token_update(mstatus)
+            try:
+                self._channel_cache[channel.name]['bot'] = user
+            except KeyError:
+                self._channel_cache[channel.name] = {'channel': channel, 'bot': user}
+            self.outbound.limiter.set_mod(channel.name, mstatus == '+o' or channel.name == self.nick.lower())
 
-            if user._name.lower() == self.nick.lower():
-                await self._token_update(mstatus)
-                try:
-                    self._channel_cache[channel.name]['bot'] = user
-                except KeyError:
-                    self._channel_cache[channel.name] = {'channel': channel, 'bot': user}
+        await self._dispatch('mode', channel, user, mstatus)
 
-            await self._dispatch('mode', channel, user, mstatus)
+    async def _action_clearchat(self, raw, channel, author, content, tags, badges): #新增 被ban事件
+        log.debug('ACTION:: CLEARCHAT')
 
-        elif action == 'CLEARCHAT': #新增 被ban事件
-            log.debug('ACTION:: CLEARCHAT')
+        if not self.listens('clearchat'):
+            return
 
-            user = User(author=content, channel=channel, tags=tags, ws=self._websocket)
-            notice = ClearChat(channel=channel, user=user, tags=tags)
+        user = User(author=content, channel=channel, tags=tags, ws=self._websocket)
+        notice = ClearChat(channel=channel, user=user, tags=tags)
 
-            await self._dispatch('clearchat', notice)
+        await self._dispatch('clearchat', notice)
 
     async def join_action(self, channel: str, author: str, tags):
         log.debug('ACTION:: JOIN: %s', channel)
 
         if author == self.nick:
-            chan_ = Channel(name=channel, ws=self, http=self._http)
-            user = User(author=author, channel=chan_, tags=tags, ws=self._websocket)
-
-            self._channel_cache[channel] = {'channel': chan_, 'bot': user}
+            if channel not in self._channel_cache:
+                chan_ = self._channels.pop(channel, None) or Channel(name=channel, ws=self, http=self._http)
+                user = User(author=author, channel=chan_, tags=tags, ws=self._websocket)
 
-            if channel in self._pending_joins:
-                self._pending_joins[channel].set_result(None)
-                self._pending_joins.pop(channel)
+                self._channel_cache[channel] = {'channel': chan_, 'bot': user}
 
-            self._channel_token += 1
+                self._channel_token += 1
 
-        try:
-            cache = self._channel_cache[channel]['channel']._users
-        except KeyError as e:
-            raise ClientError("The \"nick\" value passed to the constructor does not match the user we are logged in as") from e
-
-        try:
-            user = cache[author.lower()]
-        except KeyError:
-            channel = self._channel_cache[channel]['channel']
-            user = User(author=author, channel=channel, tags=tags, ws=self._websocket)
-
-            cache[author.lower()] = user
+            # Joined again after a reconnect or handover, the channel keeps its members and users
+            self._joins.confirm(channel)
 
-        await self._dispatch('join', user)
+        await self._update_members(channel, (author,), True)
 
     async def part_action(self, channel: str, author: str, tags):
         log.debug('ACTION:: PART: %s', channel)
 
         if author == self.nick:
             self._channel_cache.pop(channel)
+            self.outbound.limiter.forget(channel)
             self._channel_token -= 1
 
             if self._pending_parts:
                 self._pending_parts[channel].set_result(None)
                 self._pending_parts.pop(channel)
+
+        await self._update_members(channel, (author,), False)
+
+    async def _update_members(self, channel: str, logins, joined: bool):
+        """Applies JOINs or PARTs of logins to the member set of channel.
+
+        Logins are interned, at most :attr:`CHANNEL_MEMBERS_MAX` are kept per channel. The change
+        is dispatched as one ``members_join`` / ``members_part`` event per channel and batch, JOINs
+        of members, e.g. the NAMES list after joining again, aren't dispatched.
+        """
         try:
-            cache = self._channel_cache[channel]['channel']._users
-        except KeyError:
-            channel = Channel(name=channel, ws=self, http=self._http)
-            user = User(author=author, channel=channel or None, tags=tags, ws=self._websocket)
+            chan = self._channel_cache[channel]['channel']
+        except KeyError as e:
+            if joined:
+                raise ClientError("The \"nick\" value passed to the constructor does not match the user we are logged in as") from e
+            chan = None
+
+        if chan is not None:
+            members = chan._members
+            if joined:
+                intern = sys.intern
+                new = []
+                for login in logins:
+                    if login in members:
+                        continue
+                    new.append(login)
+                    if len(members) >= self.CHANNEL_MEMBERS_MAX:
+                        self.members_dropped += 1
+                        continue
+                    members.add(intern(login))
+                logins = new
+                if not logins:
+                    return
+            else:
+                for login in logins:
+                    members.discard(login)
+
+        if joined:
+            if not (self.listens('members_join') or self.listens('join')):
+                return
+        elif not (self.listens('members_part') or self.listens('part')):
+            return
+
+        batch = _member_batch.get()
+        if batch is None:
+            await self._dispatch_members({(channel, joined): list(logins)})
         else:
-            try:
-                user = cache.pop(author.lower())
-            except KeyError:
-                channel = Channel(name=channel, ws=self, http=self._http)
-                user = User(author=author, channel=channel or None, tags=tags, ws=self._websocket)
+            batch.setdefault((channel, joined), []).extend(logins)
+
+    async def _dispatch_members(self, batch: dict):
+        for (name, joined), logins in batch.items():
+            channel = self._get_channel(name)
+            await self._dispatch('members_join' if joined else 'members_part', channel, logins)
 
-        await self._dispatch('part', user)
+            # Per user events are only built for bots handling them
+            event = 'join' if joined else 'part'
+            if self.listens(event):
+                for login in logins:
+                    await self._dispatch(event, User(author=login, channel=channel, tags=None, ws=self._websocket))
+
+    def refresh_dispatch(self):
+        """Rebuilds the event dispatch table.
+
+        Called by the bot whenever an event handler or listener is added or removed. Handlers
+        assigned to the bot directly instead of through :meth:`.Bot.event` need a refresh too.
+        """
+        self._dispatch_table = {}
+
+    def _dispatch_entry(self, event: str) -> tuple:
+        name = f'event_{event}'
+        func = getattr(self._bot, name, None)
+        if getattr(func, '_noop_event', False):
+            func = None
+
+        listeners = getattr(self._bot, 'extra_listeners', None) or {}
+        entry = self._dispatch_table[event] = (func, tuple(listeners.get(name, ())))
+        return entry
+
+    def listens(self, event: str) -> bool:
+        """Whether the bot has a handler or listener for event, events nobody listens to aren't dispatched."""
+        try:
+            func, extras = self._dispatch_table[event]
+        except KeyError:
+            func, extras = self._dispatch_entry(event)
+        return func is not None or bool(extras)
 
     async def _dispatch(self, event: str, *args, **kwargs):
         log.debug('Dispatching event: %s', event)
 
-        func = getattr(self._bot, f'event_{event}')
-        self.loop.create_task(func(*args, **kwargs))
+        try:
+            func, extras = self._dispatch_table[event]
+        except KeyError:
+            func, extras = self._dispatch_entry(event)
+
+        if func is None and not extras:
+            self.skipped[event] += 1
+            return
+
+        start = time.perf_counter()
+        if self._handler_pool is not None:
+            key = self._dispatch_key(args)
+            if func is not None:
+                await self._handler_pool.submit(key, func(*args, **kwargs))
+            if extras:
+                await self._handler_pool.submit(key, self._run_listeners(extras, *args, **kwargs))
+            self.dispatched[event] += 1
+            self.dispatch_seconds[event] += time.perf_counter() - start
+            return
+
+        if func is not None:
+            self.loop.create_task(func(*args, **kwargs))
+        self.dispatched[event] += 1
+        self.dispatch_seconds[event] += time.perf_counter() - start
 
-        listeners = getattr(self._bot, 'extra_listeners', None)
-        if not listeners:
+        if not extras:
             return
 
-        extras = listeners.get(f'event_{event}', [])
         ret = await asyncio.gather(*[e(*args, **kwargs) for e in extras])
 
         for e in ret:
             if isinstance(e, Exception):
                 self.loop.create_task(self.event_error(e))
 
+    async def _run_listeners(self, extras, *args, **kwargs):
+        await asyncio.gather(*[e(*args, **kwargs) for e in extras])
+
+    @staticmethod
+    def _dispatch_key(args) -> str:
+        """The channel name of the event, handlers of one channel run in order."""
+        for arg in args:
+            if isinstance(arg, Channel):
+                return arg.name
+            channel = getattr(arg, 'channel', None)
+            if channel is not None:
+                return getattr(channel, 'name', channel)
+        return ''
+
     async def event_error(self, error: Exception, data: str=None):
         traceback.print_exception(type(error), error, error.__traceback__, file=sys.stderr)
 
@@ -630,26 +1535,35 @@ class WebsocketConnection:
         if self._bot._webhook_server:
             self._bot._webhook_server.stop()
 
-        await self._websocket.close()
+        self.ingest.close()
+        self._joins.close()
+        self.outbound.close()
+        await self._pubsub_pool.close()
+        if self._handler_pool is not None:
+            self._handler_pool.close()
+
+        await asyncio.wait_for(self._websocket.close(), 10)
 
 
 class PubSub:
 
     __slots__ = ('loop', '_pool', '_node', '_subscriptions', '_topics', '_websocket', '_timeout', '_last_result',
-                 '_listener')
+                 '_listener', '_pinger', '_connecting', '_reclaim')
 
     def __init__(self, loop: asyncio.BaseEventLoop, pool: PubSubPool, node: int):
         self.loop = loop
         self._pool = pool
         self._node = node
-        self._topics = []
+        self._topics = {}  # topic: token
         self._websocket = None
         self._timeout = asyncio.Event()
 
         self._last_result = None
 
-        loop.create_task(self.handle_ping())
         self._listener = None
+        self._pinger = None
+        self._connecting = None
+        self._reclaim = None
 
     @property
     def node(self) -> int:
@@ -657,25 +1571,43 @@ class PubSub:
 
     async def reconnection(self):
         backoff = ExponentialBackoff()
-        self._listener.cancel()
+        if self._listener is not None:
+            self._listener.cancel()
+
+        if self._websocket is not None:
+            await self._websocket.close()
 
         while True:
             retry = backoff.delay()
             log.info('PubSub Websocket closed: Retrying connection in %s seconds...', retry)
 
-            await self.connect()
+            try:
+                await self.connect()
+            except WSConnectionFailure:
+                await asyncio.sleep(retry)
+                continue
 
-            if self._websocket is not None and self._websocket.open:
-                for topic in self._topics:
-                    await self.resub(topic[1], topic[0])
-                return
+            for topic, token in self._topics.items():
+                await self.resub(token, topic)
+            return
 
-            await asyncio.sleep(retry)
+    async def ensure_connected(self):
+        """Connects once, concurrent callers wait for the same attempt."""
+        if self._websocket is not None:
+            return
+        if self._connecting is None or self._connecting.done():
+            self._connecting = self.loop.create_task(self.connect())
+        try:
+            await self._connecting
+        finally:
+            if self._websocket is None:
+                self._connecting = None  # failed, the next call tries again
 
     async def connect(self):
         try:
             self._websocket = await websockets.connect('wss://pubsub-edge.twitch.tv')
         except Exception as e:
+            self._websocket = None
             self._last_result = e
             log.error('PubSub websocket connection failed | %s', e)
 
@@ -683,6 +1615,22 @@ class PubSub:
 
         log.info('PubSub %s connection successful', self.node)
         self._listener = self.loop.create_task(self.listen())
+        if self._pinger is None:
+            self._pinger = self.loop.create_task(self.handle_ping())
+
+    def keep(self):
+        """Cancels a pending reclaim of this idle node."""
+        if self._reclaim is not None:
+            self._reclaim.cancel()
+            self._reclaim = None
+
+    async def close(self):
+        for task in (self._pinger, self._listener):
+            if task is not None:
+                task.cancel()
+        self._pinger = self._listener = None
+        if self._websocket is not None:
+            await self._websocket.close()
 
     @staticmethod
     def generate_jitter():
@@ -717,13 +1665,21 @@ class PubSub:
                 self.loop.create_task(self.reconnection())
 
     async def listen(self):
+        pool = self._pool
         while True:
             try:
-                data = json.loads(await self._websocket.recv())
-                self.loop.create_task(self._pool.base._dispatch('raw_pubsub', data))
+                frame = await self._websocket.recv()
             except websockets.ConnectionClosed:
                 return self.loop.create_task(self.reconnection())
 
+            topic = frame_topic(frame)
+            if topic is not None:
+                await pool.route(topic, frame)
+                continue
+
+            data = json.loads(frame)
+            await pool.base._dispatch('raw_pubsub', data)
+
             if data['type'] == 'PONG':
                 log.debug('PubSub %s received PONG payload.', self.node)
                 self._timeout.set()
@@ -731,11 +1687,9 @@ class PubSub:
                 log.debug('PubSub %s received RECONNECT payload... Attempting reconnection', self.node)
                 self.loop.create_task(self.reconnection())
 
-            # self.loop.create_task(self._pool.base._dispatch('pubsub', data))
-
     async def subscribe(self, token: str, nonce: str, *topics: str):
-        for t in topics:
-            self._topics.append((t, token))
+        for topic in topics:
+            self._topics[topic] = token
 
         payload = {"type": "LISTEN",
                    "nonce": nonce,
@@ -744,6 +1698,17 @@ class PubSub:
 
         await self._websocket.send(json.dumps(payload))
 
+    async def unsubscribe(self, token: str, nonce: str, *topics: str):
+        for topic in topics:
+            self._topics.pop(topic, None)
+
+        payload = {"type": "UNLISTEN",
+                   "nonce": nonce,
+                   "data": {"topics": [*topics],
+                            "auth_token": token}}
+
+        await self._websocket.send(json.dumps(payload))
+
     async def resub(self, token: str, topic: str):
         payload = {"type": "LISTEN",
                    "data": {"topics": [topic],
@@ -0,0 +1,402 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class BatchWriter(threading.Thread):
+    """
+    Background thread owning the only write connection to a SQLite database.
+
+    Statements are queued with submit() and executed in batches: consecutive statements with the
+    same SQL are merged into one executemany() and every batch is committed in a single transaction.
+    """
+    _STOP = object()
+
+    def __init__(self, path: str, schema: str, batch_size: int = 1000, flush_interval: float = 0.5):
+        super(BatchWriter, self).__init__(name=f"BatchWriter({os.path.basename(path)})", daemon=True)
+        self.path = path
+        self.schema = schema
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self.ready = threading.Event()
+        self.error: Optional[BaseException] = None  # why the database couldn't be opened
+
+    def submit(self, sql: str, params: Tuple = ()):
+        self._queue.put((sql, params))
+
+    def submit_many(self, sql: str, rows: Iterable[Tuple]):
+        for params in rows:
+            self._queue.put((sql, params))
+
+    def stop(self, timeout: float = 10):
+        self._queue.put(self._STOP)
+        self.join(timeout)
+
+    def run(self):
+        try:
+            connection = connect(self.path)
+            connection.executescript(self.schema)
+            connection.commit()
+        except Exception as e:
+            self.error = e
+            return
+        finally:
+            self.ready.set()
+        running = True
+        while running:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            while item is not self._STOP:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            else:
+                running = False
+            if batch:
+                self._write(connection, batch)
+        connection.close()
+
+    @staticmethod
+    def _write(connection: sqlite3.Connection, batch: List[Tuple[str, Tuple]]):
+        try:
+            with connection:
+                idx = 0
+                while idx < len(batch):
+                    sql = batch[idx][0]
+                    end = idx
+                    while end < len(batch) and batch[end][0] == sql:
+                        end += 1
+                    connection.executemany(sql, [params for _, params in batch[idx:end]])
+                    idx = end
+        except sqlite3.Error as e:
+            print(f"Failed to write {len(batch)} rows to database: {e}")
+
+
+def connect(path: str) -> sqlite3.Connection:
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+class _Database:
+    """
+    Writes are queued to a BatchWriter thread and never block the caller,
+    reads use a separate connection per calling thread.
+    """
+    SCHEMA = ""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._writer = BatchWriter(path, self.SCHEMA)
+        self._writer.start()
+        self._writer.ready.wait()
+        if self._writer.error is not None:
+            raise self._writer.error
+
+    def close(self, timeout: float = 10):
+        """Waits up to timeout seconds (None to wait for all) for queued writes"""
+        self._writer.stop(timeout)
+
+    def _read(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = connect(self.path)
+        return connection.execute(sql, params).fetchall()
+
+
+class ModerationWarehouse(_Database):
+    """
+    Local SQLite store for bans, blocks, follows and moderator actions.
+    """
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS bans (
+        channel TEXT NOT NULL COLLATE NOCASE,
+        user_id TEXT NOT NULL,
+        login TEXT NOT NULL COLLATE NOCASE,
+        expires_at TEXT,
+        seen_at REAL NOT NULL,
+        PRIMARY KEY (channel, user_id)
+    );
+    CREATE INDEX IF NOT EXISTS bans_login ON bans (login);
+    CREATE INDEX IF NOT EXISTS bans_user_id ON bans (user_id);
+
+    CREATE TABLE IF NOT EXISTS blocks (
+        owner TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        login TEXT NOT NULL COLLATE NOCASE,
+        seen_at REAL NOT NULL,
+        PRIMARY KEY (owner, user_id)
+    );
+    CREATE INDEX IF NOT EXISTS blocks_login ON blocks (login);
+
+    CREATE TABLE IF NOT EXISTS follows (
+        from_login TEXT NOT NULL COLLATE NOCASE,
+        to_login TEXT NOT NULL COLLATE NOCASE,
+        followed_at TEXT,
+        seen_at REAL NOT NULL,
+        PRIMARY KEY (from_login, to_login)
+    );
+    CREATE INDEX IF NOT EXISTS follows_to_login ON follows (to_login);
+
+    CREATE TABLE IF NOT EXISTS follow_queries (
+        login TEXT NOT NULL COLLATE NOCASE,
+        direction TEXT NOT NULL,
+        fetched_at REAL NOT NULL,
+        PRIMARY KEY (login, direction)
+    );
+
+    CREATE TABLE IF NOT EXISTS mod_actions (
+        id INTEGER PRIMARY KEY,
+        channel TEXT COLLATE NOCASE,
+        user_id INTEGER,
+        login TEXT COLLATE NOCASE,
+        action TEXT,
+        moderator TEXT COLLATE NOCASE,
+        created_at REAL,
+        info TEXT,
+        import_key TEXT
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS mod_actions_import_key ON mod_actions (import_key);
+    CREATE INDEX IF NOT EXISTS mod_actions_channel ON mod_actions (channel, created_at);
+    CREATE INDEX IF NOT EXISTS mod_actions_user_id ON mod_actions (user_id, created_at);
+    CREATE INDEX IF NOT EXISTS mod_actions_login ON mod_actions (login, created_at);
+    CREATE INDEX IF NOT EXISTS mod_actions_moderator ON mod_actions (moderator, created_at);
+    CREATE INDEX IF NOT EXISTS mod_actions_created_at ON mod_actions (created_at);
+    """
+
+    FOLLOWING = "Following"
+    FOLLOWERS = "Followers"
+
+    def __init__(self, path: str = "data/moderation.sqlite3"):
+        super(ModerationWarehouse, self).__init__(path)
+
+    # <editor-fold desc="Writes">
+    def record_bans(self, channel: str, banlist: List[List[str]], seen_at: float = None):
+        """
+        :param channel: Channel the bans are from
+        :param banlist: List of [login, user_id, expires_at] lists, as emitted by Twitch_api.get_banned_users
+        :param seen_at: Time of the refresh these bans belong to
+        """
+        seen_at = seen_at or time.time()
+        self._writer.submit_many("INSERT OR REPLACE INTO bans (channel, user_id, login, expires_at, seen_at) VALUES (?, ?, ?, ?, ?)",
+                                 ((channel, str(user_id), login, expires_at, seen_at) for login, user_id, expires_at in banlist))
+
+    def prune_bans(self, channel: str, seen_before: float):
+        """Removes bans of channel which were not seen in the refresh started at seen_before"""
+        self._writer.submit("DELETE FROM bans WHERE channel = ? AND seen_at < ?", (channel, seen_before))
+
+    def remove_bans(self, channel: str, logins: Iterable[str]):
+        self._writer.submit_many("DELETE FROM bans WHERE channel = ? AND login = ?", ((channel, login) for login in logins))
+
+    def record_blocks(self, owner: str, blocklist: Dict[str, str], seen_at: float = None):
+        """
+        :param owner: User id of the blocking user
+        :param blocklist: Dict of login:user_id pairs, as emitted by Twitch_api.get_all_blocked_users
+        :param seen_at: Time of the refresh these blocks belong to
+        """
+        seen_at = seen_at or time.time()
+        self._writer.submit_many("INSERT OR REPLACE INTO blocks (owner, user_id, login, seen_at) VALUES (?, ?, ?, ?)",
+                                 ((owner, str(user_id), login, seen_at) for login, user_id in blocklist.items()))
+
+    def prune_blocks(self, owner: str, seen_before: float):
+        self._writer.submit("DELETE FROM blocks WHERE owner = ? AND seen_at < ?", (owner, seen_before))
+
+    def record_follows(self, login: str, direction: str, follows: Dict[str, str], seen_at: float = None):
+        """
+        :param login: User the follows were requested for
+        :param direction: FOLLOWING if login follows the channels, FOLLOWERS if they follow login
+        :param follows: Dict of login:followed_at pairs
+        :param seen_at: Time of the request
+        """
+        seen_at = seen_at or time.time()
+        if direction == self.FOLLOWING:
+            rows = ((login, other, followed_at, seen_at) for other, followed_at in follows.items())
+        else:
+            rows = ((other, login, followed_at, seen_at) for other, followed_at in follows.items())
+        self._writer.submit_many("INSERT OR REPLACE INTO follows (from_login, to_login, followed_at, seen_at) VALUES (?, ?, ?, ?)", rows)
+        self._writer.submit("INSERT OR REPLACE INTO follow_queries (login, direction, fetched_at) VALUES (?, ?, ?)", (login, direction, seen_at))
+
+    def record_mod_action(self, channel: str, login: str, user_id: int, action: str, moderator: str, created_at: float, info: str,
+                          import_key: str = None):
+        """:param import_key: Identifies an action imported from a file, an action with a known key is not stored again"""
+        self._writer.submit("INSERT OR IGNORE INTO mod_actions (channel, user_id, login, action, moderator, created_at, info, import_key) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            (channel, user_id or None, login or None, action, moderator, created_at or None, info or None, import_key))
+    # </editor-fold>
+
+    # <editor-fold desc="Queries">
+    def bans(self, channel: str, login: str = None) -> List[Tuple[str, str, str]]:
+        """:return: List of (login, user_id, expires_at) tuples"""
+        if login:
+            return self._read("SELECT login, user_id, expires_at FROM bans WHERE channel = ? AND login = ? ORDER BY login", (channel, login))
+        return self._read("SELECT login, user_id, expires_at FROM bans WHERE channel = ? ORDER BY login", (channel,))
+
+    def blocks(self, owner: str) -> List[Tuple[str, str]]:
+        """:return: List of (login, user_id) tuples"""
+        return self._read("SELECT login, user_id FROM blocks WHERE owner = ? ORDER BY login", (owner,))
+
+    def follows(self, login: str, direction: str) -> List[Tuple[str, str]]:
+        """:return: List of (login, followed_at) tuples"""
+        if direction == self.FOLLOWING:
+            return self._read("SELECT to_login, followed_at FROM follows WHERE from_login = ?", (login,))
+        return self._read("SELECT from_login, followed_at FROM follows WHERE to_login = ?", (login,))
+
+    def last_follow_query(self) -> Optional[Tuple[str, str]]:
+        """:return: (login, direction) of the most recent follow request or None"""
+        rows = self._read("SELECT login, direction FROM follow_queries ORDER BY fetched_at DESC LIMIT 1")
+        return rows[0] if rows else None
+
+    def mod_action_import_keys(self) -> Set[str]:
+        return {key for key, in self._read("SELECT import_key FROM mod_actions WHERE import_key IS NOT NULL")}
+
+    def mod_actions(self, channel: str = None, login: str = None, user_id: int = None, moderator: str = None, action: str = None,
+                    since: float = None, until: float = None, limit: int = 10000) -> List[Tuple]:
+        """
+        :return: List of (login, user_id, action, moderator, created_at, info) tuples, oldest first.
+                 limit applies to the newest matching actions.
+        """
+        conditions = []
+        params = []
+        for column, value in (("channel", channel), ("login", login), ("user_id", user_id), ("moderator", moderator), ("action", action)):
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if since:
+            conditions.append("created_at >= ?")
+            params.append(since)
+        if until:
+            conditions.append("created_at < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        params.append(limit)
+        rows = self._read(f"SELECT login, user_id, action, moderator, created_at, info FROM mod_actions {where} ORDER BY created_at DESC, id DESC LIMIT ?", tuple(params))
+        rows.reverse()
+        return rows
+    # </editor-fold>
+
+
+class ChatHistory(_Database):
+    """
+    Every chat message the bot received, with an FTS5 full text index over the content.
+
+    Kept in its own database file, it grows much faster than the moderation data. Login and channel
+    are indexed as FTS5 columns too, so text searches for one user or channel intersect posting lists
+    instead of checking every match. Time ranges are translated into the id range of their messages,
+    which FTS5 can seek to.
+    """
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY,
+        channel TEXT NOT NULL COLLATE NOCASE,
+        login TEXT NOT NULL COLLATE NOCASE,
+        user_id INTEGER,
+        sent_at REAL NOT NULL,
+        content TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS messages_login ON messages (login, sent_at);
+    CREATE INDEX IF NOT EXISTS messages_user_id ON messages (user_id, sent_at);
+    CREATE INDEX IF NOT EXISTS messages_channel ON messages (channel, sent_at);
+    CREATE INDEX IF NOT EXISTS messages_sent_at ON messages (sent_at);
+
+    CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+        content, login, channel, content='messages', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    );
+    CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts (rowid, content, login, channel) VALUES (new.id, new.content, new.login, new.channel);
+    END;
+    CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts (messages_fts, rowid, content, login, channel) VALUES ('delete', old.id, old.content, old.login, old.channel);
+    END;
+    """
+
+    def __init__(self, path: str = "data/chat_history.sqlite3"):
+        super(ChatHistory, self).__init__(path)
+
+    def record_message(self, channel: str, login: str, user_id: Optional[int], sent_at: float, content: str):
+        self._writer.submit("INSERT INTO messages (channel, login, user_id, sent_at, content) VALUES (?, ?, ?, ?, ?)",
+                            (channel, login, user_id, sent_at, content))
+
+    @staticmethod
+    def _quote(string: str) -> str:
+        return '"{}"'.format(string.replace('"', '""'))
+
+    @classmethod
+    def fts_query(cls, text: str, channel: str = None, login: str = None) -> str:
+        """
+        :return: FTS5 query matching messages containing every word of text, words are quoted so operators are literal.
+                 channel and login narrow the match down, the exact comparison is still done on the messages table.
+        """
+        query = "content : ({})".format(" ".join(cls._quote(word) for word in text.split()))
+        if login:
+            query += f" AND login : {cls._quote(login)}"
+        if channel:
+            query += f" AND channel : {cls._quote(channel)}"
+        return query
+
+    def _id_range(self, since: Optional[float], until: Optional[float]) -> Tuple[Optional[int], Optional[int]]:
+        """
+        :return: Smallest and largest id of the messages sent in the time range, (None, None) if there are none
+
+        sent_at is the server's timestamp, ids follow the arrival order which differs across channels
+        and shards, so the bounds are taken over the whole range.
+        """
+        conditions = []
+        params = []
+        if since:
+            conditions.append("sent_at >= ?")
+            params.append(since)
+        if until:
+            conditions.append("sent_at < ?")
+            params.append(until)
+        return self._read(f"SELECT MIN(id), MAX(id) FROM messages WHERE {' AND '.join(conditions)}", tuple(params))[0]
+
+    def search(self, text: str = None, channel: str = None, login: str = None, user_id: int = None,
+               since: float = None, until: float = None, limit: int = 1000) -> List[Tuple[str, str, float, str]]:
+        """
+        :param text: Words every message has to contain, in any order
+        :return: List of (channel, login, sent_at, content) tuples, newest first
+        """
+        conditions = []
+        params = []
+        for column, value in (("m.channel", channel), ("m.login", login), ("m.user_id", user_id)):
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if since:
+            conditions.append("m.sent_at >= ?")
+            params.append(since)
+        if until:
+            conditions.append("m.sent_at < ?")
+            params.append(until)
+
+        if text and text.split():
+            # Walk the full text matches newest first, bounded by the id range of the time range
+            if since or until:
+                first_id, last_id = self._id_range(since, until)
+                if first_id is None:
+                    return []
+                conditions.append("messages_fts.rowid BETWEEN ? AND ?")
+                params.extend((first_id, last_id))
+            where = "".join(f" AND {condition}" for condition in conditions)
+            return self._read("SELECT m.channel, m.login, m.sent_at, m.content FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid "
+                              f"WHERE messages_fts MATCH ?{where} ORDER BY messages_fts.rowid DESC LIMIT ?",
+                              (self.fts_query(text, channel, login), *params, limit))
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._read(f"SELECT m.channel, m.login, m.sent_at, m.content FROM messages m {where} ORDER BY m.sent_at DESC LIMIT ?", (*params, limit))